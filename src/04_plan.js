@@ -1,6 +1,8 @@
 import fs from 'fs';
 import Anthropic from '@anthropic-ai/sdk';
 import { readText, writeJSON, trim } from './utils.js';
+import { createPlanCache, planCacheKey, schemaVersion } from './plan_cache.js';
+import { createStubClient } from './llm_stub.js';
 
 const [,, sectionsPath, mappingPath, schemaPath, outPath] = process.argv;
 if (!sectionsPath || !mappingPath || !schemaPath || !outPath) {
@@ -10,10 +12,29 @@ if (!sectionsPath || !mappingPath || !schemaPath || !outPath) {
 
 const sections = JSON.parse(readText(sectionsPath)).sections;
 const mapping = JSON.parse(readText(mappingPath));
+const schemaVer = schemaVersion(readText(schemaPath));
 
 // LLM初期化（環境変数がない場合はnull）
+// LLM_BACKEND=stub でオフラインの決定的スタブを使用（ベンチマーク用）
 const apiKey = process.env.ANTHROPIC_API_KEY;
-const anthropic = apiKey ? new Anthropic({ apiKey }) : null;
+const llmBackend = process.env.LLM_BACKEND || (apiKey ? 'anthropic' : 'none');
+const anthropic = llmBackend === 'stub'
+  ? createStubClient({ latencyMs: Number(process.env.LLM_STUB_LATENCY_MS || 0) })
+  : (llmBackend === 'anthropic' && apiKey ? new Anthropic({ apiKey }) : null);
+
+const MODEL_SETTINGS = { model: 'claude-3-5-haiku-20241022', max_tokens: 1024 };
+
+// セクション単位のプランキャッシュ（PLAN_CACHE=file|memory|off）
+const planCache = createPlanCache(process.env.PLAN_CACHE || 'file', {
+  dir: process.env.PLAN_CACHE_DIR || 'output/.plan_cache'
+});
+// LLMエラー時のフォールバック結果はキャッシュしない
+const degraded = new WeakSet();
+const llmFallback = (sec, tpl) => {
+  const fields = fallbackExtraction(sec, tpl);
+  degraded.add(fields);
+  return fields;
+};
 
 // 簡易テンプレ制約(MVP)
 const constraintsByTpl = {
@@ -252,8 +273,7 @@ JSON形式で出力してください：
 
   try {
     const message = await anthropic.messages.create({
-      model: 'claude-3-5-haiku-20241022',
-      max_tokens: 1024,
+      ...MODEL_SETTINGS,
       messages: [{
         role: 'user',
         content: prompt
@@ -269,11 +289,11 @@ JSON形式で出力してください：
       return result;
     } else {
       console.log(`  ⚠ JSON解析失敗、フォールバック: ${sec.id}`);
-      return fallbackExtraction(sec, tpl);
+      return llmFallback(sec, tpl);
     }
   } catch (error) {
     console.error(`  ✗ LLMエラー、フォールバック: ${sec.id}`, error.message);
-    return fallbackExtraction(sec, tpl);
+    return llmFallback(sec, tpl);
   }
 }
 
@@ -362,12 +382,24 @@ const estimateLines = (tpl, fields) => {
 
 // メイン処理
 (async () => {
-  console.log(`LLMモード: ${anthropic ? '有効（ANTHROPIC_API_KEY設定済み）' : '無効（フォールバック）'}\n`);
+  const llmLabel = llmBackend === 'stub' ? '有効（スタブ）' : '有効（ANTHROPIC_API_KEY設定済み）';
+  console.log(`LLMモード: ${anthropic ? llmLabel : '無効（フォールバック）'}`);
+  console.log(`プランキャッシュ: ${planCache.name}\n`);
 
+  const modelSettings = { backend: anthropic ? llmBackend : 'none', ...MODEL_SETTINGS };
   const plans = [];
   for (const sec of sections) {
     const template = chooseTemplate(sec);
-    const fields = await toFields(template, sec);
+    const key = planCacheKey({
+      sec,
+      mappingEntry: mapping[sec.intent] || mapping.point,
+      schemaVersion: schemaVer,
+      modelSettings
+    });
+    const fields = await planCache.getOrCompute(key, async () => {
+      const value = await toFields(template, sec);
+      return { value, cacheable: !degraded.has(value) };
+    });
     const cr = constraintsByTpl[template] || { maxCharsPerLine: 26, maxLines: 6 };
     const estimatedLines = estimateLines(template, fields);
     const visualScore = Math.max(50, 100 - Math.max(0, estimatedLines - cr.maxLines) * 10);
@@ -387,5 +419,6 @@ const estimateLines = (tpl, fields) => {
   }
 
   writeJSON(outPath, { slides: plans });
-  console.log(`\nPlanned ${plans.length} slides -> ${outPath}`);
+  console.log(`\nキャッシュ: hit ${planCache.stats.hits}, miss ${planCache.stats.misses}`);
+  console.log(`Planned ${plans.length} slides -> ${outPath}`);
 })();
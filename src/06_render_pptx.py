@@ -8,17 +8,33 @@ slides_plan.jsonをもとにPowerPointテンプレートを使ってスライド
 import json
 import sys
 import os
+import time
+from collections import namedtuple
+from contextlib import nullcontext
 from pathlib import Path
 from pptx import Presentation
 from pptx.util import Inches, Pt
-import shutil
 from lxml import etree
+from stream_save import parallel_save, stream_save
+from plan_binary import is_binary_plan, read_plan_binary
+from validate_plan import DEFAULT_SCHEMA_PATH, load_schema, validate_plan
+from slide_store import open_slide_store, restore_slide, slide_store_key, snapshot_slide, template_fingerprint
+from mem_profile import MemoryBudgetExceeded, MemoryProfiler, format_report, phase, track_slide
+
+# スライドに入れる内容（テンプレートに依存しない中間表現）
+SlideModel = namedtuple('SlideModel', 'min_shapes texts')
 
 def load_json(filepath):
     """JSONファイルを読み込み"""
     with open(filepath, 'r', encoding='utf-8') as f:
         return json.load(f)
 
+def load_plan(filepath):
+    """プランを読み込み（JSON または バイナリプラン .yplan）"""
+    if is_binary_plan(filepath):
+        return read_plan_binary(filepath)
+    return load_json(filepath)
+
 def get_template_slide_index(template_name, item_count=0):
     """
     テンプレート名からテンプレートスライドのインデックスを取得
@@ -298,144 +314,336 @@ def set_shape_text_lines(shape, lines):
         import traceback
         traceback.print_exc()
 
-def fill_slide_content(slide, fields, template_idx):
-    """スライドの内容を埋める"""
-    shapes = list(slide.shapes)
+def build_slide_model(fields, template_idx):
+    """
+    スライドに入れる内容をテンプレートに依存しない形にまとめる
+    （タイトルの選択・行数の切り詰め・手順の番号付けなど、プラン側の処理はここで済ませる）
 
+    Returns:
+        SlideModel: min_shapes（必要な図形数）と texts [(図形番号, 'text' or 'lines', 内容)]
+    """
     if template_idx == 0:
         # 強調メッセージスライド (shapes[0] = メッセージ)
-        if len(shapes) > 0:
-            message = fields.get('title') or fields.get('message', '')
-            if fields.get('subtitle'):
-                message = f"{fields['title']}\n{fields['subtitle']}"
-            set_shape_text(shapes[0], message)
+        message = fields.get('title') or fields.get('message', '')
+        if fields.get('subtitle'):
+            message = f"{fields['title']}\n{fields['subtitle']}"
+        return SlideModel(1, [(0, 'text', message)])
 
     elif template_idx in [1, 2, 3]:
         # リストスライド（shapes[0] = タイトル, shapes[1] = コンテンツ）
-        if len(shapes) >= 2:
-            # タイトル
-            title = fields.get('title', '')
-            if fields.get('term'):
-                title = fields['term']
-            set_shape_text(shapes[0], title)
-
-            # コンテンツ（各行を個別のパラグラフに）
-            max_items = [3, 4, 5][template_idx - 1]
-            content_lines = []
-
-            if 'items' in fields:
-                content_lines = fields['items'][:max_items]
-            elif 'steps' in fields:
-                content_lines = [f"{i+1}. {step}" for i, step in enumerate(fields['steps'][:max_items])]
-            elif 'points' in fields:
-                content_lines = fields['points'][:max_items]
-            elif 'desc' in fields:
-                content_lines = [fields['desc']]
-
-            # 複数行を個別のパラグラフとして設定
-            set_shape_text_lines(shapes[1], content_lines)
+        # タイトル
+        title = fields.get('title', '')
+        if fields.get('term'):
+            title = fields['term']
+
+        # コンテンツ（各行を個別のパラグラフに）
+        max_items = [3, 4, 5][template_idx - 1]
+        content_lines = []
+
+        if 'items' in fields:
+            content_lines = fields['items'][:max_items]
+        elif 'steps' in fields:
+            content_lines = [f"{i+1}. {step}" for i, step in enumerate(fields['steps'][:max_items])]
+        elif 'points' in fields:
+            content_lines = fields['points'][:max_items]
+        elif 'desc' in fields:
+            content_lines = [fields['desc']]
+
+        return SlideModel(2, [(0, 'text', title), (1, 'lines', content_lines)])
 
     elif template_idx in [4, 5, 6, 7, 8, 9]:
         # イラスト/スクリーンショットスライド
-        if len(shapes) >= 1:
-            title = fields.get('title', '')
-            set_shape_text(shapes[0], title)
+        return SlideModel(1, [(0, 'text', fields.get('title', ''))])
 
-def generate_pptx(slides_plan_path, template_path, output_path):
-    """PowerPointスライドを生成"""
-    # slides_plan.jsonまたはtuned.jsonを読み込み
-    plan_data = load_json(slides_plan_path)
+    return SlideModel(0, [])
 
-    # チューニング済みの場合は slidesWithTuning を使用
+def apply_slide_model(slide, model):
+    """build_slide_model の内容をスライドの図形に設定"""
+    shapes = list(slide.shapes)
+    if not model.texts or len(shapes) < model.min_shapes:
+        return
+    for shape_idx, kind, value in model.texts:
+        if kind == 'lines':
+            # 複数行を個別のパラグラフとして設定
+            set_shape_text_lines(shapes[shape_idx], value)
+        else:
+            set_shape_text(shapes[shape_idx], value)
+
+def fill_slide_content(slide, fields, template_idx):
+    """スライドの内容を埋める"""
+    apply_slide_model(slide, build_slide_model(fields, template_idx))
+
+def get_slides_data(plan_data):
+    """プランデータからスライド一覧を取得（チューニング済みの場合は slidesWithTuning を使用）"""
     if 'slidesWithTuning' in plan_data:
-        slides_data = plan_data['slidesWithTuning']
-    else:
-        slides_data = plan_data.get('slides', [])
+        return plan_data['slidesWithTuning']
+    return plan_data.get('slides', [])
+
+def count_items(fields):
+    """fieldsの項目数（items/steps/points）を取得"""
+    if 'items' in fields:
+        return len(fields['items'])
+    elif 'steps' in fields:
+        return len(fields['steps'])
+    elif 'points' in fields:
+        return len(fields['points'])
+    return 0
+
+def resolve_templates(slides_data):
+    """
+    各スライドプランのテンプレートスライドを決定
 
-    # テンプレートを読み込み
-    if not os.path.exists(template_path):
-        print(f"Error: Template file not found: {template_path}")
-        sys.exit(1)
+    Returns:
+        list: [(template_name, fields, item_count, template_idx), ...]
+    """
+    resolved = []
+    for slide_plan in slides_data:
+        template_name = slide_plan.get('template', 'bullets')
+        fields = slide_plan.get('fields', {})
+        item_count = count_items(fields)
+        template_idx = get_template_slide_index(template_name, item_count)
+        resolved.append((template_name, fields, item_count, template_idx))
+    return resolved
+
+def build_presentation(resolved, template_path, slide_store=None, shards=1, profiler=None):
+    """
+    テンプレートを読み込んでスライドを生成し、元のテンプレートスライドを取り除いたPresentationを返す（保存はしない）
+    slide_store・shards・profiler は render_pptx と同じ
+    """
+    with phase(profiler, 'open'):
+        prs = Presentation(template_path)
 
-    # テンプレートをコピーして作業用ファイルを作成
-    temp_path = output_path + '.temp.pptx'
-    shutil.copy2(template_path, temp_path)
+    # テンプレートスライドの数を保存
+    num_template_slides = len(prs.slides)
+    print(f"Template has {num_template_slides} slides")
 
-    try:
-        # 作業用ファイルを開く
-        prs = Presentation(temp_path)
-
-        # テンプレートスライドの数を保存
-        num_template_slides = len(prs.slides)
-        print(f"Template has {num_template_slides} slides")
-
-        # 各スライドプランに対してスライドを生成
-        new_slides = []
-        for idx, slide_plan in enumerate(slides_data):
-            template_name = slide_plan.get('template', 'bullets')
-            fields = slide_plan.get('fields', {})
-
-            # 項目数を取得
-            item_count = 0
-            if 'items' in fields:
-                item_count = len(fields['items'])
-            elif 'steps' in fields:
-                item_count = len(fields['steps'])
-            elif 'points' in fields:
-                item_count = len(fields['points'])
-
-            # テンプレートスライドのインデックスを取得
-            template_idx = get_template_slide_index(template_name, item_count)
+    fingerprint = template_fingerprint(template_path) if slide_store is not None else None
+
+    # 各スライドプランに対してスライドを生成
+    if shards > 1:
+        from shard_render import render_sharded
+        with phase(profiler, 'slides'):
+            render_sharded(prs, resolved, template_path, shards, slide_store=slide_store)
+    else:
+        with phase(profiler, 'slides'):
+            _build_slides(prs, resolved, num_template_slides, fingerprint, slide_store, profiler)
+
+    # 元のテンプレートスライドを削除
+    print(f"Removing {num_template_slides} template slides...")
+    with phase(profiler, 'cleanup'):
+        remove_template_slides(prs, num_template_slides)
+
+    return prs
+
+def _build_slides(prs, resolved, num_template_slides, fingerprint, slide_store, profiler):
+    """テンプレートスライドを複製して内容を埋める（profiler があればスライドごとに記録）"""
+    parts_by_name = None
+    new_slides = []
+    for idx, (template_name, fields, item_count, template_idx) in enumerate(resolved):
+        with track_slide(profiler, idx + 1):
             print(f"Slide {idx + 1}: Using template {template_idx + 1} for '{template_name}' with {item_count} items")
 
-            # テンプレートスライドを複製
             if template_idx < num_template_slides:
+                store_key = slide_store_key(fingerprint, template_idx, fields) if slide_store is not None else None
+                start = time.perf_counter()
+                cached = slide_store.get(store_key) if slide_store is not None else None
+                if cached is not None:
+                    # 生成済みのスライドをストアから組み立て
+                    if parts_by_name is None:
+                        parts_by_name = {str(p.partname): p for p in prs.part.package.iter_parts()}
+                    new_slides.append(restore_slide(prs, cached, parts_by_name))
+                    slide_store.note_restore(cached, time.perf_counter() - start)
+                    continue
+
+                # テンプレートスライドを複製
                 new_slide = duplicate_slide(prs, template_idx)
                 new_slides.append(new_slide)
 
                 # 内容を埋める
                 fill_slide_content(new_slide, fields, template_idx)
+                if slide_store is not None:
+                    entry = snapshot_slide(new_slide)
+                    entry['render_seconds'] = time.perf_counter() - start
+                    slide_store.put(store_key, entry)
             else:
                 print(f"Warning: Template index {template_idx} out of range")
 
-        # 元のテンプレートスライドを削除
-        print(f"Removing {num_template_slides} template slides...")
-        for i in range(num_template_slides):
-            # 常に最初のスライドを削除（削除するとインデックスがずれるため）
-            rId = prs.slides._sldIdLst[0].rId
-            prs.part.drop_rel(rId)
-            del prs.slides._sldIdLst[0]
+    return new_slides
 
-        # 出力ディレクトリを作成
-        output_dir = os.path.dirname(output_path)
-        if output_dir:
-            os.makedirs(output_dir, exist_ok=True)
+def remove_template_slides(prs, num_template_slides):
+    """先頭の num_template_slides 枚（複製元のテンプレートスライド）を削除"""
+    for i in range(num_template_slides):
+        # 常に最初のスライドを削除（削除するとインデックスがずれるため）
+        rId = prs.slides._sldIdLst[0].rId
+        prs.part.drop_rel(rId)
+        del prs.slides._sldIdLst[0]
 
-        # PowerPointファイルを保存
+def save_presentation(prs, output_path, source_path=None, streaming=False, deterministic=False, parallel=False,
+                      compresslevel=None):
+    """
+    Presentationを保存（streaming・deterministic・parallel・compresslevel は render_pptx と同じ）
+
+    Returns:
+        str: 出力の内容ハッシュ（deterministic=True の場合。それ以外はNone）
+    """
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    if parallel or compresslevel is not None:
+        stats = parallel_save(prs, output_path, source_path=source_path, deterministic=deterministic,
+                              compresslevel=compresslevel)
+        return stats.get('content_hash')
+    if deterministic:
+        return stream_save(prs, output_path, source_path=source_path, deterministic=True)['content_hash']
+    if streaming:
+        stream_save(prs, output_path, source_path=source_path)
+    else:
         prs.save(output_path)
-        print(f"Generated PowerPoint: {output_path} ({len(slides_data)} slides)")
+    return None
 
+def render_pptx(resolved, template_path, output_path, streaming=False, deterministic=False, slide_store=None,
+                shards=1, profiler=None, parallel=False, compresslevel=None):
+    """
+    テンプレート決定済みのスライド一覧からPowerPointを生成
+    streaming=True の場合はパーツ単位のストリーム書き込みで保存（省メモリ）
+    deterministic=True の場合は同じ入力から同じバイト列を出力し、内容のハッシュを返す
+    parallel=True の場合はZIPエントリの圧縮をスレッドプールで並列に行う（stream_save.parallel_save）
+    compresslevel は圧縮レベル（0: 無圧縮。指定すると parallel=True と同じ保存方法になる）
+    slide_store（SlideStore・SlideMemo）を渡すと、生成済みのスライドはストアから組み立てる
+    shards > 1 の場合はスライドを連続した区間に分けて複数プロセスで生成（出力は shards=1 と同じ）
+    profiler（mem_profile.MemoryProfiler）を渡すと、フェーズ（open / slides / cleanup / save）と
+    スライドごとのメモリ使用量を記録する（shards > 1 のスライドはワーカー側のため記録しない）
+    予算を超えた場合は MemoryBudgetExceeded をそのまま送出する
+
+    Returns:
+        str: 出力の内容ハッシュ（deterministic=True の場合。それ以外はNone）
+    """
+    content_hash = None
+    # テンプレートを読み込み
+    if not os.path.exists(template_path):
+        print(f"Error: Template file not found: {template_path}")
+        sys.exit(1)
+
+    try:
+        prs = build_presentation(resolved, template_path, slide_store=slide_store, shards=shards, profiler=profiler)
+
+        # PowerPointファイルを保存（未変更のパーツはテンプレートからコピー）
+        with phase(profiler, 'save'):
+            content_hash = save_presentation(prs, output_path, source_path=template_path,
+                                             streaming=streaming, deterministic=deterministic,
+                                             parallel=parallel, compresslevel=compresslevel)
+        print(f"Generated PowerPoint: {output_path} ({len(resolved)} slides)")
+        if slide_store is not None:
+            print(slide_store.summary())
+        if content_hash:
+            print(f"Content hash: {content_hash}")
+
+    except MemoryBudgetExceeded:
+        raise
     except Exception as e:
         print(f"Error generating PowerPoint: {e}")
         import traceback
         traceback.print_exc()
         sys.exit(1)
 
-    finally:
-        # 一時ファイルを削除
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+    return content_hash
+
+def check_plan(plan_data, schema_path=DEFAULT_SCHEMA_PATH):
+    """スキーマ検証（エラーがあればすべて表示して終了）"""
+    if schema_path is None or not os.path.exists(schema_path):
+        return
+    errors = validate_plan(plan_data, load_schema(str(schema_path)))
+    if errors:
+        print(f"Error: Slide plan does not match schema ({len(errors)} errors)")
+        for error in errors:
+            print(f"  {error}")
+        sys.exit(1)
+
+def generate_pptx(slides_plan_path, template_path, output_path, streaming=False, schema_path=DEFAULT_SCHEMA_PATH,
+                  deterministic=False, slide_store=None, shards=1, profiler=None, parallel=False,
+                  compresslevel=None):
+    """
+    PowerPointスライドを生成
+    profiler を渡すと、プランの読み込み（load）・スキーマ検証（validate）も含めてメモリ使用量を記録する
+
+    Returns:
+        str: 出力の内容ハッシュ（deterministic=True の場合。それ以外はNone）
+    """
+    # slides_plan.jsonまたはtuned.jsonを読み込み
+    with phase(profiler, 'load'):
+        plan_data = load_plan(slides_plan_path)
+
+    # テンプレートを開く前にスキーマ検証
+    with phase(profiler, 'validate'):
+        check_plan(plan_data, schema_path)
+    slides_data = get_slides_data(plan_data)
+
+    return render_pptx(resolve_templates(slides_data), template_path, output_path,
+                       streaming=streaming, deterministic=deterministic, slide_store=slide_store, shards=shards,
+                       profiler=profiler, parallel=parallel, compresslevel=compresslevel)
 
 def main():
-    if len(sys.argv) < 4:
-        print("Usage: python src/06_render_pptx.py <slides_plan.json> <template.pptx> <output.pptx>")
+    argv = sys.argv[1:]
+    shards = 1
+    if '--shards' in argv:
+        i = argv.index('--shards')
+        value = argv[i + 1] if i + 1 < len(argv) else ''
+        if not value.isdigit():
+            print("Error: --shards requires a number (0: number of CPUs)")
+            sys.exit(1)
+        shards = int(value) or os.cpu_count() or 1
+        del argv[i:i + 2]
+    mem_budget = None
+    if '--mem-budget' in argv:
+        i = argv.index('--mem-budget')
+        try:
+            mem_budget = float(argv[i + 1])
+        except (IndexError, ValueError):
+            print("Error: --mem-budget requires a number (MB)")
+            sys.exit(1)
+        del argv[i:i + 2]
+    compresslevel = None
+    if '--compress-level' in argv:
+        i = argv.index('--compress-level')
+        value = argv[i + 1] if i + 1 < len(argv) else ''
+        if not value.isdigit() or int(value) > 9:
+            print("Error: --compress-level requires a number from 0 to 9 (0: store only)")
+            sys.exit(1)
+        compresslevel = int(value)
+        del argv[i:i + 2]
+
+    args = [a for a in argv if not a.startswith('--')]
+    if len(args) < 3:
+        print("Usage: python src/06_render_pptx.py <slides_plan.json> <template.pptx> <output.pptx> [--stream] [--deterministic] [--slide-store] [--shards N] [--mem-profile] [--mem-budget MB]")
+        print("       [--parallel-save] [--compress-level 0-9]")
+        print("  --stream: save part by part to keep memory usage low")
+        print("  --deterministic: byte-identical output for identical inputs (prints the content hash)")
+        print("  --slide-store: reuse previously rendered slides (SLIDE_STORE_DIR, SLIDE_STORE_MAX_MB)")
+        print("  --shards: render slides in N worker processes (0: number of CPUs); output is identical")
+        print("  --mem-profile: report peak/retained memory per phase and per slide (tracemalloc + RSS)")
+        print("  --mem-budget: stop with a memory report (exit code 2) when RSS exceeds MB; implies --mem-profile")
+        print("  --parallel-save: compress zip entries on a thread pool (entries are written in order)")
+        print("  --compress-level: deflate level (0: store only, for intermediates reopened by 07_verify_colors.py); implies --parallel-save")
         sys.exit(1)
 
-    slides_plan_path = sys.argv[1]
-    template_path = sys.argv[2]
-    output_path = sys.argv[3]
+    slides_plan_path = args[0]
+    template_path = args[1]
+    output_path = args[2]
 
-    generate_pptx(slides_plan_path, template_path, output_path)
+    profiler = MemoryProfiler(budget_mb=mem_budget) if mem_budget or '--mem-profile' in argv else None
+    try:
+        with profiler or nullcontext():
+            generate_pptx(slides_plan_path, template_path, output_path, streaming='--stream' in sys.argv,
+                          deterministic='--deterministic' in sys.argv,
+                          slide_store=open_slide_store() if '--slide-store' in sys.argv else None, shards=shards,
+                          profiler=profiler, parallel='--parallel-save' in argv, compresslevel=compresslevel)
+    except MemoryBudgetExceeded as e:
+        print(f"Error: {e}")
+        print(format_report(e.report))
+        sys.exit(2)
+    if profiler is not None:
+        print("\n=== Memory Profile ===")
+        print(profiler.format_report())
 
 if __name__ == '__main__':
     main()
@@ -1,22 +1,44 @@
 #!/usr/bin/env python3
 """
 7. 文字色検証と修正スクリプト
-生成されたPowerPointファイルの全テキストが白色になっているか検証し、
-必要に応じて白色に修正する
+生成されたPowerPointファイルの全テキストが文字色ポリシー（config/color_policy.json）に
+沿っているか検証し、必要に応じて修正する（既定はダークテーマの白色）
 """
 
 import sys
 import os
+from contextlib import nullcontext
 from pptx import Presentation
-from lxml import etree
-
-def verify_and_fix_text_colors(pptx_path, output_path=None):
+from mem_profile import MemoryBudgetExceeded, MemoryProfiler, format_report, phase
+from stream_save import parallel_save, stream_save
+from zip_patch import save_patched
+from color_policy import (DEFAULT_POLICY_PATH, check_presentation, fixed_slide_parts, load_policy,
+                          load_slide_templates)
+
+def verify_and_fix_text_colors(pptx_path, output_path=None, streaming=False,
+                               policy_path=DEFAULT_POLICY_PATH, theme='auto', plan_path=None, fix=True,
+                               deterministic=False, full_save=False, profiler=None, parallel=False,
+                               compresslevel=None):
     """
-    PowerPointファイルの全テキスト色を検証し、白色でない場合は修正する
+    PowerPointファイルの全テキスト色を文字色ポリシーで検証し、違反があれば修正する
 
     Args:
         pptx_path: 検証対象のPowerPointファイルパス
         output_path: 出力先（Noneの場合は上書き）
+        streaming: Trueの場合はパーツ単位のストリーム書き込みで保存（省メモリ）
+        policy_path: 文字色ポリシー（config/color_policy.json）
+        theme: テーマ名、または 'auto'（スライドの背景色から判定）
+        plan_path: プラン（指定時はテンプレート別のルールを適用）
+        fix: Falseの場合は検証のみ（保存しない）
+        deterministic: Trueの場合は同じ内容から同じバイト列を出力（統計の content_hash に内容ハッシュ）
+        full_save: Trueの場合は prs.save で全パーツを書き直す
+            既定（streaming・deterministic・full_save がすべてFalse）では、修正したスライドのXMLだけを
+            書き換え、他のエントリ（メディアなど）は圧縮データのままコピーする。修正が無ければ書き込まない
+        parallel: Trueの場合は全パーツを書き直し、ZIPエントリの圧縮をスレッドプールで並列に行う
+        compresslevel: 圧縮レベル（0: 無圧縮。指定すると parallel=True と同じ保存方法になる）
+            06_render_pptx.py --compress-level 0 の中間ファイルを圧縮し直して出力する場合などに使う
+        profiler: mem_profile.MemoryProfiler。フェーズ（open / check / save）とスライドごとのメモリ使用量を記録
+            予算を超えた場合は MemoryBudgetExceeded を送出する
 
     Returns:
         dict: 検証結果の統計情報
@@ -28,106 +50,49 @@ def verify_and_fix_text_colors(pptx_path, output_path=None):
     if output_path is None:
         output_path = pptx_path
 
-    prs = Presentation(pptx_path)
-
-    stats = {
-        'total_slides': len(prs.slides),
-        'total_shapes': 0,
-        'total_paragraphs': 0,
-        'total_runs': 0,
-        'fixed_runs': 0,
-        'already_white': 0,
-        'no_color': 0,
-        'issues': []
-    }
-
-    ns = {
-        'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
-        'p': 'http://schemas.openxmlformats.org/presentationml/2006/main'
-    }
+    with phase(profiler, 'open'):
+        prs = Presentation(pptx_path)
+        try:
+            policy = load_policy(policy_path)
+        except ValueError as e:
+            print(f"Error: could not load color policy: {e}")
+            sys.exit(1)
+        templates = load_slide_templates(plan_path) if plan_path else None
 
     print(f"\n=== Color Verification Start: {pptx_path} ===\n")
 
-    for slide_idx, slide in enumerate(prs.slides, 1):
-        print(f"Slide {slide_idx}:")
-
-        for shape_idx, shape in enumerate(slide.shapes):
-            stats['total_shapes'] += 1
-
-            if not hasattr(shape, 'text_frame'):
-                continue
-
-            text_frame = shape.text_frame
-
-            for para_idx, paragraph in enumerate(text_frame.paragraphs):
-                stats['total_paragraphs'] += 1
-
-                for run_idx, run in enumerate(paragraph.runs):
-                    stats['total_runs'] += 1
-                    run_element = run._r
-
-                    # rPr（run properties）を取得または作成
-                    rPr = run_element.find('.//a:rPr', ns)
-
-                    # 現在の色情報を確認
-                    current_color = None
-                    if rPr is not None:
-                        solidFill = rPr.find('.//a:solidFill', ns)
-                        if solidFill is not None:
-                            # RGBカラー
-                            srgbClr = solidFill.find('.//a:srgbClr', ns)
-                            if srgbClr is not None:
-                                current_color = srgbClr.get('val')
-
-                            # スキームカラー
-                            schemeClr = solidFill.find('.//a:schemeClr', ns)
-                            if schemeClr is not None:
-                                current_color = f"scheme:{schemeClr.get('val')}"
-
-                    # 色の状態を判定
-                    if current_color in ['FFFFFF', 'ffffff', 'scheme:lt1', 'scheme:tx1']:
-                        stats['already_white'] += 1
-                        status = f"OK White ({current_color})"
-                        continue
-                    else:
-                        # 白色以外の色、または色指定なしを修正
-                        if current_color is None:
-                            stats['no_color'] += 1
-                            status = f"FIXED: None -> FFFFFF"
-                        else:
-                            stats['fixed_runs'] += 1
-                            status = f"FIXED: {current_color} -> FFFFFF"
-
-                        # rPrが存在しない場合は作成
-                        if rPr is None:
-                            rPr = etree.Element('{http://schemas.openxmlformats.org/drawingml/2006/main}rPr')
-                            run_element.insert(0, rPr)
-
-                        # solidFillを削除して再作成
-                        existing_solidFill = rPr.find('.//a:solidFill', ns)
-                        if existing_solidFill is not None:
-                            rPr.remove(existing_solidFill)
-
-                        # 白色のsolidFillを追加
-                        solidFill = etree.SubElement(rPr, '{http://schemas.openxmlformats.org/drawingml/2006/main}solidFill')
-                        srgbClr = etree.SubElement(solidFill, '{http://schemas.openxmlformats.org/drawingml/2006/main}srgbClr')
-                        srgbClr.set('val', 'FFFFFF')
-
-                        stats['issues'].append({
-                            'slide': slide_idx,
-                            'shape': shape_idx,
-                            'text': run.text[:30] + ('...' if len(run.text) > 30 else ''),
-                            'old_color': current_color if current_color else 'None',
-                            'new_color': 'FFFFFF'
-                        })
-
-                    if run.text.strip():  # テキストがある場合のみ表示
-                        text_preview = run.text[:30] + ('...' if len(run.text) > 30 else '')
-                        print(f"  Shape {shape_idx}, Para {para_idx}, Run {run_idx}: {status}")
-                        print(f"    Text: '{text_preview}'")
+    def report(slide_idx, shape_idx, para_idx, run_idx, run, status):
+        if shape_idx == 0 and para_idx == 0 and run_idx == 0:
+            print(f"Slide {slide_idx}:")
+        if run.text.strip():  # テキストがある場合のみ表示
+            text_preview = run.text[:30] + ('...' if len(run.text) > 30 else '')
+            print(f"  Shape {shape_idx}, Para {para_idx}, Run {run_idx}: {status}")
+            print(f"    Text: '{text_preview}'")
+
+    try:
+        with phase(profiler, 'check'):
+            stats = check_presentation(prs, policy, theme=theme, templates=templates, fix=fix, on_run=report,
+                                       profiler=profiler)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
 
     # 結果を保存
-    prs.save(output_path)
+    if fix:
+        with phase(profiler, 'save'):
+            if parallel or compresslevel is not None:
+                saved = parallel_save(prs, output_path, source_path=pptx_path, deterministic=deterministic,
+                                      compresslevel=compresslevel)
+                if deterministic:
+                    stats['content_hash'] = saved['content_hash']
+            elif deterministic:
+                stats['content_hash'] = stream_save(prs, output_path, source_path=pptx_path, deterministic=True)['content_hash']
+            elif streaming:
+                stream_save(prs, output_path, source_path=pptx_path)
+            elif full_save:
+                prs.save(output_path)
+            else:
+                stats['patch'] = save_patched(prs, pptx_path, output_path, fixed_slide_parts(prs, stats))
 
     # サマリーを表示
     print(f"\n=== Verification Summary ===")
@@ -135,40 +100,108 @@ def verify_and_fix_text_colors(pptx_path, output_path=None):
     print(f"Total Shapes: {stats['total_shapes']}")
     print(f"Total Paragraphs: {stats['total_paragraphs']}")
     print(f"Total Runs: {stats['total_runs']}")
+    print(f"Themes: {', '.join(f'{name}={count}' for name, count in sorted(stats['themes'].items()))}")
     print(f"")
-    print(f"OK Already white: {stats['already_white']}")
-    print(f"FIXED No color -> white: {stats['no_color']}")
-    print(f"FIXED Other color -> white: {stats['fixed_runs']}")
+    action = 'FIXED' if fix else 'NG'
+    print(f"OK Already compliant: {stats['compliant']}")
+    print(f"{action} No color: {stats['no_color']}")
+    print(f"{action} Other color: {stats['fixed_runs']}")
 
     if stats['fixed_runs'] > 0 or stats['no_color'] > 0:
-        print(f"\n=== Fix Details ===")
+        print(f"\n=== {'Fix' if fix else 'Violation'} Details ===")
         for issue in stats['issues']:
-            print(f"Slide {issue['slide']}, Shape {issue['shape']}: {issue['old_color']} -> {issue['new_color']}")
+            print(f"Slide {issue['slide']}, Shape {issue['shape']} ({issue['theme']}): {issue['old_color']} -> {issue['new_color']}")
             print(f"  Text: '{issue['text']}'")
 
-    print(f"\nOutput file: {output_path}")
+    if fix:
+        print(f"\nOutput file: {output_path}")
+        if stats.get('content_hash'):
+            print(f"Content hash: {stats['content_hash']}")
+        if 'patch' in stats:
+            patch = stats['patch']
+            if patch['replaced']:
+                print(f"Patched {patch['replaced']} slide parts, copied {patch['copied_raw']} entries "
+                      f"({patch['copied_bytes'] / 1024:.0f} KB) without recompression")
+            else:
+                print("No fixes needed, file not rewritten")
 
     return stats
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python src/07_verify_colors.py <input.pptx> [output.pptx]")
+    args = sys.argv[1:]
+    options = {'--theme': 'auto', '--policy': DEFAULT_POLICY_PATH, '--plan': None, '--mem-budget': None,
+               '--compress-level': None}
+    for name in options:
+        if name in args:
+            i = args.index(name)
+            if i + 1 >= len(args):
+                print(f"Error: {name} requires a value")
+                sys.exit(1)
+            options[name] = args[i + 1]
+            del args[i:i + 2]
+    paths = [a for a in args if not a.startswith('--')]
+
+    if len(paths) < 1:
+        print("Usage: python src/07_verify_colors.py <input.pptx> [output.pptx] [--stream] [--deterministic] [--full-save] [--check]")
+        print("                                      [--theme auto|<name>] [--policy config/color_policy.json] [--plan plan.json]")
+        print("                                      [--mem-profile] [--mem-budget MB] [--parallel-save] [--compress-level 0-9]")
         print("  If output.pptx is not specified, the input file will be overwritten")
+        print("  --stream: save part by part to keep memory usage low")
+        print("  --deterministic: byte-identical output for identical inputs (prints the content hash)")
+        print("  --full-save: rewrite every part (default: rewrite only the fixed slide parts)")
+        print("  --check: report violations only (do not save)")
+        print("  --theme: theme in the color policy (auto: detect from slide background)")
+        print("  --plan: apply per-template rules using the plan the deck was rendered from")
+        print("  --mem-profile: report peak/retained memory per phase and per slide (tracemalloc + RSS)")
+        print("  --mem-budget: stop with a memory report (exit code 2) when RSS exceeds MB; implies --mem-profile")
+        print("  --parallel-save: rewrite every part, compressing zip entries on a thread pool")
+        print("  --compress-level: deflate level (0: store only); implies --parallel-save")
         sys.exit(1)
 
-    input_path = sys.argv[1]
-    output_path = sys.argv[2] if len(sys.argv) >= 3 else None
-
-    stats = verify_and_fix_text_colors(input_path, output_path)
-
-    # 終了コード（修正があった場合は1を返す）
+    input_path = paths[0]
+    output_path = paths[1] if len(paths) >= 2 else None
+    fix = '--check' not in args
+
+    mem_budget = None
+    if options['--mem-budget'] is not None:
+        try:
+            mem_budget = float(options['--mem-budget'])
+        except ValueError:
+            print("Error: --mem-budget requires a number (MB)")
+            sys.exit(1)
+    compresslevel = options['--compress-level']
+    if compresslevel is not None:
+        if not compresslevel.isdigit() or int(compresslevel) > 9:
+            print("Error: --compress-level requires a number from 0 to 9 (0: store only)")
+            sys.exit(1)
+        compresslevel = int(compresslevel)
+    profiler = MemoryProfiler(budget_mb=mem_budget) if mem_budget or '--mem-profile' in args else None
+    try:
+        with profiler or nullcontext():
+            stats = verify_and_fix_text_colors(input_path, output_path, streaming='--stream' in args,
+                                               policy_path=options['--policy'], theme=options['--theme'],
+                                               plan_path=options['--plan'], fix=fix,
+                                               deterministic='--deterministic' in args,
+                                               full_save='--full-save' in args, profiler=profiler,
+                                               parallel='--parallel-save' in args, compresslevel=compresslevel)
+    except MemoryBudgetExceeded as e:
+        print(f"Error: {e}")
+        print(format_report(e.report))
+        sys.exit(2)
+    if profiler is not None:
+        print("\n=== Memory Profile ===")
+        print(profiler.format_report())
+
+    # 終了コード（修正・違反があった場合は1を返す）
     total_fixed = stats['fixed_runs'] + stats['no_color']
     exit_code = 1 if total_fixed > 0 else 0
 
     if exit_code == 0:
         print("\nOK All text colors are correct")
-    else:
+    elif fix:
         print(f"\nOK Fixed {total_fixed} locations")
+    else:
+        print(f"\nNG {total_fixed} locations violate the color policy")
 
     sys.exit(exit_code)
 
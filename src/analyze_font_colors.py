@@ -6,6 +6,7 @@
 import sys
 from pptx import Presentation
 from pptx.enum.dml import MSO_THEME_COLOR
+from style_resolver import StyleResolver
 
 def analyze_fonts(pptx_path, slide_index=1):
     """スライドのフォント色を分析"""
@@ -16,6 +17,7 @@ def analyze_fonts(pptx_path, slide_index=1):
         return
 
     slide = prs.slides[slide_index]
+    resolver = StyleResolver()
 
     print(f"\n{'='*70}")
     print(f"ファイル: {pptx_path}")
@@ -53,6 +55,11 @@ def analyze_fonts(pptx_path, slide_index=1):
                                 except:
                                     print(f"    color.theme_color: (取得不可)")
 
+                        # 継承チェーンを解決した実効スタイル
+                        style = resolver.resolve(slide, shape, para, run)
+                        print(f"    実効: font={style.latin}/{style.ea} size={style.size} bold={style.bold}")
+                        print(f"    実効: color={style.color} ({style.color_ref}, from {style.color_from})")
+
 if __name__ == '__main__':
     if len(sys.argv) < 2:
         print("Usage: python src/analyze_font_colors.py <file.pptx> [slide_index]")
@@ -7,6 +7,7 @@
 import sys
 from pptx import Presentation
 from pptx.util import Pt
+from style_resolver import StyleResolver, format_style
 
 def analyze_slide_detail(prs, slide_index):
     """スライドの詳細情報を分析"""
@@ -15,6 +16,7 @@ def analyze_slide_detail(prs, slide_index):
         return
 
     slide = prs.slides[slide_index]
+    resolver = StyleResolver()
 
     print(f"\n{'='*70}")
     print(f"スライド {slide_index + 1} の詳細分析")
@@ -68,6 +70,7 @@ def analyze_slide_detail(prs, slide_index):
                     print(f"          size: {font.size}")
                     print(f"          bold: {font.bold}")
                     print(f"          color: {font.color.rgb if hasattr(font.color, 'rgb') else 'N/A'}")
+                    print(f"          実効: {format_style(resolver.resolve(slide, shape, para, run))}")
 
 def analyze_master(prs):
     """スライドマスターを分析"""
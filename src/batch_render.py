@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+asyncioによるバッチ描画
+プランの読み込み・描画・出力先への書き出しを重ねて実行する
+
+    読み込み(スレッド) -> [キュー] -> 描画(プロセス/スレッドプール) -> [キュー] -> 書き出し(スレッド)
+
+- キューはすべて上限付きなので、描画が詰まると読み込みも止まりメモリが増え続けない
+- 描画は作業ディレクトリに保存し、書き出し段で出力先（sink）へコピーする
+- 出力名はプランのファイル名。別のディレクトリに同じ名前のプランがあれば _2, _3 ... を付ける
+- 生成したスライドはワーカーごとのメモリ上のLRU（slide_store.SlideMemo）に保持し、
+  同じ (テンプレート, fields) のスライドは後続のデッキでも複製・差し込みをせずに組み立てる
+"""
+
+import sys
+import os
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+import importlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from slide_store import DEFAULT_MEMO_BYTES, SlideMemo
+from deck_files import unique_names
+
+render_pptx_module = importlib.import_module('06_render_pptx')
+
+_DONE = object()
+
+
+def collect_plan_paths(inputs):
+    """引数のファイル/ディレクトリからプランJSONの一覧を作成"""
+    paths = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            paths.extend(sorted(list(p.glob('*.json')) + list(p.glob('*.yplan'))))
+        else:
+            paths.append(p)
+    return paths
+
+
+def load_plan(plan_path):
+    """プランを読み込み、テンプレートを決定済みの形にする（読み込みスレッドで実行）"""
+    plan_data = render_pptx_module.load_plan(plan_path)
+    return render_pptx_module.resolve_templates(render_pptx_module.get_slides_data(plan_data))
+
+
+_memo = None
+
+
+def get_memo(max_bytes):
+    """ワーカー内で共有するスライドのLRU（max_bytes が0ならNone）"""
+    global _memo
+    if not max_bytes:
+        return None
+    if _memo is None:
+        _memo = SlideMemo(max_bytes)
+    return _memo
+
+
+def render_job(resolved, template_path, output_path, memo_bytes=0):
+    """
+    1デッキを描画（ワーカーで実行）
+
+    Returns:
+        tuple: (出力パス, ワーカーの識別子, ワーカーのSlideMemoの統計 or None)
+    """
+    memo = get_memo(memo_bytes)
+    try:
+        render_pptx_module.render_pptx(resolved, template_path, output_path, slide_store=memo)
+    except SystemExit as e:
+        # render_pptx はエラー時に sys.exit するため、ワーカーでは例外に変換する
+        raise RuntimeError(f"render failed: {output_path} (exit {e.code})")
+    return output_path, os.getpid(), dict(memo.stats) if memo is not None else None
+
+
+def merge_memo_stats(worker_stats):
+    """ワーカーごとの最新の統計（累計値）を合計"""
+    total = {'hits': 0, 'misses': 0, 'puts': 0, 'evictions': 0, 'saved_seconds': 0.0}
+    for stats in worker_stats.values():
+        for name in total:
+            total[name] += stats[name]
+    lookups = total['hits'] + total['misses']
+    total['hit_rate'] = total['hits'] / lookups if lookups else 0.0
+    return total
+
+
+async def run_batch(plan_paths, template_path, sink_dir, workers=None, executor='process', queue_size=4,
+                    memo_bytes=DEFAULT_MEMO_BYTES):
+    """
+    プラン一覧をバッチ描画
+
+    Args:
+        plan_paths: プランJSONのパス一覧
+        template_path: テンプレートpptx
+        sink_dir: 完成したデッキの出力先ディレクトリ
+        workers: 描画ワーカー数（Noneの場合はCPU数）
+        executor: 'process' または 'thread'
+        queue_size: 各キューの上限
+        memo_bytes: ワーカーごとのスライドのLRUの上限（バイト。0なら使わない）
+
+    Returns:
+        dict: 実行結果の統計情報
+    """
+    workers = workers or os.cpu_count() or 1
+    pool_cls = ProcessPoolExecutor if executor == 'process' else ThreadPoolExecutor
+    loop = asyncio.get_running_loop()
+
+    os.makedirs(sink_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='batch-render-')
+
+    load_queue = asyncio.Queue(maxsize=queue_size)
+    write_queue = asyncio.Queue(maxsize=queue_size)
+
+    stats = {'total': len(plan_paths), 'rendered': 0, 'failed': 0, 'errors': []}
+    worker_memo_stats = {}
+    deck_names = unique_names(plan_paths)
+
+    async def loader():
+        for plan_path, deck_name in zip(plan_paths, deck_names):
+            try:
+                resolved = await asyncio.to_thread(load_plan, plan_path)
+            except Exception as e:
+                stats['failed'] += 1
+                stats['errors'].append((str(plan_path), f"load: {e}"))
+                continue
+            await load_queue.put((plan_path, deck_name, resolved))
+        for _ in range(workers):
+            await load_queue.put(_DONE)
+
+    async def renderer(pool):
+        while True:
+            item = await load_queue.get()
+            if item is _DONE:
+                break
+            plan_path, deck_name, resolved = item
+            scratch_path = os.path.join(work_dir, deck_name + '.pptx')
+            try:
+                _, worker, memo_stats = await loop.run_in_executor(
+                    pool, render_job, resolved, template_path, scratch_path, memo_bytes)
+            except Exception as e:
+                stats['failed'] += 1
+                stats['errors'].append((str(plan_path), f"render: {e}"))
+                continue
+            if memo_stats is not None:
+                # 統計は累計値なので、ワーカーごとに参照回数のいちばん多いものを残す
+                previous = worker_memo_stats.get(worker)
+                if previous is None or memo_stats['hits'] + memo_stats['misses'] > previous['hits'] + previous['misses']:
+                    worker_memo_stats[worker] = memo_stats
+            await write_queue.put((plan_path, scratch_path))
+
+    async def writer():
+        while True:
+            item = await write_queue.get()
+            if item is _DONE:
+                break
+            plan_path, scratch_path = item
+            sink_path = os.path.join(sink_dir, os.path.basename(scratch_path))
+            try:
+                await asyncio.to_thread(shutil.move, scratch_path, sink_path)
+                stats['rendered'] += 1
+                print(f"[{stats['rendered']}/{stats['total']}] {plan_path} -> {sink_path}")
+            except Exception as e:
+                stats['failed'] += 1
+                stats['errors'].append((str(plan_path), f"write: {e}"))
+
+    start = time.perf_counter()
+    try:
+        with pool_cls(max_workers=workers) as pool:
+            writer_task = asyncio.create_task(writer())
+            await asyncio.gather(loader(), *(renderer(pool) for _ in range(workers)))
+            await write_queue.put(_DONE)
+            await writer_task
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    stats['seconds'] = time.perf_counter() - start
+    stats['memo'] = merge_memo_stats(worker_memo_stats) if memo_bytes else None
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Render many slide plans to pptx concurrently')
+    parser.add_argument('template', help='template pptx')
+    parser.add_argument('sink', help='output directory for finished decks')
+    parser.add_argument('plans', nargs='+', help='plan json/yplan files or directories')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--executor', choices=['process', 'thread'], default='process')
+    parser.add_argument('--queue-size', type=int, default=4)
+    parser.add_argument('--memo-mb', type=float, default=DEFAULT_MEMO_BYTES / 1024 / 1024,
+                        help='per-worker in-memory cache of rendered slides in MB (0: disabled)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.template):
+        print(f"Error: Template file not found: {args.template}")
+        sys.exit(1)
+
+    plan_paths = collect_plan_paths(args.plans)
+    stats = asyncio.run(run_batch(plan_paths, args.template, args.sink,
+                                  workers=args.workers, executor=args.executor,
+                                  queue_size=args.queue_size, memo_bytes=int(args.memo_mb * 1024 * 1024)))
+
+    print(f"\n=== Batch Summary ===")
+    print(f"Plans: {stats['total']}")
+    print(f"Rendered: {stats['rendered']}")
+    print(f"Failed: {stats['failed']}")
+    print(f"Time: {stats['seconds']:.2f} s")
+    memo = stats['memo']
+    if memo is not None:
+        print(f"Slide memo: {memo['hits']} hits, {memo['misses']} misses ({memo['hit_rate']:.0%} hit rate), "
+              f"{memo['evictions']} evicted, {memo['saved_seconds']:.2f} s saved")
+    for path, error in stats['errors']:
+        print(f"  {path}: {error}")
+
+    sys.exit(1 if stats['failed'] else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+// プランキャッシュのオフラインベンチマーク
+// LLMスタブ（LLM_BACKEND=stub）で 04_plan.js をコールド/ウォームの2回実行して比較する
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { spawnSync } from 'child_process';
+
+const [,, sectionsPath = 'output/01_sections.json', latencyMs = '300'] = process.argv;
+
+const cacheDir = fs.mkdtempSync(path.join(os.tmpdir(), 'plan-cache-'));
+const outPath = path.join(cacheDir, 'plan.json');
+const env = {
+  ...process.env,
+  LLM_BACKEND: 'stub',
+  LLM_STUB_LATENCY_MS: latencyMs,
+  PLAN_CACHE: 'file',
+  PLAN_CACHE_DIR: cacheDir
+};
+
+const run = (label) => {
+  const t0 = process.hrtime.bigint();
+  const r = spawnSync(process.execPath, [
+    'src/04_plan.js', sectionsPath, 'config/mapping.json', 'config/slide.schema.json', outPath
+  ], { env, encoding: 'utf8' });
+  const ms = Number(process.hrtime.bigint() - t0) / 1e6;
+  if (r.status !== 0) {
+    console.error(r.stderr);
+    process.exit(r.status || 1);
+  }
+  const stats = (r.stdout.match(/キャッシュ: hit.*/) || [''])[0];
+  console.log(`${label}: ${ms.toFixed(0)} ms  ${stats}`);
+  return fs.readFileSync(outPath, 'utf8');
+};
+
+console.log(`stub latency: ${latencyMs} ms / section`);
+const cold = run('cold');
+const warm = run('warm');
+console.log(`identical output: ${cold === warm}`);
+
+fs.rmSync(cacheDir, { recursive: true, force: true });
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+保存処理のベンチマーク（prs.save・stream_save・parallel_save（並列圧縮・無圧縮）の比較）
+メディアの多いデッキを作り、それぞれ別プロセスで保存してピークメモリと時間を計測する
+"""
+
+import sys
+import os
+import json
+import time
+import resource
+import tempfile
+import subprocess
+import tracemalloc
+from pptx import Presentation
+from pptx.util import Inches
+from PIL import Image
+
+from stream_save import parallel_save, stream_save
+
+
+def build_media_deck(base_path, output_path, num_images, size=1200):
+    """ベースのデッキにノイズ画像（圧縮の効かないPNG）を追加したデッキを作成"""
+    prs = Presentation(base_path)
+    layout = prs.slides[0].slide_layout
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(num_images):
+            img_path = os.path.join(tmp, f"shot{i}.png")
+            Image.frombytes('RGB', (size, size), os.urandom(size * size * 3)).save(img_path)
+            slide = prs.slides.add_slide(layout)
+            slide.shapes.add_picture(img_path, Inches(0.5), Inches(0.5), width=Inches(9))
+    prs.save(output_path)
+
+
+def measure(mode, deck_path, output_path):
+    """子プロセス側: デッキを開いて保存し、保存中のピークメモリを計測"""
+    prs = Presentation(deck_path)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    if mode == 'stream':
+        stream_save(prs, output_path, source_path=deck_path)
+    elif mode == 'parallel':
+        parallel_save(prs, output_path, source_path=deck_path)
+    elif mode == 'store':
+        parallel_save(prs, output_path, source_path=deck_path, compresslevel=0)
+    else:
+        prs.save(output_path)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'mode': mode,
+        'seconds': seconds,
+        'tracemalloc_peak_mb': peak / 1024 / 1024,
+        # ru_maxrss はLinuxではKB単位
+        'rss_growth_mb': (rss_after - rss_before) / 1024,
+        'size_mb': os.path.getsize(output_path) / 1024 / 1024,
+    }
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == '--child':
+        print(json.dumps(measure(sys.argv[2], sys.argv[3], sys.argv[4])))
+        return
+
+    if len(sys.argv) < 2:
+        print("Usage: python src/bench_save.py <deck.pptx> [num_images]")
+        sys.exit(1)
+
+    base_path = sys.argv[1]
+    num_images = int(sys.argv[2]) if len(sys.argv) >= 3 else 20
+
+    with tempfile.TemporaryDirectory() as tmp:
+        deck_path = os.path.join(tmp, 'media_deck.pptx')
+        print(f"Building deck with {num_images} screenshots...")
+        build_media_deck(base_path, deck_path, num_images)
+        print(f"Deck size: {os.path.getsize(deck_path) / 1024 / 1024:.1f} MB\n")
+
+        print(f"{'mode':<8} {'time':>8} {'py peak':>10} {'rss growth':>11} {'size':>9}")
+        for mode in ('save', 'stream', 'parallel', 'store'):
+            out = subprocess.run(
+                [sys.executable, __file__, '--child', mode, deck_path, os.path.join(tmp, f"{mode}.pptx")],
+                capture_output=True, text=True, check=True)
+            r = json.loads(out.stdout)
+            print(f"{r['mode']:<8} {r['seconds']:>7.2f}s {r['tracemalloc_peak_mb']:>8.1f}MB {r['rss_growth_mb']:>9.1f}MB {r['size_mb']:>7.1f}MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+文字色ポリシーエンジン
+テーマ（config/theme*.css）ごと・テンプレートごと・図形の役割ごとの許可色を
+config/color_policy.json から読み込み、(テーマ, テンプレート, 役割) → ルール の表にコンパイルする
+
+- スライドのテーマは実効背景色からいちばん近いテーマを自動判定（--theme で固定も可）
+- runの色は style_resolver で継承チェーンとテーマ配色を解決した実際の色で判定
+- 複数のデッキをまとめて検証・修正できる（テーマの異なるデッキが混在してもよい）
+
+ルールの書式:
+    { "theme": "dark", "template": "cta", "role": "title", "allow": ["FFFFFF"], "fix": "FFFFFF" }
+    theme / template / role は省略するとすべてに一致。より多くのキーを指定したルールが優先（同数なら後勝ち）
+    色には "theme:title" / "theme:body" / "theme:background" でテーマCSSの色を指定できる
+    ルールの無い組み合わせは、テーマCSSの見出し色（title）・本文色（body）を許可色とする
+"""
+
+import re
+import sys
+import json
+import zipfile
+import importlib
+from pathlib import Path
+from functools import lru_cache
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from pptx import Presentation
+from pptx.exc import PackageNotFoundError
+from pptx.enum.shapes import PP_PLACEHOLDER
+from lxml import etree
+
+from style_resolver import StyleResolver
+from mem_profile import track_slide
+from zip_patch import save_patched
+from plan_binary import is_binary_plan, read_plan_binary
+from deck_files import collect_decks
+
+CONFIG_DIR = Path(__file__).resolve().parent.parent / 'config'
+DEFAULT_POLICY_PATH = CONFIG_DIR / 'color_policy.json'
+
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+ROLES = ('title', 'body')
+
+Rule = namedtuple('Rule', 'allow fix')
+
+
+# --- テーマCSS ------------------------------------------------------------------
+
+def _hex(value):
+    """'#fff' / '#1a1a1a' → 'FFFFFF' / '1A1A1A'"""
+    value = value.strip().lstrip('#')
+    if len(value) == 3:
+        value = ''.join(c * 2 for c in value)
+    return value.upper()
+
+
+@lru_cache(maxsize=None)
+def load_theme_css(css_path):
+    """
+    Marpテーマから文字色・背景色を取り出す
+
+    Returns:
+        dict: {'background': ..., 'body': ..., 'title': ...}
+    """
+    with open(css_path, 'r', encoding='utf-8') as f:
+        css = re.sub(r'/\*.*?\*/', '', f.read(), flags=re.S)
+
+    colors = {}
+    for selectors, body in re.findall(r'([^{}]+)\{([^}]*)\}', css):
+        selectors = {s.strip() for s in selectors.split(',')}
+        decls = dict(
+            (k.strip(), v.strip()) for k, v in
+            (d.split(':', 1) for d in body.split(';') if ':' in d))
+        if 'section' in selectors:
+            if 'background-color' in decls:
+                colors['background'] = _hex(decls['background-color'])
+            if 'color' in decls:
+                colors['body'] = _hex(decls['color'])
+        if 'h1' in selectors and 'color' in decls:
+            colors['title'] = _hex(decls['color'])
+    colors.setdefault('title', colors.get('body'))
+    return colors
+
+
+# --- ポリシー -------------------------------------------------------------------
+
+class ColorPolicy:
+    """コンパイル済みの文字色ポリシー"""
+
+    def __init__(self, config, base_dir=CONFIG_DIR):
+        themes = config.get('themes', {})
+        if not themes:
+            raise ValueError("color policy has no themes")
+        self.theme_colors = {name: load_theme_css(str(Path(base_dir) / spec['css']))
+                             for name, spec in themes.items()}
+        self.default_theme = config.get('defaultTheme', next(iter(themes)))
+        self._backgrounds = [(name, colors['background']) for name, colors in self.theme_colors.items()
+                             if colors.get('background')]
+        self._theme_by_background = {}
+
+        rules = config.get('rules', [])
+        for rule in rules:
+            if rule.get('theme', '*') not in ('*', *themes):
+                raise ValueError(f"color policy rule refers to unknown theme: {rule['theme']}")
+            if rule.get('role', '*') not in ('*', *ROLES):
+                raise ValueError(f"color policy rule has unknown role: {rule['role']}")
+
+        # (テーマ, テンプレート, 役割) の全組み合わせを前もって決めておく
+        templates = {'*'} | {r['template'] for r in rules if 'template' in r}
+        self.table = {}
+        for theme in themes:
+            for template in templates:
+                for role in ROLES:
+                    self.table[(theme, template, role)] = self._compile(rules, theme, template, role)
+
+    def _color(self, theme, value):
+        if value.startswith('theme:'):
+            color = self.theme_colors[theme].get(value[len('theme:'):])
+            if color is None:
+                raise ValueError(f"theme '{theme}' has no color for {value}")
+            return color
+        return _hex(value)
+
+    def _compile(self, rules, theme, template, role):
+        best, best_score = None, -1
+        for rule in rules:
+            keys = (('theme', theme), ('template', template), ('role', role))
+            if any(rule.get(k, '*') not in ('*', v) for k, v in keys):
+                continue
+            score = sum(1 for k, _ in keys if k in rule)
+            if score >= best_score:
+                best, best_score = rule, score
+        if best is None:
+            default = self.theme_colors[theme].get(role)
+            if default is None:
+                # None を許可色にすると、どの色も修正されなくなる
+                raise ValueError(f"theme '{theme}' has no color for role '{role}' and no color policy rule covers it")
+            return Rule(frozenset([default]), default)
+        allow = frozenset(self._color(theme, c) for c in best.get('allow', []))
+        fix = self._color(theme, best['fix']) if best.get('fix') else None
+        return Rule(allow, fix)
+
+    def lookup(self, theme, template, role):
+        """ルールを取得（テンプレート固有のルールが無ければ '*' を使う）"""
+        return self.table.get((theme, template, role)) or self.table[(theme, '*', role)]
+
+    def theme_for_background(self, background):
+        """背景色にいちばん近いテーマ名"""
+        if background is None or not self._backgrounds:
+            return self.default_theme
+        theme = self._theme_by_background.get(background)
+        if theme is None:
+            rgb = [int(background[i:i + 2], 16) for i in (0, 2, 4)]
+
+            def distance(item):
+                other = [int(item[1][i:i + 2], 16) for i in (0, 2, 4)]
+                return sum((a - b) ** 2 for a, b in zip(rgb, other))
+            theme = self._theme_by_background[background] = min(self._backgrounds, key=distance)[0]
+        return theme
+
+
+@lru_cache(maxsize=None)
+def load_policy(policy_path=DEFAULT_POLICY_PATH):
+    """ポリシーファイルを読み込んでコンパイル（同じパスは1回だけ）"""
+    policy_path = Path(policy_path)
+    with open(policy_path, 'r', encoding='utf-8') as f:
+        return ColorPolicy(json.load(f), base_dir=policy_path.parent)
+
+
+def load_slide_templates(plan_path):
+    """プランから各スライドのテンプレート名を取得（生成デッキのスライド順と同じ）"""
+    if is_binary_plan(plan_path):
+        plan_data = read_plan_binary(plan_path)
+    else:
+        with open(plan_path, 'r', encoding='utf-8') as f:
+            plan_data = json.load(f)
+    render_pptx_module = importlib.import_module('06_render_pptx')
+    return [template_name for template_name, *_ in
+            render_pptx_module.resolve_templates(render_pptx_module.get_slides_data(plan_data))]
+
+
+# --- 検証・修正 -----------------------------------------------------------------
+
+def shape_role(shape, shape_idx):
+    """図形の役割: タイトルのプレースホルダー、またはテンプレートの先頭図形（タイトル枠）は title"""
+    if shape.is_placeholder and shape.placeholder_format.type in (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE):
+        return 'title'
+    return 'title' if shape_idx == 0 else 'body'
+
+
+def set_run_color(run_element, color):
+    """runの文字色を指定のRGBに設定（既存のsolidFillは置き換え）"""
+    rPr = run_element.find(A + 'rPr')
+    if rPr is None:
+        rPr = etree.Element(A + 'rPr')
+        run_element.insert(0, rPr)
+    existing = rPr.find(A + 'solidFill')
+    if existing is not None:
+        rPr.remove(existing)
+    # スキーマ上 solidFill は ln の直後（latin/ea より前）
+    solidFill = etree.Element(A + 'solidFill')
+    rPr.insert(1 if rPr.find(A + 'ln') is not None else 0, solidFill)
+    srgbClr = etree.SubElement(solidFill, A + 'srgbClr')
+    srgbClr.set('val', color)
+
+
+def check_presentation(prs, policy, theme='auto', templates=None, fix=True, resolver=None, on_run=None,
+                       profiler=None):
+    """
+    Presentationの全runをポリシーで検証（fix=True なら違反を修正）
+
+    Args:
+        theme: テーマ名、または 'auto'（スライドごとに背景色から判定）
+        templates: スライドごとのテンプレート名（load_slide_templatesの結果）。Noneなら '*' のルールのみ
+        on_run: runごとに呼ばれる関数 (slide_idx, shape_idx, para_idx, run_idx, run, status)
+        profiler: mem_profile.MemoryProfiler（スライドごとのメモリ使用量を記録）
+
+    Returns:
+        dict: 検証結果の統計情報（fixed_slides は修正したスライドの番号）
+    """
+    if theme != 'auto' and theme not in policy.theme_colors:
+        raise ValueError(f"Unknown theme: {theme}")
+    resolver = resolver or StyleResolver()
+    stats = {
+        'total_slides': len(prs.slides),
+        'total_shapes': 0,
+        'total_paragraphs': 0,
+        'total_runs': 0,
+        'compliant': 0,
+        'fixed_runs': 0,
+        'no_color': 0,
+        'themes': Counter(),
+        'issues': [],
+        'fixed_slides': [],
+    }
+
+    for slide_idx, slide in enumerate(prs.slides, 1):
+        with track_slide(profiler, slide_idx):
+            slide_theme = policy.theme_for_background(resolver.background(slide)) if theme == 'auto' else theme
+            stats['themes'][slide_theme] += 1
+            template = templates[slide_idx - 1] if templates and slide_idx <= len(templates) else '*'
+
+            for shape_idx, shape in enumerate(slide.shapes):
+                stats['total_shapes'] += 1
+                if not getattr(shape, 'has_text_frame', False):
+                    continue
+                rule = policy.lookup(slide_theme, template, shape_role(shape, shape_idx))
+                shape_cache = {}
+
+                for para_idx, paragraph in enumerate(shape.text_frame.paragraphs):
+                    stats['total_paragraphs'] += 1
+                    for run_idx, run in enumerate(paragraph.runs):
+                        stats['total_runs'] += 1
+                        style = resolver.resolve(slide, shape, paragraph, run, shape_cache)
+                        current = style.color
+
+                        if current in rule.allow:
+                            stats['compliant'] += 1
+                            status = f"OK {current}"
+                        else:
+                            # run自身に色指定が無い（継承した色）場合は「色指定なし」として数える
+                            ref = style.color_ref if style.color_ref and style.color_ref != current else None
+                            label = f"{ref} (#{current})" if ref else current
+                            if style.color_from != 'run':
+                                stats['no_color'] += 1
+                                label = f"None (inherited {label})" if label else 'None'
+                            else:
+                                stats['fixed_runs'] += 1
+                            new_color = rule.fix if fix else None
+                            if new_color:
+                                set_run_color(run._r, new_color)
+                                if slide_idx not in stats['fixed_slides']:
+                                    stats['fixed_slides'].append(slide_idx)
+                            expected = new_color or ' | '.join(sorted(rule.allow))
+                            status = f"{'FIXED' if new_color else 'NG'}: {label} -> {expected}"
+                            stats['issues'].append({
+                                'slide': slide_idx,
+                                'shape': shape_idx,
+                                'theme': slide_theme,
+                                'text': run.text[:30] + ('...' if len(run.text) > 30 else ''),
+                                'old_color': label,
+                                'new_color': expected,
+                            })
+
+                        if on_run is not None:
+                            on_run(slide_idx, shape_idx, para_idx, run_idx, run, status)
+
+    return stats
+
+
+def fixed_slide_parts(prs, stats):
+    """check_presentation で修正したスライドのパーツ（save_patched に渡す）"""
+    slides = list(prs.slides)
+    return [slides[idx - 1].part for idx in stats['fixed_slides']]
+
+
+# --- 一括処理 -------------------------------------------------------------------
+
+_worker_policy = None
+
+
+def _init_worker(policy_path):
+    # ワーカーごとにポリシーを一度だけコンパイル
+    global _worker_policy
+    _worker_policy = load_policy(policy_path)
+
+
+def _check_file(job):
+    pptx_path, theme, plan_path, fix = job
+    try:
+        prs = Presentation(pptx_path)
+        templates = load_slide_templates(plan_path) if plan_path else None
+        stats = check_presentation(prs, _worker_policy, theme=theme, templates=templates, fix=fix)
+        if stats['fixed_slides']:
+            save_patched(prs, pptx_path, pptx_path, fixed_slide_parts(prs, stats))
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile, PackageNotFoundError) as e:
+        # 開けないデッキはエラーとして報告し、残りのデッキの検証は続ける
+        return pptx_path, {'error': str(e)}
+    return pptx_path, stats
+
+
+def check_paths(pptx_paths, policy_path=DEFAULT_POLICY_PATH, theme='auto', plan_path=None, fix=False, workers=None):
+    """
+    複数のデッキをまとめて検証（fix=True なら上書き修正）
+
+    Returns:
+        dict: {デッキのパス: 統計情報（失敗時は {'error': ...}）}
+    """
+    jobs = [(str(p), theme, plan_path, fix) for p in pptx_paths]
+    if len(jobs) <= 1:
+        _init_worker(policy_path)
+        results = map(_check_file, jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(policy_path),))
+        with pool:
+            results = list(pool.map(_check_file, jobs))
+    return dict(results)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python src/color_policy.py <deck.pptx|dir> [...] [--fix] [--theme auto|<name>] [--policy config/color_policy.json] [--plan plan.json]")
+        sys.exit(1)
+
+    args = sys.argv[1:]
+    options = {'--theme': 'auto', '--policy': DEFAULT_POLICY_PATH, '--plan': None}
+    for name in options:
+        if name in args:
+            i = args.index(name)
+            if i + 1 >= len(args):
+                print(f"Error: {name} requires a value")
+                sys.exit(1)
+            options[name] = args[i + 1]
+            del args[i:i + 2]
+    fix = '--fix' in args
+    args = [a for a in args if a != '--fix']
+
+    try:
+        load_policy(options['--policy'])
+    except (OSError, ValueError) as e:
+        print(f"Error: could not load color policy: {e}")
+        sys.exit(1)
+
+    pptx_paths = collect_decks(args)
+
+    results = check_paths(pptx_paths, options['--policy'], options['--theme'], options['--plan'], fix=fix)
+
+    failed = 0
+    for path, stats in results.items():
+        if 'error' in stats:
+            failed += 1
+            print(f"{path}: error: {stats['error']}")
+            continue
+        themes = ', '.join(f"{name}={count}" for name, count in sorted(stats['themes'].items()))
+        issues = stats['issues']
+        print(f"{path}: {stats['total_runs']} runs, {len(issues)} {'fixed' if fix else 'violations'} (themes: {themes})")
+        for issue in issues:
+            print(f"  Slide {issue['slide']}, Shape {issue['shape']}: {issue['old_color']} -> {issue['new_color']}  '{issue['text']}'")
+        if issues and not fix:
+            failed += 1
+
+    print(f"\nChecked {len(pptx_paths)} decks: {len(pptx_paths) - failed} OK, {failed} with problems")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
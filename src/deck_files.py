@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+デッキ（pptx）を一括で扱うツールの共通処理
+- collect_decks: 引数のファイル/ディレクトリからデッキの一覧を作る
+  （Officeのロックファイル ~$*.pptx と保存途中の一時ファイル *.temp.pptx は除く）
+- unique_names: 出力名（拡張子なし）。別のディレクトリに同じ名前があれば _2, _3 ... を付ける
+"""
+
+import sys
+from pathlib import Path
+
+
+def is_deck_file(path):
+    """ディレクトリから拾ってよいpptxか（ロックファイル・一時ファイルは除く）"""
+    name = Path(path).name
+    return name.endswith('.pptx') and not name.startswith('~$') and not name.endswith('.temp.pptx')
+
+
+def collect_decks(items, recursive=False):
+    """
+    引数のファイル/ディレクトリからデッキの一覧を作成
+    ファイルで指定されたものはそのまま使い、存在しなければエラー終了する
+
+    Args:
+        items: pptxファイル または pptxを含むディレクトリの一覧
+        recursive: ディレクトリをサブディレクトリまで探す
+
+    Returns:
+        list: Path の一覧（ディレクトリごとに名前順）
+    """
+    deck_paths = []
+    for item in items:
+        p = Path(item)
+        if p.is_dir():
+            found = p.rglob('*.pptx') if recursive else p.glob('*.pptx')
+            deck_paths.extend(sorted(x for x in found if is_deck_file(x)))
+        elif p.exists():
+            deck_paths.append(p)
+        else:
+            print(f"Error: File not found: {item}")
+            sys.exit(1)
+    return deck_paths
+
+
+def unique_names(paths):
+    """パスごとの出力名（ファイル名の拡張子なし）。重なる場合は2つ目以降に _2, _3 ... を付ける"""
+    names, used_names = [], set()
+    for path in paths:
+        stem = name = Path(path).stem
+        suffix = 1
+        while name in used_names:
+            suffix += 1
+            name = f"{stem}_{suffix}"
+        used_names.add(name)
+        names.append(name)
+    return names
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+生成済みデッキの全文検索インデックス
+pptx のZIPから ppt/slides/*.xml を直接読み（python-pptxのオブジェクトは作らない）、
+図形ごとのテキストを SQLite FTS5 に (デッキ, スライド番号, 図形番号) の位置つきで登録する
+
+- 差分更新: mtime とサイズが同じデッキは読まない。変わっていても内容のハッシュが同じなら再抽出しない
+- 日本語は分かち書きしないため trigram トークナイザを使う（2文字以下の検索は全件走査で代用）
+- 消えたデッキ（インデックス対象のディレクトリ内）はインデックスから削除
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import hashlib
+import zipfile
+import posixpath
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+
+from deck_files import is_deck_file
+
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / 'output' / '.deck_index.sqlite'
+
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+R_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+REL = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS decks (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    slides INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS shapes USING fts5(
+    text, deck UNINDEXED, slide UNINDEXED, shape UNINDEXED, name UNINDEXED,
+    tokenize = 'trigram'
+);
+"""
+
+
+# --- テキスト抽出 ---------------------------------------------------------------
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _slide_names(zf):
+    """プレゼンテーションでの表示順にスライドのパーツ名を返す"""
+    presentation = etree.fromstring(zf.read('ppt/presentation.xml'))
+    rels = etree.fromstring(zf.read('ppt/_rels/presentation.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(REL)}
+    names = []
+    for sld_id in presentation.iter(P + 'sldId'):
+        target = targets.get(sld_id.get(R_ID))
+        if target:
+            names.append(target.lstrip('/') if target.startswith('/') else posixpath.normpath('ppt/' + target))
+    return names
+
+
+def _shape_text(shape):
+    """図形内の全段落のテキスト（段落は改行で区切る）"""
+    paragraphs = []
+    for p in shape.iter(A + 'p'):
+        paragraphs.append(''.join(t.text or '' for t in p.iter(A + 't')))
+    return '\n'.join(paragraphs).strip()
+
+
+def extract_deck(path):
+    """
+    デッキから図形ごとのテキストを取り出す
+
+    Returns:
+        tuple: (スライド数, [(スライド番号, 図形番号, 図形名, テキスト), ...])
+    """
+    records = []
+    with zipfile.ZipFile(path) as zf:
+        slide_names = _slide_names(zf)
+        for slide_no, name in enumerate(slide_names, 1):
+            tree = etree.fromstring(zf.read(name))
+            sp_tree = tree.find(P + 'cSld/' + P + 'spTree')
+            if sp_tree is None:
+                continue
+            shape_idx = 0
+            for shape in sp_tree:
+                tag = etree.QName(shape).localname
+                if tag in ('nvGrpSpPr', 'grpSpPr', 'extLst'):
+                    continue
+                text = _shape_text(shape)
+                if text:
+                    c_nv_pr = shape.find('.//' + P + 'cNvPr')
+                    shape_name = c_nv_pr.get('name', '') if c_nv_pr is not None else ''
+                    records.append((slide_no, shape_idx, shape_name, text))
+                shape_idx += 1
+    return len(slide_names), records
+
+
+def _extract_job(job):
+    path, sha256 = job
+    try:
+        slides, records = extract_deck(path)
+    except (OSError, KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+        return path, sha256, None, str(e)
+    return path, sha256, (slides, records), None
+
+
+# --- インデックス ---------------------------------------------------------------
+
+def open_index(db_path=DEFAULT_DB_PATH):
+    """インデックスを開く（無ければ作成）"""
+    db_dir = os.path.dirname(str(db_path))
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _collect(paths):
+    decks, roots = [], []
+    for item in paths:
+        p = Path(item).resolve()
+        if p.is_dir():
+            roots.append(p)
+            decks.extend(sorted(x for x in p.rglob('*.pptx') if is_deck_file(x)))
+        elif p.exists():
+            decks.append(p)
+    return [str(d) for d in decks], roots
+
+
+def update_index(conn, paths, workers=None):
+    """
+    デッキ（ファイル または ディレクトリ）をインデックスに反映
+
+    Returns:
+        dict: 統計（確認・変更なし・再抽出・削除・失敗の件数）
+    """
+    decks, roots = _collect(paths)
+    known = {path: (mtime_ns, size, sha256) for path, mtime_ns, size, sha256
+             in conn.execute('SELECT path, mtime_ns, size, sha256 FROM decks')}
+    stats = {'checked': len(decks), 'unchanged': 0, 'touched': 0, 'indexed': 0, 'removed': 0, 'failed': 0}
+
+    jobs = []
+    for path in decks:
+        st = os.stat(path)
+        old = known.get(path)
+        if old and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+            stats['unchanged'] += 1
+            continue
+        sha256 = _file_hash(path)
+        if old and old[2] == sha256:
+            # 中身は同じ（コピーや touch）なので mtime だけ更新
+            conn.execute('UPDATE decks SET mtime_ns = ?, size = ? WHERE path = ?', (st.st_mtime_ns, st.st_size, path))
+            stats['touched'] += 1
+            continue
+        jobs.append((path, sha256))
+
+    if len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_extract_job, jobs, chunksize=8))
+    else:
+        results = [_extract_job(job) for job in jobs]
+
+    with conn:
+        for path, sha256, extracted, error in results:
+            if error is not None:
+                print(f"Warning: could not index {path}: {error}")
+                stats['failed'] += 1
+                continue
+            slides, records = extracted
+            st = os.stat(path)
+            conn.execute('DELETE FROM shapes WHERE deck = ?', (path,))
+            conn.executemany('INSERT INTO shapes (text, deck, slide, shape, name) VALUES (?, ?, ?, ?, ?)',
+                             [(text, path, slide_no, shape_idx, name) for slide_no, shape_idx, name, text in records])
+            conn.execute('INSERT OR REPLACE INTO decks VALUES (?, ?, ?, ?, ?, ?)',
+                         (path, st.st_mtime_ns, st.st_size, sha256, slides, time.time()))
+            stats['indexed'] += 1
+
+        # 対象ディレクトリ内で消えたデッキを削除
+        present = set(decks)
+        for path in known:
+            if path not in present and any(Path(path).is_relative_to(root) for root in roots):
+                conn.execute('DELETE FROM shapes WHERE deck = ?', (path,))
+                conn.execute('DELETE FROM decks WHERE path = ?', (path,))
+                stats['removed'] += 1
+
+    return stats
+
+
+def search(conn, query, limit=50):
+    """
+    テキスト検索
+
+    Returns:
+        list: [(デッキ, スライド番号, 図形番号, 図形名, テキスト), ...]
+    """
+    query = query.strip()
+    if len(query) >= 3:
+        # 空白区切りの語はすべて含むもの（AND）。各語はフレーズとして扱う
+        terms = [t for t in query.split() if t]
+        if all(len(t) >= 3 for t in terms):
+            match = ' AND '.join('"' + t.replace('"', '""') + '"' for t in terms)
+            return conn.execute(
+                'SELECT deck, slide, shape, name, text FROM shapes WHERE shapes MATCH ? '
+                'ORDER BY rank LIMIT ?', (match, limit)).fetchall()
+    # trigram は3文字未満を検索できないので全件走査で代用
+    # （trigram の列に対する短い LIKE は SQLite のバージョンによって結果が空になるため instr を使う）
+    terms = query.split() or ['']
+    where = ' AND '.join(['instr(text, ?) > 0'] * len(terms))
+    return conn.execute(
+        f'SELECT deck, slide, shape, name, text FROM shapes WHERE {where} ORDER BY deck, slide, shape LIMIT ?',
+        terms + [limit]).fetchall()
+
+
+def main():
+    usage = ("Usage:\n"
+             "  python src/deck_index.py index <deck.pptx|dir> [...] [--db output/.deck_index.sqlite]\n"
+             "  python src/deck_index.py search <query> [--db output/.deck_index.sqlite] [--limit 50]")
+    args = sys.argv[1:]
+    options = {'--db': DEFAULT_DB_PATH, '--limit': '50'}
+    for name in options:
+        if name in args:
+            i = args.index(name)
+            if i + 1 >= len(args):
+                print(f"Error: {name} requires a value")
+                sys.exit(1)
+            options[name] = args[i + 1]
+            del args[i:i + 2]
+
+    if len(args) < 2 or args[0] not in ('index', 'search'):
+        print(usage)
+        sys.exit(1)
+
+    conn = open_index(options['--db'])
+    start = time.perf_counter()
+
+    if args[0] == 'index':
+        stats = update_index(conn, args[1:])
+        elapsed = time.perf_counter() - start
+        print(f"Checked {stats['checked']} decks in {elapsed:.2f}s: "
+              f"{stats['indexed']} indexed, {stats['unchanged']} unchanged, {stats['touched']} touched, "
+              f"{stats['removed']} removed, {stats['failed']} failed")
+    else:
+        rows = search(conn, ' '.join(args[1:]), int(options['--limit']))
+        elapsed = time.perf_counter() - start
+        for deck, slide, shape, name, text in rows:
+            preview = text[:80].replace('\n', ' | ')
+            print(f"{deck}  スライド {slide}  図形 {shape} ({name})")
+            print(f"    {preview}")
+        print(f"\n{len(rows)} hits in {elapsed * 1000:.1f} ms")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
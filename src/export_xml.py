@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+pptxのXMLパーツを一括で書き出す
+analyze_xml_full.py（1回の実行で図形1つ）の代わりに、スライド・レイアウト・マスター・テーマの
+各パーツと、必要なら図形ごとのXML断片を、複数のデッキからまとめて整形して保存する
+
+出力先の構成:
+    <out>/<デッキ名>/ppt/slides/slide1.xml          … パーツ（ZIP内と同じパス）
+    <out>/<デッキ名>/shapes/slide01/00_TextBox 1.xml … 図形ごとの断片（--shapes、スライド番号は表示順）
+    <out>/<デッキ名>/index.json                      … 表示順とパーツ名の対応、書き出したファイル一覧
+
+ZIPは1デッキにつき1回だけ読み、整形と書き込みはワーカープロセスで並列に行う
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import fnmatch
+import argparse
+import posixpath
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree
+
+from deck_files import collect_decks, unique_names
+
+P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+R_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+REL = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+
+# パーツの種類（ZIP内のパス → 種類）
+KIND_PATTERNS = [
+    ('slide', re.compile(r'^ppt/slides/slide\d+\.xml$')),
+    ('layout', re.compile(r'^ppt/slideLayouts/slideLayout\d+\.xml$')),
+    ('master', re.compile(r'^ppt/slideMasters/slideMaster\d+\.xml$')),
+    ('theme', re.compile(r'^ppt/theme/theme\d+\.xml$')),
+    ('rels', re.compile(r'\.rels$')),
+]
+DEFAULT_KINDS = ('slide', 'layout', 'master', 'theme')
+ALL_KINDS = tuple(kind for kind, _ in KIND_PATTERNS) + ('other',)
+
+# 1ジョブあたりのパーツ数がこれ未満ならプロセスを起動せずに処理する
+PARALLEL_THRESHOLD = 64
+
+
+def part_kind(name):
+    for kind, pattern in KIND_PATTERNS:
+        if pattern.search(name):
+            return kind
+    return 'other' if name.endswith('.xml') else None
+
+
+def _slide_order(zf):
+    """{スライドのパーツ名: 表示順（1始まり）}"""
+    try:
+        presentation = etree.fromstring(zf.read('ppt/presentation.xml'))
+        rels = etree.fromstring(zf.read('ppt/_rels/presentation.xml.rels'))
+    except KeyError:
+        return {}
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(REL)}
+    order = {}
+    for number, sld_id in enumerate(presentation.iter(P + 'sldId'), 1):
+        target = targets.get(sld_id.get(R_ID))
+        if target:
+            order[target.lstrip('/') if target.startswith('/') else posixpath.normpath('ppt/' + target)] = number
+    return order
+
+
+def _safe_name(name):
+    return re.sub(r'[\\/:*?"<>|]', '_', name).strip() or 'shape'
+
+
+# --- ワーカー -------------------------------------------------------------------
+
+_parser = None
+
+
+def _pretty(element):
+    return etree.tostring(element, pretty_print=True, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def _export_part(job):
+    """
+    1パーツを整形して書き出す（ワーカープロセスで実行）
+
+    Returns:
+        list: 書き出したファイルのパス
+    """
+    global _parser
+    out_path, data, shapes_dir = job
+    if _parser is None:
+        _parser = etree.XMLParser(remove_blank_text=True, huge_tree=True)
+    root = etree.fromstring(data, _parser)
+    written = [out_path]
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+    with open(out_path, 'wb') as f:
+        f.write(_pretty(root))
+
+    if shapes_dir is not None:
+        sp_tree = root.find(P + 'cSld/' + P + 'spTree')
+        if sp_tree is not None:
+            os.makedirs(shapes_dir, exist_ok=True)
+            shape_idx = 0
+            for shape in sp_tree:
+                if etree.QName(shape).localname in ('nvGrpSpPr', 'grpSpPr', 'extLst'):
+                    continue
+                c_nv_pr = shape.find('.//' + P + 'cNvPr')
+                name = c_nv_pr.get('name', '') if c_nv_pr is not None else ''
+                shape_path = os.path.join(shapes_dir, f"{shape_idx:02d}_{_safe_name(name)}.xml")
+                with open(shape_path, 'wb') as f:
+                    f.write(_pretty(shape))
+                written.append(shape_path)
+                shape_idx += 1
+    return written
+
+
+# --- 書き出し -------------------------------------------------------------------
+
+def _selected(name, kinds, includes, excludes):
+    kind = part_kind(name)
+    if kind is None or kind not in kinds:
+        return False
+    if includes and not any(fnmatch.fnmatch(name, pat) for pat in includes):
+        return False
+    if any(fnmatch.fnmatch(name, pat) for pat in excludes):
+        return False
+    return True
+
+
+def collect_jobs(deck_path, deck_dir, kinds=DEFAULT_KINDS, includes=(), excludes=(), shapes=False):
+    """
+    デッキのZIPを1回読み、書き出しジョブと index.json の内容を作る
+
+    Returns:
+        tuple: (ジョブ一覧, index)
+    """
+    jobs = []
+    with zipfile.ZipFile(deck_path) as zf:
+        order = _slide_order(zf)
+        for name in zf.namelist():
+            if not _selected(name, kinds, includes, excludes):
+                continue
+            shapes_dir = None
+            if shapes and part_kind(name) == 'slide' and name in order:
+                shapes_dir = os.path.join(deck_dir, 'shapes', f"slide{order[name]:02d}")
+            jobs.append((os.path.join(deck_dir, *name.split('/')), zf.read(name), shapes_dir))
+    index = {
+        'deck': str(deck_path),
+        'slides': [name for name, _ in sorted(order.items(), key=lambda item: item[1])],
+    }
+    return jobs, index
+
+
+def export_decks(deck_paths, out_dir, kinds=DEFAULT_KINDS, includes=(), excludes=(), shapes=False, workers=None):
+    """
+    複数のデッキをまとめて書き出す
+    メモリに載せるのは1デッキ分のパーツだけ。プロセスプールは大きなデッキが来たときに1回だけ作る
+    開けないデッキ（壊れたZIPなど）は警告を出して飛ばす
+
+    Returns:
+        dict: {デッキのパス: 書き出したファイル数}
+    """
+    counts = {}
+    pool = None
+    try:
+        # 別ディレクトリの同名デッキは _2, _3 … を付けて分ける
+        for deck_path, name in zip(deck_paths, unique_names(deck_paths)):
+            deck_dir = os.path.join(out_dir, name)
+
+            try:
+                jobs, index = collect_jobs(deck_path, deck_dir, kinds, includes, excludes, shapes)
+            except (OSError, KeyError, zipfile.BadZipFile, etree.XMLSyntaxError) as e:
+                print(f"Warning: could not export {deck_path}: {e}")
+                continue
+            if len(jobs) < PARALLEL_THRESHOLD:
+                results = [_export_part(job) for job in jobs]
+            else:
+                if pool is None:
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                chunksize = max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))
+                results = list(pool.map(_export_part, jobs, chunksize=chunksize))
+
+            index['files'] = sorted(os.path.relpath(p, deck_dir).replace(os.sep, '/') for written in results for p in written)
+            os.makedirs(deck_dir, exist_ok=True)
+            with open(os.path.join(deck_dir, 'index.json'), 'w', encoding='utf-8') as f:
+                json.dump(index, f, ensure_ascii=False, indent=2)
+            counts[str(deck_path)] = len(index['files'])
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='pptxのXMLパーツ（と図形ごとの断片）を整形して一括で書き出す')
+    parser.add_argument('decks', nargs='+', help='pptxファイル または pptxを含むディレクトリ')
+    parser.add_argument('-o', '--out', required=True, help='出力先ディレクトリ')
+    parser.add_argument('--kinds', default=','.join(DEFAULT_KINDS),
+                        help=f"書き出すパーツの種類（カンマ区切り: {', '.join(ALL_KINDS)}）")
+    parser.add_argument('--include', action='append', default=[], help='含めるパーツ名のパターン（例: ppt/slides/*）')
+    parser.add_argument('--exclude', action='append', default=[], help='除外するパーツ名のパターン')
+    parser.add_argument('--shapes', action='store_true', help='スライドの図形ごとのXML断片も書き出す')
+    parser.add_argument('--workers', type=int, default=None, help='ワーカープロセス数')
+    args = parser.parse_args()
+
+    kinds = tuple(k.strip() for k in args.kinds.split(',') if k.strip())
+    unknown = set(kinds) - set(ALL_KINDS)
+    if unknown:
+        print(f"Error: unknown kinds: {', '.join(sorted(unknown))}")
+        sys.exit(1)
+
+    deck_paths = collect_decks(args.decks)
+
+    start = time.perf_counter()
+    counts = export_decks(deck_paths, args.out, kinds, args.include, args.exclude, args.shapes, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for deck_path, count in counts.items():
+        print(f"{deck_path}: {count} files")
+    print(f"\nExported {sum(counts.values())} files from {len(counts)} decks to {args.out} in {elapsed:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
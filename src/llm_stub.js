@@ -0,0 +1,35 @@
+// オフライン用の決定的なLLMスタブ
+// Anthropicクライアントと同じ messages.create() の形で応答する
+// プロンプトの【テキスト】と【出力形式】から、毎回同じJSONを組み立てる
+
+const sleep = (ms) => new Promise(r => setTimeout(r, ms));
+
+const section = (prompt, label) => {
+  const m = prompt.match(new RegExp(`【${label}】\\n([\\s\\S]*?)(?:\\n\\n【|$)`));
+  return m ? m[1] : '';
+};
+
+export const createStubClient = ({ latencyMs = 0, maxChars = 26 } = {}) => ({
+  messages: {
+    async create({ messages }) {
+      if (latencyMs > 0) await sleep(latencyMs);
+
+      const prompt = messages[messages.length - 1].content;
+      const lines = section(prompt, 'テキスト').split('\n').map(s => s.trim()).filter(Boolean);
+      const format = section(prompt, '出力形式');
+
+      // 出力形式の例からキーと型（配列/文字列）を取り出す
+      const result = {};
+      for (const m of format.matchAll(/"(\w+)":\s*(\[|")/g)) {
+        const [, key, kind] = m;
+        if (kind === '[') {
+          result[key] = lines.slice(0, 5).map(l => l.slice(0, maxChars));
+        } else {
+          result[key] = (lines[0] || '').slice(0, 30);
+        }
+      }
+
+      return { content: [{ type: 'text', text: JSON.stringify(result) }] };
+    }
+  }
+});
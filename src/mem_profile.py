@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+メモリのプロファイリング（生成・検証のフェーズごと・スライドごと）
+- Pythonのオブジェクト: tracemalloc（ピークと、区間の終了時に残っている量）
+- プロセス全体: RSS を別スレッドで定期的に読み取る（lxml・画像などCで確保されるメモリも含む）
+
+予算（budget_mb）を指定すると、フェーズ・スライドの区切りでRSS（取れない環境ではtracemallocの値）を確認し、
+超えていれば MemoryBudgetExceeded を送出する（その時点までのフェーズ別の記録を持つ）。
+区間の途中でMemoryErrorが起きた場合も同じ例外に変換する
+
+    profiler = MemoryProfiler(budget_mb=1500)
+    with profiler:
+        with phase(profiler, 'load'):
+            ...
+        for idx, item in enumerate(items, 1):
+            with track_slide(profiler, idx):
+                ...
+    print(profiler.format_report())
+
+確認は区切りでのみ行うため、1回の確保（巨大な画像の読み込みなど）で予算を超えた分は止められない
+"""
+
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from contextlib import nullcontext
+
+MB = 1024 * 1024
+DEFAULT_INTERVAL = 0.02
+
+try:
+    _PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def current_rss():
+    """現在のRSS（バイト）。取得できない環境ではNone"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # /proc が無い環境（macOS など）は最大RSSで代用（macOSはバイト、Linuxはキロバイト）
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class MemoryBudgetExceeded(Exception):
+    """メモリ予算の超過（report にフェーズ別の記録）"""
+
+    def __init__(self, where, used, budget, report):
+        super().__init__(f"Memory budget exceeded in {where}: {used / MB:.1f} MB > {budget / MB:.1f} MB")
+        self.where = where
+        self.used = used
+        self.budget = budget
+        self.report = report
+
+
+def _label(kind, name):
+    return f"slide {name}" if kind == 'slide' else f"phase '{name}'"
+
+
+class _Scope:
+    __slots__ = ('kind', 'name', 'start', 'py_start', 'py_peak', 'rss_start', 'rss_peak')
+
+    def __init__(self, kind, name, py_current, rss):
+        self.kind = kind
+        self.name = name
+        self.start = time.perf_counter()
+        self.py_start = py_current
+        self.py_peak = py_current
+        self.rss_start = rss
+        self.rss_peak = rss
+
+
+class MemoryProfiler:
+    """
+    フェーズ・スライドごとのメモリ使用量を記録する
+
+    Args:
+        budget_mb: 予算（MB）。Noneなら確認しない
+        interval: RSSを読み取る間隔（秒）
+    """
+
+    def __init__(self, budget_mb=None, interval=DEFAULT_INTERVAL):
+        self.budget = int(budget_mb * MB) if budget_mb else None
+        self.interval = interval
+        self.phases = []
+        self.slides = []
+        self._stack = []
+        self._rss_max = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._started_tracemalloc = False
+
+    # --- 開始・終了 ---
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self._rss_max = current_rss()
+        if self._rss_max is not None and self.interval:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample, name='mem-profile', daemon=True)
+            self._sampler.start()
+        return self
+
+    def stop(self):
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            rss = current_rss()
+            with self._lock:
+                if rss is not None and (self._rss_max is None or rss > self._rss_max):
+                    self._rss_max = rss
+
+    # --- 区間 ---
+
+    def _fold(self):
+        """前回からのピークを開いている区間すべてに反映し、ピークの計測をやり直す"""
+        py_current, py_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        rss = current_rss()
+        with self._lock:
+            rss_peak = max(v for v in (self._rss_max, rss) if v is not None) if rss is not None else None
+            self._rss_max = rss
+        for scope in self._stack:
+            scope.py_peak = max(scope.py_peak, py_peak)
+            if rss_peak is not None:
+                scope.rss_peak = max(scope.rss_peak or 0, rss_peak)
+        return py_current, rss
+
+    def _enter(self, kind, name):
+        py_current, rss = self._fold()
+        self._check(_label(kind, name), py_current, rss)
+        self._stack.append(_Scope(kind, name, py_current, rss))
+
+    def _exit(self, exc):
+        py_current, rss = self._fold()
+        scope = self._stack.pop()
+        record = {
+            'name': scope.name,
+            'phase': next((s.name for s in reversed(self._stack) if s.kind == 'phase'), None),
+            'seconds': time.perf_counter() - scope.start,
+            'py_peak': scope.py_peak - scope.py_start,
+            'py_retained': py_current - scope.py_start,
+            'rss_peak': scope.rss_peak,
+            'rss_end': rss,
+        }
+        (self.phases if scope.kind == 'phase' else self.slides).append(record)
+        if isinstance(exc, MemoryError):
+            raise MemoryBudgetExceeded(_label(scope.kind, scope.name), rss or py_current, self.budget or 0, self.report()) from exc
+        if exc is None:
+            self._check(_label(scope.kind, scope.name), py_current, rss)
+
+    def _check(self, where, py_current, rss):
+        if self.budget is None:
+            return
+        used = rss if rss is not None else py_current
+        if used > self.budget:
+            raise MemoryBudgetExceeded(where, used, self.budget, self.report())
+
+    def phase(self, name):
+        return _ScopeContext(self, 'phase', name)
+
+    def slide(self, index):
+        return _ScopeContext(self, 'slide', index)
+
+    # --- 結果 ---
+
+    def report(self):
+        """記録の dict（JSONにできる形）"""
+        return {
+            'budget': self.budget,
+            'phases': list(self.phases),
+            'open_phases': [scope.name for scope in self._stack if scope.kind == 'phase'],
+            'slides': list(self.slides),
+        }
+
+    def format_report(self, top=5):
+        """フェーズ別の表と、ピークの大きいスライド top 枚"""
+        return format_report(self.report(), top=top)
+
+
+class _ScopeContext:
+    __slots__ = ('profiler', 'kind', 'name')
+
+    def __init__(self, profiler, kind, name):
+        self.profiler = profiler
+        self.kind = kind
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.kind, self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler._exit(exc)
+        return False
+
+
+def phase(profiler, name):
+    """profiler が None なら何もしないフェーズ区間"""
+    return profiler.phase(name) if profiler is not None else nullcontext()
+
+
+def track_slide(profiler, index):
+    """profiler が None なら何もしないスライド区間"""
+    return profiler.slide(index) if profiler is not None else nullcontext()
+
+
+def _mb(value):
+    return '-' if value is None else f"{value / MB:.1f}"
+
+
+def _kb(value):
+    return '-' if value is None else f"{value / 1024:.0f}"
+
+
+def format_report(report, top=5):
+    lines = [f"{'phase':<12} {'time ms':>8} {'py peak MB':>11} {'py kept MB':>11} {'rss peak MB':>12} {'rss end MB':>11}"]
+    for record in report['phases']:
+        lines.append(f"{str(record['name']):<12} {record['seconds'] * 1000:>8.0f} {_mb(record['py_peak']):>11} "
+                     f"{_mb(record['py_retained']):>11} {_mb(record['rss_peak']):>12} {_mb(record['rss_end']):>11}")
+    if report['open_phases']:
+        lines.append(f"interrupted in: {' > '.join(map(str, report['open_phases']))}")
+    slides = report['slides']
+    if slides:
+        lines.append(f"slides: {len(slides)} tracked, py peak max {_kb(max(s['py_peak'] for s in slides))} KB, "
+                     f"py kept total {_kb(sum(s['py_retained'] for s in slides))} KB")
+        for record in sorted(slides, key=lambda s: s['py_peak'], reverse=True)[:top]:
+            where = f" ({record['phase']})" if record['phase'] else ''
+            lines.append(f"  slide {record['name']}{where}: py peak {_kb(record['py_peak'])} KB, "
+                         f"kept {_kb(record['py_retained'])} KB, rss {_mb(record['rss_end'])} MB")
+    if report['budget']:
+        lines.append(f"budget: {_mb(report['budget'])} MB")
+    return '\n'.join(lines)
@@ -0,0 +1,475 @@
+#!/usr/bin/env python3
+"""
+複数のPowerPointデッキを1つのシリーズデッキに結合
+duplicate_slide と同じく背景（p:bg）を含むスライドXMLをそのまま複製するが、
+python-pptxのオブジェクトを作らずにZIPパッケージ同士でパーツを直接つなぎ合わせる
+
+- レイアウト・マスター・テーマ・メディアは内容ハッシュで重複排除
+- 入力デッキは1つずつ開き、メディアはチャンク単位でコピーするため、
+  入力デッキ数が増えてもメモリ使用量はほぼ一定
+- ノートスライドは結合対象外（スライドからの参照は削除）
+"""
+
+import sys
+import os
+import re
+import shutil
+import hashlib
+import posixpath
+import zipfile
+from lxml import etree
+
+NS = {
+    'p': 'http://schemas.openxmlformats.org/presentationml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+    'ct': 'http://schemas.openxmlformats.org/package/2006/content-types',
+}
+RT = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/'
+RT_SLIDE = RT + 'slide'
+RT_SLIDE_MASTER = RT + 'slideMaster'
+RT_NOTES_SLIDE = RT + 'notesSlide'
+RT_OFFICE_DOCUMENT = RT + 'officeDocument'
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def rels_path(partname):
+    """パーツ名から対応する.relsのパスを取得"""
+    directory, filename = posixpath.split(partname)
+    return posixpath.join(directory, '_rels', filename + '.rels')
+
+
+def resolve_target(partname, target):
+    """rels内の相対Targetをパッケージ内の絶対パーツ名に変換"""
+    if target.startswith('/'):
+        return target.lstrip('/')
+    return posixpath.normpath(posixpath.join(posixpath.dirname(partname), target))
+
+
+def relative_target(partname, target_partname):
+    """パーツ名からターゲットへの相対パスを取得"""
+    return posixpath.relpath(target_partname, posixpath.dirname(partname) or '.')
+
+
+def is_xml_part(partname):
+    return partname.endswith('.xml') or partname.endswith('.rels')
+
+
+class SourceDeck:
+    """入力デッキ（ZIP）の読み取り用ラッパー"""
+
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self.names = set(self.zip.namelist())
+        self.defaults, self.overrides = self._read_content_types()
+        self._hash_memo = {}
+        self._file_hash_memo = {}
+
+    def close(self):
+        self.zip.close()
+
+    def _read_content_types(self):
+        root = etree.fromstring(self.zip.read('[Content_Types].xml'))
+        defaults = {el.get('Extension').lower(): el.get('ContentType')
+                    for el in root.findall('ct:Default', NS)}
+        overrides = {el.get('PartName').lstrip('/'): el.get('ContentType')
+                     for el in root.findall('ct:Override', NS)}
+        return defaults, overrides
+
+    def content_type(self, partname):
+        if partname in self.overrides:
+            return self.overrides[partname]
+        ext = partname.rsplit('.', 1)[-1].lower()
+        return self.defaults.get(ext)
+
+    def read(self, partname):
+        return self.zip.read(partname)
+
+    def rels(self, partname):
+        """パーツのリレーションシップ一覧 [(rel要素, 絶対ターゲット or None)]"""
+        path = rels_path(partname)
+        if path not in self.names:
+            return None, []
+        root = etree.fromstring(self.zip.read(path))
+        result = []
+        for rel in root.findall('rel:Relationship', NS):
+            if rel.get('TargetMode') == 'External':
+                result.append((rel, None))
+            else:
+                result.append((rel, resolve_target(partname, rel.get('Target'))))
+        return root, result
+
+    def file_hash(self, partname):
+        """
+        パーツ本体のハッシュ
+        XMLは正規化（C14N）してから比較し、宣言や改行の差で別物扱いにならないようにする
+        メディアはチャンク単位で読むのでメモリを消費しない
+        """
+        if partname not in self._file_hash_memo:
+            h = hashlib.sha256()
+            if is_xml_part(partname):
+                h.update(etree.tostring(etree.fromstring(self.read(partname)), method='c14n'))
+                self._file_hash_memo[partname] = h.hexdigest()
+                return self._file_hash_memo[partname]
+            with self.zip.open(partname) as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                    h.update(chunk)
+            self._file_hash_memo[partname] = h.hexdigest()
+        return self._file_hash_memo[partname]
+
+    def closure_hash(self, partname):
+        """
+        パーツ本体と、そこから到達できる全パーツ・リレーションシップの内容ハッシュ
+        レイアウトのハッシュにはマスター/テーマも含まれるため、見た目が同じパーツだけが
+        重複排除される（マスター <-> レイアウトの循環があっても辿る順序に依存しない）
+        """
+        if partname in self._hash_memo:
+            return self._hash_memo[partname]
+
+        edges = []
+        seen = {partname}
+        queue = [partname]
+        while queue:
+            name = queue.pop()
+            _, rels = self.rels(name)
+            for rel, target in rels:
+                rel_type = rel.get('Type')
+                if target is None:
+                    edges.append(f"{self.file_hash(name)} {rel_type} {rel.get('Target')}")
+                elif rel_type in (RT_SLIDE, RT_NOTES_SLIDE) or target not in self.names:
+                    continue
+                else:
+                    edges.append(f"{self.file_hash(name)} {rel_type} {self.file_hash(target)}")
+                    if target not in seen:
+                        seen.add(target)
+                        queue.append(target)
+
+        h = hashlib.sha256(self.file_hash(partname).encode())
+        for edge in sorted(edges):
+            h.update(edge.encode())
+        digest = h.hexdigest()
+        self._hash_memo[partname] = digest
+        return digest
+
+
+class DeckMerger:
+    """出力パッケージへパーツを書き込みながら結合する"""
+
+    def __init__(self, output_path, compression=zipfile.ZIP_DEFLATED):
+        self.out = zipfile.ZipFile(output_path, 'w', compression)
+        self.written = set()
+        self.by_hash = {}
+        self.content_types = {}
+        self.defaults = {'rels': 'application/vnd.openxmlformats-package.relationships+xml',
+                         'xml': 'application/xml'}
+        self.slides = []        # 出力スライドのパーツ名（順序どおり）
+        self.new_masters = []   # ベース以外から追加されたマスター
+        self.next_layout_id = 2147483648
+        self.is_base_done = False
+        self.stats = {'decks': 0, 'slides': 0, 'parts_copied': 0, 'parts_deduped': 0,
+                      'bytes_deduped': 0}
+        self._mapped = {}
+        self._current = None
+
+    # --- パーツ名の割り当て -------------------------------------------------
+
+    def allocate_name(self, partname):
+        """元の名前が空いていればそのまま使い、使用済みなら連番を振り直す"""
+        if partname not in self.written:
+            self.written.add(partname)
+            return partname
+        directory, filename = posixpath.split(partname)
+        m = re.match(r'^(.*?)(\d*)(\.[^.]+)$', filename)
+        stem, _, ext = m.groups()
+        n = 1
+        while True:
+            candidate = posixpath.join(directory, f"{stem}{n}{ext}")
+            if candidate not in self.written:
+                self.written.add(candidate)
+                return candidate
+            n += 1
+
+    def register_content_type(self, src, src_partname, partname):
+        ct = src.content_type(src_partname)
+        if ct is None:
+            return
+        ext = partname.rsplit('.', 1)[-1].lower()
+        if not is_xml_part(partname) and ext not in self.defaults:
+            self.defaults[ext] = ct
+        if self.defaults.get(ext) != ct:
+            self.content_types[partname] = ct
+
+    # --- パーツのコピー ----------------------------------------------------
+
+    def copy_part(self, src, partname, dedupe=True):
+        """パーツを参照先ごと出力へコピーし、出力側のパーツ名を返す"""
+        key = (id(src), partname)
+        if key in self._mapped:
+            return self._mapped[key]
+
+        # テーマはマスターごとに1つ必要なので、マスター単位でのみ共有する
+        if (src.content_type(partname) or '').endswith('theme+xml'):
+            dedupe = False
+        digest = src.closure_hash(partname) if dedupe else None
+        if digest is not None and digest in self.by_hash:
+            self.stats['parts_deduped'] += 1
+            self.stats['bytes_deduped'] += src.zip.getinfo(partname).file_size
+            self._mapped[key] = self.by_hash[digest]
+            return self.by_hash[digest]
+
+        new_name = self.allocate_name(partname)
+        self._mapped[key] = new_name
+        if digest is not None:
+            self.by_hash[digest] = new_name
+        ct = src.content_type(partname) or ''
+        if ct.endswith('slideMaster+xml') and self.is_base_done:
+            self.write_part(src, partname, new_name, transform=self._renumber_master)
+            self.new_masters.append(new_name)
+        else:
+            self.write_part(src, partname, new_name)
+        return new_name
+
+    def write_part(self, src, partname, new_name, drop_rel_types=(), transform=None):
+        """本体とrelsを書き込み（参照先は再帰的にコピー）"""
+        rels_root, rels = src.rels(partname)
+        if rels_root is not None:
+            for rel, target in rels:
+                if target is None:
+                    continue
+                if rel.get('Type') in drop_rel_types or target not in src.names:
+                    rels_root.remove(rel)
+                    continue
+                new_target = self.copy_part(src, target)
+                rel.set('Target', relative_target(new_name, new_target))
+            self.out.writestr(rels_path(new_name), etree.tostring(
+                rels_root, xml_declaration=True, encoding='UTF-8', standalone=True))
+
+        if transform is not None:
+            self.out.writestr(new_name, transform(src.read(partname)))
+        elif is_xml_part(partname):
+            self.out.writestr(new_name, src.read(partname))
+        else:
+            # メディアはストリームでコピー
+            info = zipfile.ZipInfo(new_name, date_time=src.zip.getinfo(partname).date_time)
+            info.compress_type = self.out.compression
+            with src.zip.open(partname) as fin, self.out.open(info, 'w', force_zip64=True) as fout:
+                shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+
+        self.register_content_type(src, partname, new_name)
+        self.stats['parts_copied'] += 1
+
+    def _use_source(self, src):
+        # 入力デッキが替わったらパーツ名の対応表を捨てる（メモリを入力数に比例させない）
+        if src is not self._current:
+            self._mapped = {}
+            self._current = src
+
+    def _renumber_master(self, data):
+        """ベース以外のマスター: レイアウトIDをパッケージ内で一意になるよう振り直す"""
+        root = etree.fromstring(data)
+        for el in root.iter('{%s}sldLayoutId' % NS['p']):
+            el.set('id', str(self.next_layout_id))
+            self.next_layout_id += 1
+        return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+    # --- デッキ単位の処理 --------------------------------------------------
+
+    def add_base(self, src):
+        """1つ目のデッキからパッケージの骨格（マスター・テーマ・プロパティ類）をコピー"""
+        self._use_source(src)
+        self.base_pres = src.read('ppt/presentation.xml')
+        self.written.add('ppt/presentation.xml')
+
+        # ベースで使用済みのマスター/レイアウトIDの次から採番する
+        for name in src.names:
+            ct = src.content_type(name) or ''
+            if ct.endswith('slideMaster+xml') or name == 'ppt/presentation.xml':
+                root = etree.fromstring(src.read(name))
+                for el in root.iter('{%s}sldLayoutId' % NS['p'], '{%s}sldMasterId' % NS['p']):
+                    self.next_layout_id = max(self.next_layout_id, int(el.get('id')) + 1)
+
+        _, root_rels = src.rels('')
+        self.root_rels = []
+        for rel, target in root_rels:
+            if rel.get('Type') == RT_OFFICE_DOCUMENT:
+                self.root_rels.append((rel.get('Id'), rel.get('Type'), 'ppt/presentation.xml'))
+            elif target is not None and target in src.names:
+                self.root_rels.append((rel.get('Id'), rel.get('Type'), self.copy_part(src, target)))
+
+        _, pres_rels = src.rels('ppt/presentation.xml')
+        self.pres_rels = []
+        for rel, target in pres_rels:
+            if rel.get('Type') == RT_SLIDE or target is None or target not in src.names:
+                continue
+            self.pres_rels.append((rel.get('Id'), rel.get('Type'), self.copy_part(src, target)))
+
+        # ベースのマスターは presentation.xml に登録済みなので、以降に追加されたものだけ登録する
+        self.is_base_done = True
+
+    def add_deck(self, src):
+        """デッキのスライドを順番どおりに出力へ追加"""
+        self._use_source(src)
+        pres = etree.fromstring(src.read('ppt/presentation.xml'))
+        _, pres_rels = src.rels('ppt/presentation.xml')
+        targets = {rel.get('Id'): target for rel, target in pres_rels}
+
+        slide_parts = []
+        for sldId in pres.findall('p:sldIdLst/p:sldId', NS):
+            partname = targets.get(sldId.get('{%s}id' % NS['r']))
+            if partname and partname in src.names:
+                slide_parts.append(partname)
+
+        # スライド同士のリンクが正しく張られるよう、先に出力名を確定させる
+        for partname in slide_parts:
+            new_name = self.allocate_name(f"ppt/slides/slide{len(self.slides) + 1}.xml")
+            self._mapped[(id(src), partname)] = new_name
+            self.slides.append(new_name)
+
+        for partname in slide_parts:
+            new_name = self._mapped[(id(src), partname)]
+            self.write_part(src, partname, new_name, drop_rel_types=(RT_NOTES_SLIDE,))
+
+        self.stats['decks'] += 1
+        self.stats['slides'] += len(slide_parts)
+
+    def finish(self):
+        """presentation.xml・rels・[Content_Types].xml を書き込んで閉じる"""
+        pres = etree.fromstring(self.base_pres)
+
+        rels = list(self.pres_rels)
+        used_ids = {rid for rid, _, _ in rels}
+
+        def next_rid():
+            n = 1
+            while f"rId{n}" in used_ids:
+                n += 1
+            used_ids.add(f"rId{n}")
+            return f"rId{n}"
+
+        # 追加されたマスターを登録
+        master_lst = pres.find('p:sldMasterIdLst', NS)
+        for master in self.new_masters:
+            rid = next_rid()
+            rels.append((rid, RT_SLIDE_MASTER, master))
+            el = etree.SubElement(master_lst, '{%s}sldMasterId' % NS['p'])
+            el.set('id', str(self.next_layout_id))
+            self.next_layout_id += 1
+            el.set('{%s}id' % NS['r'], rid)
+
+        # スライド一覧を作り直す
+        sld_lst = pres.find('p:sldIdLst', NS)
+        if sld_lst is None:
+            sld_lst = etree.Element('{%s}sldIdLst' % NS['p'])
+            master_lst.addnext(sld_lst)
+        for el in list(sld_lst):
+            sld_lst.remove(el)
+        for idx, slide in enumerate(self.slides):
+            rid = next_rid()
+            rels.append((rid, RT_SLIDE, slide))
+            el = etree.SubElement(sld_lst, '{%s}sldId' % NS['p'])
+            el.set('id', str(256 + idx))
+            el.set('{%s}id' % NS['r'], rid)
+
+        self.out.writestr('ppt/presentation.xml', etree.tostring(
+            pres, xml_declaration=True, encoding='UTF-8', standalone=True))
+        self.out.writestr('ppt/_rels/presentation.xml.rels', build_rels_xml('ppt/presentation.xml', rels))
+        self.out.writestr('_rels/.rels', build_rels_xml('', self.root_rels))
+
+        self.content_types['ppt/presentation.xml'] = (
+            'application/vnd.openxmlformats-officedocument.presentationml.presentation.main+xml')
+        self.out.writestr('[Content_Types].xml', build_content_types_xml(self.defaults, self.content_types))
+        self.out.close()
+
+    def abort(self):
+        """途中で失敗したときに閉じる（書きかけの出力は呼び出し側で削除する）"""
+        self.out.close()
+
+
+def build_rels_xml(partname, rels):
+    root = etree.Element('{%s}Relationships' % NS['rel'], nsmap={None: NS['rel']})
+    for rid, rel_type, target in rels:
+        el = etree.SubElement(root, '{%s}Relationship' % NS['rel'])
+        el.set('Id', rid)
+        el.set('Type', rel_type)
+        el.set('Target', relative_target(partname, target) if partname else target)
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def build_content_types_xml(defaults, overrides):
+    root = etree.Element('{%s}Types' % NS['ct'], nsmap={None: NS['ct']})
+    for ext, ct in sorted(defaults.items()):
+        el = etree.SubElement(root, '{%s}Default' % NS['ct'])
+        el.set('Extension', ext)
+        el.set('ContentType', ct)
+    for partname, ct in sorted(overrides.items()):
+        el = etree.SubElement(root, '{%s}Override' % NS['ct'])
+        el.set('PartName', '/' + partname)
+        el.set('ContentType', ct)
+    return etree.tostring(root, xml_declaration=True, encoding='UTF-8', standalone=True)
+
+
+def merge_decks(input_paths, output_path):
+    """
+    複数のデッキを入力順に結合して1つのpptxを出力
+
+    Args:
+        input_paths: 入力pptxのパス一覧（1つ目がマスター・プロパティ類のベースになる）
+        output_path: 出力先
+
+    Returns:
+        dict: 結合結果の統計情報
+    """
+    for path in input_paths:
+        if not os.path.exists(path):
+            print(f"Error: File not found: {path}")
+            sys.exit(1)
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    merger = DeckMerger(output_path)
+    try:
+        for idx, path in enumerate(input_paths):
+            src = SourceDeck(path)
+            try:
+                if idx == 0:
+                    merger.add_base(src)
+                merger.add_deck(src)
+            finally:
+                src.close()
+            print(f"Deck {idx + 1}/{len(input_paths)}: {path}")
+    except BaseException:
+        # 書きかけのデッキは残さない（元の例外をそのまま送出する）
+        merger.abort()
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    else:
+        merger.finish()
+
+    return merger.stats
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python src/merge_decks.py <output.pptx> <deck1.pptx> [deck2.pptx ...]")
+        sys.exit(1)
+
+    output_path = sys.argv[1]
+    input_paths = sys.argv[2:]
+
+    stats = merge_decks(input_paths, output_path)
+
+    print(f"\n=== Merge Summary ===")
+    print(f"Decks: {stats['decks']}")
+    print(f"Slides: {stats['slides']}")
+    print(f"Parts copied: {stats['parts_copied']}")
+    print(f"Parts deduplicated: {stats['parts_deduped']} ({stats['bytes_deduped']} bytes)")
+    print(f"\nOutput file: {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+チューニング → PowerPoint生成 → 文字色検証 を1プロセスで実行するパイプライン
+各ステージの間はファイルを介さず、プランのオブジェクトとPresentationをそのまま受け渡す
+（npm run tune && npm run render:pptx && npm run verify:colors と同じ結果を1回の保存で出力）
+
+    from yt_mvp import run_pipeline
+    result = run_pipeline(plan_data, 'slide/slide_templates_all_variations_jp.pptx', 'output/04_deck.pptx')
+
+重いモジュール（python-pptx・lxml など）はステージの実行時に読み込む
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_TEMPLATE_PATH = ROOT_DIR / 'slide' / 'slide_templates_all_variations_jp.pptx'
+
+
+def _render_module():
+    return importlib.import_module('06_render_pptx')
+
+
+def run_pipeline(plan, template_path=DEFAULT_TEMPLATE_PATH, output_path=None, schema_path=None,
+                 tune=True, verify=True, theme='auto', policy_path=None, streaming=False, deterministic=False,
+                 slide_store=None, shards=1, verbose=True, profiler=None, parallel=False, compresslevel=None):
+    """
+    プランからPowerPointを生成して検証・修正する
+
+    Args:
+        plan: プランのdict（04_plan.js / 05_tune.js の出力形式）、またはプランのファイルパス
+        output_path: 出力先（Noneなら保存せず、結果の 'presentation' を使う）
+        schema_path: スキーマ（None なら config/slide.schema.json。False で検証しない）
+        tune: Trueならチューニングする（slidesWithTuning が既にあるプランはそのまま使う）
+        verify: Trueなら保存前に文字色ポリシーで検証・修正する
+        profiler: mem_profile.MemoryProfiler（生成・検証・保存のメモリ使用量を記録。予算超過は
+            MemoryBudgetExceeded を送出）
+        その他の引数は 06_render_pptx.render_pptx / 07_verify_colors.py と同じ
+
+    Returns:
+        dict: plan（チューニング済み）・tune（summary）・verify（統計）・presentation・content_hash・timings（秒）
+
+    Raises:
+        ValueError: プランがスキーマに合わない、またはテーマ名が不正
+        FileNotFoundError: テンプレートが無い
+    """
+    from validate_plan import DEFAULT_SCHEMA_PATH, load_schema, validate_plan
+    from mem_profile import phase
+
+    render_pptx_module = _render_module()
+    timings = {}
+    result = {'tune': None, 'verify': None, 'content_hash': None, 'timings': timings}
+
+    start = time.perf_counter()
+    plan_data = render_pptx_module.load_plan(str(plan)) if isinstance(plan, (str, Path)) else plan
+    if tune and 'slidesWithTuning' not in plan_data:
+        from tune_plan import tune_plan
+        plan_data = tune_plan(plan_data, verbose=verbose)
+    if 'summary' in plan_data:
+        result['tune'] = plan_data['summary']
+    result['plan'] = plan_data
+    timings['tune'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if schema_path is None:
+        schema_path = DEFAULT_SCHEMA_PATH
+    if schema_path and os.path.exists(schema_path):
+        errors = validate_plan(plan_data, load_schema(str(schema_path)))
+        if errors:
+            raise ValueError(f"Slide plan does not match schema ({len(errors)} errors): " + '; '.join(errors))
+    timings['validate'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if not os.path.exists(template_path):
+        raise FileNotFoundError(f"Template file not found: {template_path}")
+    resolved = render_pptx_module.resolve_templates(render_pptx_module.get_slides_data(plan_data))
+    prs = render_pptx_module.build_presentation(resolved, str(template_path), slide_store=slide_store, shards=shards,
+                                                profiler=profiler)
+    result['presentation'] = prs
+    timings['render'] = time.perf_counter() - start
+
+    if verify:
+        from color_policy import DEFAULT_POLICY_PATH, check_presentation, load_policy
+        start = time.perf_counter()
+        policy = load_policy(policy_path or DEFAULT_POLICY_PATH)
+        templates = [template_name for template_name, *_ in resolved]
+        with phase(profiler, 'verify'):
+            result['verify'] = check_presentation(prs, policy, theme=theme, templates=templates, fix=True,
+                                                  profiler=profiler)
+        timings['verify'] = time.perf_counter() - start
+
+    if output_path is not None:
+        start = time.perf_counter()
+        # 保存したファイルを読み込み直した場合と同じく、スライドのパーツ名を表示順に振り直す
+        # （06 → 07 を別プロセスで実行した出力と同じになる）
+        prs.part.rename_slide_parts([sldId.rId for sldId in prs.slides._sldIdLst])
+        with phase(profiler, 'save'):
+            result['content_hash'] = render_pptx_module.save_presentation(
+                prs, str(output_path), source_path=str(template_path), streaming=streaming,
+                deterministic=deterministic, parallel=parallel, compresslevel=compresslevel)
+        timings['save'] = time.perf_counter() - start
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='チューニング・PowerPoint生成・文字色検証を1プロセスで実行')
+    parser.add_argument('plan', help='slides_plan.json（04_plan.js の出力）/ 03_slides_tuned.json / .yplan')
+    parser.add_argument('output', help='出力するpptx')
+    parser.add_argument('--template', default=str(DEFAULT_TEMPLATE_PATH), help='テンプレートのpptx')
+    parser.add_argument('--schema', default=None, help='プランのスキーマ（既定 config/slide.schema.json）')
+    parser.add_argument('--no-verify', action='store_true', help='文字色の検証・修正をしない')
+    parser.add_argument('--theme', default='auto', help='文字色ポリシーのテーマ（auto: 背景色から判定）')
+    parser.add_argument('--policy', default=None, help='文字色ポリシー（既定 config/color_policy.json）')
+    parser.add_argument('--stream', action='store_true', help='パーツ単位のストリーム書き込みで保存')
+    parser.add_argument('--deterministic', action='store_true', help='同じ入力から同じバイト列を出力')
+    parser.add_argument('--parallel-save', action='store_true', help='ZIPエントリの圧縮をスレッドプールで並列に行う')
+    parser.add_argument('--compress-level', type=int, choices=range(10), default=None, metavar='0-9',
+                        help='圧縮レベル（0: 無圧縮）')
+    parser.add_argument('--slide-store', action='store_true', help='生成済みのスライドを再利用')
+    parser.add_argument('--shards', type=int, default=1, help='スライドを生成するプロセス数（0: CPU数）')
+    args = parser.parse_args()
+
+    slide_store = None
+    if args.slide_store:
+        from slide_store import open_slide_store
+        slide_store = open_slide_store()
+
+    try:
+        result = run_pipeline(args.plan, args.template, args.output, schema_path=args.schema,
+                              verify=not args.no_verify, theme=args.theme, policy_path=args.policy,
+                              streaming=args.stream, deterministic=args.deterministic, slide_store=slide_store,
+                              shards=args.shards or os.cpu_count() or 1, parallel=args.parallel_save,
+                              compresslevel=args.compress_level)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print(f"\nGenerated PowerPoint: {args.output}")
+    if result['verify'] is not None:
+        stats = result['verify']
+        print(f"Colors: {stats['compliant']} compliant, {stats['fixed_runs'] + stats['no_color']} fixed")
+    if result['content_hash']:
+        print(f"Content hash: {result['content_hash']}")
+    print('Timings: ' + ', '.join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in result['timings'].items()))
+
+
+if __name__ == '__main__':
+    main()
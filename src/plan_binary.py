@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+コンパクトなバイナリ形式のスライドプラン（.yplan）
+03_slides_tuned.json（整形済みJSON、tuneResults と slidesWithTuning が重複）を
+文字列インターン済みのスライド単位レコードに変換し、スライドNだけを直接読み出せるようにする
+
+ファイル構成（数値はすべてリトルエンディアン）:
+    ヘッダー   : magic 'YPLN' | version u16 | reserved u16 | スライド数 u32 | 文字列表長 u32 | メタ長 u32
+    文字列表   : テンプレート名・キー名のJSON配列
+    メタ       : summary と tuneResults の固有部分（status/issues）のJSON
+    オフセット : スライド数+1 個の u32（スライド領域先頭からの位置）
+    スライド   : 1スライド1レコードのコンパクトJSON（キーは文字列表のID、templateもID）
+                 全体で1つのJSON配列になるよう '[' ',' ']' で区切り、全件読み込みは1回のデコードで済ませる
+
+tuneResults の sectionId / template / constraints は slidesWithTuning と同じ値なので、
+読み込み時にスライドから復元する（スライドと一致しない tuneResults は、メタにそのまま保存する）
+"""
+
+import sys
+import os
+import json
+import mmap
+import time
+import struct
+import tempfile
+from array import array
+from pathlib import Path
+
+MAGIC = b'YPLN'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIII')
+
+
+def is_binary_plan(path):
+    """ファイル先頭のマジックでバイナリプランかどうか判定"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+class _Interner:
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def id(self, s):
+        if s not in self.ids:
+            self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return self.ids[s]
+
+    def encode(self, value):
+        """dictのキーを文字列表のIDに置き換え（値はそのまま）"""
+        if isinstance(value, dict):
+            return {str(self.id(k)): self.encode(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self.encode(v) for v in value]
+        return value
+
+
+def _compact(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _tune_result(slide, status, issues):
+    """スライドから tuneResults の1要素を組み立てる（05_tune.js と同じ構造）"""
+    result = {
+        'sectionId': slide.get('sectionId'),
+        'template': slide.get('template'),
+        'status': status,
+        'issues': issues,
+    }
+    # 05_tune.js（JSON.stringify）と同じく、constraintsResult が無いスライドはキーを出さない
+    if 'constraintsResult' in slide:
+        result['constraints'] = slide['constraintsResult']
+    return result
+
+
+def _compact_tune_results(slides, tune_results):
+    """
+    tuneResults を [status, issues] の列に縮める
+    スライドから組み立て直したものと一致しない（件数・内容・キーの順が違う）場合はNone
+    """
+    if len(tune_results) != len(slides):
+        return None
+    compact = []
+    for slide, result in zip(slides, tune_results):
+        status, issues = result.get('status'), result.get('issues')
+        if list(_tune_result(slide, status, issues).items()) != list(result.items()):
+            return None
+        compact.append([status, issues])
+    return compact
+
+
+def write_plan_binary(plan_data, output_path):
+    """プランデータ（05_tune.jsの出力 または 04_plan.jsの出力）をバイナリ形式で保存"""
+    slides = plan_data.get('slidesWithTuning', plan_data.get('slides', []))
+    tuned = 'slidesWithTuning' in plan_data
+    interner = _Interner()
+
+    records = []
+    for slide in slides:
+        slide = dict(slide)
+        if 'template' in slide:
+            slide['template'] = interner.id(slide['template'])
+        records.append(_compact(interner.encode(slide)))
+
+    meta = {'tuned': tuned}
+    if tuned:
+        meta['summary'] = plan_data.get('summary')
+        tune_results = plan_data.get('tuneResults', [])
+        compact = _compact_tune_results(slides, tune_results)
+        if compact is not None:
+            meta['tune'] = compact
+        else:
+            # スライドから復元できない tuneResults はそのまま保存する
+            meta['tuneResults'] = tune_results
+    extra = {k: v for k, v in plan_data.items()
+             if k not in ('slidesWithTuning', 'slides', 'summary', 'tuneResults')}
+    if extra:
+        meta['extra'] = extra
+
+    table = _compact(interner.strings)
+    meta_bytes = _compact(meta)
+    # 各レコードの開始位置（区切り文字を含まない）。末尾はスライド領域（'['〜']'）の終端
+    offsets = array('I')
+    pos = 1
+    for record in records:
+        offsets.append(pos)
+        pos += len(record) + 1
+    offsets.append(pos if records else 2)
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(records), len(table), len(meta_bytes)))
+        f.write(table)
+        f.write(meta_bytes)
+        f.write(offsets.tobytes())
+        f.write(b'[' + b','.join(records) + b']')
+
+
+class BinaryPlan:
+    """
+    バイナリプランの読み出し
+    ヘッダー・文字列表・オフセットだけを読み、スライドは要求されたものだけデコードする
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, _, count, table_len, meta_len = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Not a binary plan: {path}")
+        if version != VERSION:
+            raise ValueError(f"Unsupported binary plan version {version}: {path}")
+
+        pos = HEADER.size
+        self.strings = [sys.intern(s) for s in json.loads(self._mm[pos:pos + table_len])]
+        pos += table_len
+        self._meta_range = (pos, pos + meta_len)
+        self._meta = None
+        pos += meta_len
+        self._offsets = array('I')
+        self._offsets.frombytes(self._mm[pos:pos + 4 * (count + 1)])
+        if sys.byteorder != 'little':
+            self._offsets.byteswap()
+        self._base = pos + 4 * (count + 1)
+        self._count = count
+        self._key_of = {str(i): s for i, s in enumerate(self.strings)}
+
+    @property
+    def meta(self):
+        # tuneResults 由来のメタはスライド単位の読み出しでは不要なので遅延デコード
+        if self._meta is None:
+            start, end = self._meta_range
+            self._meta = json.loads(self._mm[start:end])
+        return self._meta
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _hook(self, pairs):
+        key_of = self._key_of
+        return {key_of[k]: v for k, v in pairs}
+
+    def _restore_template(self, slide):
+        if 'template' in slide:
+            slide['template'] = self.strings[slide['template']]
+        return slide
+
+    def __getitem__(self, index):
+        """スライドindex（0始まり）だけをデコード"""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start = self._base + self._offsets[index]
+        end = self._base + self._offsets[index + 1] - 1
+        return self._restore_template(json.loads(self._mm[start:end], object_pairs_hook=self._hook))
+
+    def slides(self):
+        """全スライドを1回のデコードで取得"""
+        start = self._base
+        end = self._base + self._offsets[self._count]
+        return [self._restore_template(s) for s in json.loads(self._mm[start:end], object_pairs_hook=self._hook)]
+
+    def __iter__(self):
+        return iter(self.slides())
+
+    def to_plan_data(self):
+        """元のJSONと同じ構造のプランデータを復元"""
+        slides = self.slides()
+        if not self.meta.get('tuned'):
+            plan_data = {'slides': slides}
+        else:
+            if 'tuneResults' in self.meta:
+                tune_results = self.meta['tuneResults']
+            else:
+                tune_results = [_tune_result(slide, status, issues)
+                                for slide, (status, issues) in zip(slides, self.meta.get('tune', []))]
+            plan_data = {
+                'summary': self.meta.get('summary'),
+                'tuneResults': tune_results,
+                'slidesWithTuning': slides,
+            }
+        plan_data.update(self.meta.get('extra', {}))
+        return plan_data
+
+
+def read_plan_binary(path):
+    """バイナリプランを読み込んでプランデータ（dict）を返す"""
+    with BinaryPlan(path) as plan:
+        return plan.to_plan_data()
+
+
+def convert(input_path, output_path):
+    """JSONプラン（ファイル または ディレクトリ）をバイナリ形式に変換"""
+    src = Path(input_path)
+    if src.is_dir():
+        pairs = [(p, Path(output_path) / (p.stem + '.yplan')) for p in sorted(src.glob('*.json'))]
+    else:
+        pairs = [(src, Path(output_path))]
+
+    total_in = total_out = 0
+    for json_path, bin_path in pairs:
+        with open(json_path, 'r', encoding='utf-8') as f:
+            plan_data = json.load(f)
+        write_plan_binary(plan_data, str(bin_path))
+        total_in += os.path.getsize(json_path)
+        total_out += os.path.getsize(bin_path)
+        print(f"{json_path} -> {bin_path}")
+
+    if total_in:
+        print(f"\n{len(pairs)} plans: {total_in} bytes -> {total_out} bytes ({total_out / total_in:.0%})")
+
+
+def bench(json_path, repeat=200):
+    """load_json とバイナリ読み込み（全体/スライドN）の読み込み時間を比較"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        plan_data = json.load(f)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_path = os.path.join(tmp, 'plan.yplan')
+        write_plan_binary(plan_data, bin_path)
+        assert read_plan_binary(bin_path) == plan_data, 'round trip mismatch'
+
+        def timed(fn):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                fn()
+            return (time.perf_counter() - start) / repeat * 1e6
+
+        def load_json():
+            with open(json_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        def load_slide_n():
+            with BinaryPlan(bin_path) as plan:
+                return plan[len(plan) // 2]
+
+        n = len(plan_data.get('slidesWithTuning', plan_data.get('slides', [])))
+        print(f"Plan: {json_path} ({n} slides)")
+        print(f"Size: json {os.path.getsize(json_path)} bytes, binary {os.path.getsize(bin_path)} bytes")
+        print(f"load_json:          {timed(load_json):8.1f} us")
+        print(f"binary (full):      {timed(lambda: read_plan_binary(bin_path)):8.1f} us")
+        print(f"binary (slide N/2): {timed(load_slide_n):8.1f} us")
+
+
+def main():
+    usage = ("Usage:\n"
+             "  python src/plan_binary.py convert <plan.json|dir> <plan.yplan|dir>\n"
+             "  python src/plan_binary.py show <plan.yplan> [slide_index]\n"
+             "  python src/plan_binary.py bench <plan.json>")
+    if len(sys.argv) < 3:
+        print(usage)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    if command == 'convert' and len(sys.argv) >= 4:
+        convert(sys.argv[2], sys.argv[3])
+    elif command == 'show':
+        with BinaryPlan(sys.argv[2]) as plan:
+            if len(sys.argv) >= 4:
+                data = plan[int(sys.argv[3])]
+            else:
+                data = plan.to_plan_data()
+            print(json.dumps(data, ensure_ascii=False, indent=2))
+    elif command == 'bench':
+        bench(sys.argv[2])
+    else:
+        print(usage)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
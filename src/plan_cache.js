@@ -0,0 +1,99 @@
+import fs from 'fs';
+import path from 'path';
+import crypto from 'crypto';
+
+// セクション単位のプランキャッシュ
+// キー: (セクション本文, intent, mapping.jsonのエントリ, スキーマバージョン, モデル設定)
+
+const sha256 = (s) => crypto.createHash('sha256').update(s).digest('hex');
+
+// オブジェクトのキー順に依存しないJSON文字列化（キャッシュキー用）
+const stableStringify = (v) => {
+  if (Array.isArray(v)) return `[${v.map(stableStringify).join(',')}]`;
+  if (v && typeof v === 'object') {
+    return `{${Object.keys(v).sort().map(k => `${JSON.stringify(k)}:${stableStringify(v[k])}`).join(',')}}`;
+  }
+  return JSON.stringify(v === undefined ? null : v);
+};
+
+export const schemaVersion = (schemaText) => sha256(schemaText).slice(0, 16);
+
+export const planCacheKey = ({ sec, mappingEntry, schemaVersion, modelSettings }) => sha256(stableStringify({
+  text: { summary: sec.summary, lines: sec.lines },
+  intent: sec.intent,
+  mappingEntry: mappingEntry || null,
+  schemaVersion,
+  modelSettings
+}));
+
+// バックエンド: get(key) -> value|undefined, set(key, value)
+const createMemoryBackend = () => {
+  const store = new Map();
+  return {
+    get: async (key) => store.get(key),
+    set: async (key, value) => { store.set(key, value); }
+  };
+};
+
+const createFileBackend = ({ dir = 'output/.plan_cache' } = {}) => {
+  const fileOf = (key) => path.join(dir, key.slice(0, 2), `${key}.json`);
+  return {
+    get: async (key) => {
+      try {
+        return JSON.parse(fs.readFileSync(fileOf(key), 'utf8'));
+      } catch {
+        return undefined;
+      }
+    },
+    set: async (key, value) => {
+      const p = fileOf(key);
+      fs.mkdirSync(path.dirname(p), { recursive: true });
+      // 書き込み途中のファイルを読まないように一時ファイル経由で置き換え
+      const tmp = `${p}.${process.pid}.tmp`;
+      fs.writeFileSync(tmp, JSON.stringify(value), 'utf8');
+      fs.renameSync(tmp, p);
+    }
+  };
+};
+
+const createNullBackend = () => ({
+  get: async () => undefined,
+  set: async () => {}
+});
+
+const backends = {
+  memory: createMemoryBackend,
+  file: createFileBackend,
+  off: createNullBackend
+};
+
+export const registerPlanCacheBackend = (name, factory) => {
+  backends[name] = factory;
+};
+
+export const createPlanCache = (name = 'file', options = {}) => {
+  const factory = backends[name];
+  if (!factory) {
+    throw new Error(`Unknown plan cache backend: ${name} (available: ${Object.keys(backends).join(', ')})`);
+  }
+  const backend = factory(options);
+  const stats = { hits: 0, misses: 0 };
+
+  return {
+    name,
+    stats,
+    // キャッシュにあれば返し、なければcomputeを実行して保存する
+    // computeが { value, cacheable } を返した場合、cacheable=falseなら保存しない
+    async getOrCompute(key, compute) {
+      const cached = await backend.get(key);
+      if (cached !== undefined) {
+        stats.hits++;
+        return cached;
+      }
+      stats.misses++;
+      const { value, cacheable = true } = await compute();
+      if (cacheable) await backend.set(key, value);
+      return value;
+    }
+  };
+};
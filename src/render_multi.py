@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+マルチターゲット描画
+03_slides_tuned.json を1回だけ読み込み・テンプレート決定も1回だけ行い、
+PowerPoint / HTML / Marp Markdown を1プロセスから並行して出力する
+
+出力先（out_dirからの相対パス、npm scripts と同じ配置）:
+    pptx: 04_deck.pptx                  (06_render_pptx.py 相当)
+    html: slides_export/deck.html        (06_render_html.js 相当)
+    marp: slides_src/deck_from_html.md   (07_html_to_marp.js 相当)
+    md:   slides_src/deck.md             (06_render.js 相当)
+"""
+
+import sys
+import os
+import time
+import importlib
+from concurrent.futures import ThreadPoolExecutor
+
+render_pptx_module = importlib.import_module('06_render_pptx')
+
+FORMATS = ('pptx', 'html', 'marp', 'md')
+OUTPUT_PATHS = {
+    'pptx': '04_deck.pptx',
+    'html': os.path.join('slides_export', 'deck.html'),
+    'marp': os.path.join('slides_src', 'deck_from_html.md'),
+    'md': os.path.join('slides_src', 'deck.md'),
+}
+
+
+def js_str(value):
+    """JSのテンプレートリテラルと同じ文字列化（JS版と同じ出力にするため）"""
+    if value is None:
+        return 'undefined'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, list):
+        return ','.join('' if v is None else js_str(v) for v in value)
+    return str(value)
+
+
+def js_or(value, default):
+    """JSの `value || default`"""
+    if value is None or value is False or value == '' or value == 0:
+        return default
+    return value
+
+
+def at(values, i):
+    """JSの `values?.[i]`"""
+    if isinstance(values, list) and i < len(values):
+        return values[i]
+    return None
+
+
+# --- HTML（06_render_html.js） -------------------------------------------------
+
+def html_slide(template, f):
+    g = f.get
+    if template == 'title_card':
+        return f"""
+    <div class="slide title-card" data-template="title_card">
+      <h1>{js_str(js_or(g('title'), ''))}</h1>
+      <p class="subtitle">{js_str(js_or(g('subtitle'), ''))}</p>
+    </div>"""
+    if template == 'definition':
+        return f"""
+    <div class="slide definition" data-template="definition">
+      <h2>{js_str(js_or(g('term'), ''))}</h2>
+      <p>{js_str(js_or(g('desc'), ''))}</p>
+    </div>"""
+    if template in ('bullets', 'list_toc'):
+        cls, name = ('bullets', 'bullets') if template == 'bullets' else ('list-toc', 'list-table-of-contents')
+        items = '\n        '.join(f"<li>{js_str(i)}</li>" for i in js_or(g('items'), []))
+        return f"""
+    <div class="slide {cls}" data-template="{name}">
+      <h2>{js_str(js_or(g('title'), ''))}</h2>
+      <ul>
+        {items}
+      </ul>
+    </div>"""
+    if template == 'process':
+        steps = '\n        '.join(f"<li>{js_str(s)}</li>" for s in js_or(g('steps'), []))
+        return f"""
+    <div class="slide process" data-template="process">
+      <h2>{js_str(js_or(g('title'), ''))}</h2>
+      <ol>
+        {steps}
+      </ol>
+    </div>"""
+    if template == 'comparison':
+        rows = '\n        '.join(f"""
+          <tr>
+            <td>{js_str(c)}</td>
+            <td>{js_str(js_or(at(g('left'), i), ''))}</td>
+            <td>{js_str(js_or(at(g('right'), i), ''))}</td>
+          </tr>""" for i, c in enumerate(js_or(g('criteria'), [])))
+        return f"""
+    <div class="slide comparison" data-template="comparison">
+      <h2>{js_str(js_or(g('title'), ''))}</h2>
+      <table>
+        <thead>
+          <tr>
+            <th>項目</th>
+            <th>左</th>
+            <th>右</th>
+          </tr>
+        </thead>
+        <tbody>
+          {rows}
+        </tbody>
+      </table>
+    </div>"""
+    if template == 'recap':
+        points = '\n        '.join(f"<li>{js_str(p)}</li>" for p in js_or(g('items'), js_or(g('points'), [])))
+        return f"""
+    <div class="slide recap" data-template="recap">
+      <h2>{js_str(js_or(g('title'), 'まとめ'))}</h2>
+      <ul>
+        {points}
+      </ul>
+    </div>"""
+    if template == 'cta':
+        link = f'<a href="{js_str(g("link"))}" class="link">リンク</a>' if js_or(g('link'), None) else ''
+        return f"""
+    <div class="slide cta" data-template="cta">
+      <h2>最後に</h2>
+      <p class="message">{js_str(js_or(g('message'), ''))}</p>
+      {link}
+    </div>"""
+    if template == 'diagram':
+        return """
+    <div class="slide diagram" data-template="diagram">
+      <h2>図解</h2>
+      <div class="placeholder">ここにSVGを挿入</div>
+    </div>"""
+    if template == 'illustration':
+        return """
+    <div class="slide illustration" data-template="illustration">
+      <h2>イラスト</h2>
+      <div class="placeholder">ここに画像を挿入</div>
+    </div>"""
+    if template == 'strong_title':
+        return f"""
+    <div class="slide strong-title" data-template="strong-title">
+      <h1>{js_str(js_or(g('title'), js_or(g('message'), '')))}</h1>
+    </div>"""
+    if template == 'illustrations':
+        desc = g('description')
+        desc_html = f'<p class="description">{js_str(desc).replace(chr(10), "<br>")}</p>' if js_or(desc, None) else ''
+        return f"""
+    <div class="slide illustrations" data-template="illustrations">
+      <h2>{js_str(js_or(g('title'), ''))}</h2>
+      <div class="image-placeholder">
+        <p class="caption">{js_str(js_or(g('caption'), 'ここにイラスト/サムネイル画像'))}</p>
+        {desc_html}
+      </div>
+    </div>"""
+    if template == 'screenshots':
+        images = js_or(g('images'), [])
+        parts = []
+        for img in images:
+            desc = img.get('description')
+            desc_html = f'<p class="description">{js_str(desc).replace(chr(10), "<br>")}</p>' if js_or(desc, None) else ''
+            parts.append(f"""
+        <div class="screenshot-placeholder">
+          <p class="caption">{js_str(js_or(img.get('caption'), 'ここにスクリーンショット画像'))}</p>
+          {desc_html}
+        </div>""")
+        shots = '\n        '.join(parts)
+        extra = '<div class="screenshot-placeholder">ここにスクリーンショット画像</div>' if len(images) < 2 else ''
+        return f"""
+    <div class="slide screenshots" data-template="screenshots">
+      <h2>{js_str(js_or(g('title'), ''))}</h2>
+      <div class="screenshots-grid">
+        {shots}
+        {extra}
+      </div>
+    </div>"""
+    return f"""
+    <div class="slide" data-template="{js_str(js_or(template, 'unknown'))}">
+      <h2>{js_str(js_or(g('title'), ''))}</h2>
+      <p>{js_str(js_or(g('body'), ''))}</p>
+    </div>"""
+
+
+HTML_DOCUMENT = """<!DOCTYPE html>
+<html lang="ja">
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>YouTube解説動画スライド</title>
+  <link rel="stylesheet" href="styles.css">
+</head>
+<body>
+  <div class="slides-container">
+    {slides}
+  </div>
+
+  <script>
+    // スライド操作
+    let currentSlide = 0;
+    const slides = document.querySelectorAll('.slide');
+
+    function showSlide(n) {{
+      slides.forEach((slide, index) => {{
+        slide.classList.remove('active');
+        if (index === n) {{
+          slide.classList.add('active');
+        }}
+      }});
+    }}
+
+    function nextSlide() {{
+      currentSlide = (currentSlide + 1) % slides.length;
+      showSlide(currentSlide);
+    }}
+
+    function prevSlide() {{
+      currentSlide = (currentSlide - 1 + slides.length) % slides.length;
+      showSlide(currentSlide);
+    }}
+
+    // キーボード操作
+    document.addEventListener('keydown', (e) => {{
+      if (e.key === 'ArrowRight' || e.key === ' ') {{
+        nextSlide();
+      }} else if (e.key === 'ArrowLeft') {{
+        prevSlide();
+      }}
+    }});
+
+    // 初期表示
+    showSlide(0);
+  </script>
+</body>
+</html>
+"""
+
+
+def render_html(resolved):
+    slides = ''.join(html_slide(template, fields) for template, fields, _, _ in resolved)
+    return HTML_DOCUMENT.format(slides=slides)
+
+
+# --- Marp Markdown（07_html_to_marp.js） ----------------------------------------
+
+def marp_slide(template, fields):
+    g = fields.get
+    md = f"# {js_str(g('title'))}\n\n"
+    if template in ('list_toc', 'bullets', 'recap'):
+        if isinstance(g('items'), list):
+            md += ''.join(f"- {js_str(item)}\n" for item in g('items'))
+    elif template == 'process':
+        if isinstance(g('steps'), list):
+            md += ''.join(f"{i + 1}. {js_str(step)}\n" for i, step in enumerate(g('steps')))
+    elif template in ('title_card', 'strong_title'):
+        if js_or(g('subtitle'), None):
+            md += f"{js_str(g('subtitle'))}\n"
+    elif template == 'definition':
+        if js_or(g('definition'), None):
+            md += f"{js_str(g('definition'))}\n"
+    elif template == 'comparison':
+        if isinstance(g('items'), list):
+            md += "| 項目 | 内容 |\n"
+            md += "|------|------|\n"
+            for item in g('items'):
+                md += f"| {js_str(js_or(item.get('label'), ''))} | {js_str(js_or(item.get('value'), ''))} |\n"
+    elif template == 'cta':
+        if js_or(g('message'), None):
+            md += f"{js_str(g('message'))}\n\n"
+        if js_or(g('action'), None):
+            md += f"**{js_str(g('action'))}**\n"
+    else:
+        if isinstance(g('items'), list):
+            md += ''.join(f"- {js_str(item)}\n" for item in g('items'))
+    return md
+
+
+def render_marp(resolved):
+    markdown = "---\nmarp: true\ntheme: yt-mvp-dark\npaginate: true\n---\n\n"
+    for index, (template, fields, _, _) in enumerate(resolved):
+        if index > 0:
+            markdown += '\n---\n\n'
+        markdown += marp_slide(template, fields)
+    return markdown
+
+
+# --- Markdown（06_render.js） ---------------------------------------------------
+
+def md_esc(s):
+    return js_str(s).replace('|', '\\|')
+
+
+def md_slide(template, f):
+    g = f.get
+    if template == 'title_card':
+        return f"# {js_str(js_or(g('title'), ''))}\n\n**{js_str(js_or(g('subtitle'), ''))}**\n"
+    if template == 'definition':
+        return f"## {js_str(js_or(g('term'), ''))}\n\n{js_str(js_or(g('desc'), ''))}\n"
+    if template in ('bullets', 'list_toc'):
+        items = '\n'.join(f"- {js_str(i)}" for i in js_or(g('items'), []))
+        return f"## {js_str(js_or(g('title'), ''))}\n\n{items}\n"
+    if template == 'process':
+        steps = '\n'.join(f"{i + 1}. {js_str(s)}" for i, s in enumerate(js_or(g('steps'), [])))
+        return f"## {js_str(js_or(g('title'), ''))}\n\n{steps}\n"
+    if template == 'comparison':
+        rows = '\n'.join(
+            f"| {md_esc(js_or(c, ''))} | {md_esc(js_or(at(g('left'), i), ''))} | {md_esc(js_or(at(g('right'), i), ''))} |"
+            for i, c in enumerate(js_or(g('criteria'), [])))
+        return f"## {js_str(js_or(g('title'), ''))}\n\n| 項目 | 左 | 右 |\n|---|---|---|\n{rows}\n"
+    if template == 'recap':
+        points = '\n'.join(f"- {js_str(p)}" for p in js_or(g('points'), []))
+        return f"## まとめ\n\n{points}\n"
+    if template == 'cta':
+        link = f"[リンク]({js_str(g('link'))})" if js_or(g('link'), None) else ''
+        return f"## 最後に\n\n{js_str(js_or(g('message'), ''))}\n\n{link}\n"
+    if template == 'diagram':
+        return "## 図解\n\n(ここにSVGを挿入:MVPではプレースホルダー)\n"
+    if template == 'illustration':
+        return "## イラスト\n\n(ここに画像を挿入:MVPではプレースホルダー)\n"
+    if template == 'strong_title':
+        return f"\n<!-- _class: strong-title -->\n\n# {js_str(js_or(g('title'), js_or(g('message'), '')))}\n"
+    if template == 'illustrations':
+        return (f"## {js_str(js_or(g('title'), ''))}\n\n"
+                f"![]({js_str(js_or(g('image_path'), 'placeholder.png'))})\n\n"
+                f"_{js_str(js_or(g('caption'), 'ここにイラスト/サムネイル画像'))}_\n")
+    if template == 'screenshots':
+        img1 = js_str(js_or(g('screenshot1'), 'placeholder1.png'))
+        img2 = js_str(js_or(g('screenshot2'), 'placeholder2.png'))
+        return (f"## {js_str(js_or(g('title'), ''))}\n\n<div style=\"display: flex; gap: 20px;\">\n\n"
+                f"![]({img1})\n\n![]({img2})\n\n</div>\n")
+    return f"## {js_str(js_or(g('title'), ''))}\n\n{js_str(js_or(g('body'), ''))}\n"
+
+
+def render_md(resolved):
+    header = "---\nmarp: true\npaginate: true\n---\n\n"
+    body = ''.join("\n---\n\n" + md_slide(template, fields) for template, fields, _, _ in resolved)
+    return header + body.strip() + '\n'
+
+
+# --- 出力 -----------------------------------------------------------------------
+
+TEXT_RENDERERS = {
+    'html': render_html,
+    'marp': render_marp,
+    'md': render_md,
+}
+
+
+def write_text(path, text):
+    output_dir = os.path.dirname(path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def emit(fmt, resolved, template_path, output_path):
+    """1フォーマットを出力し、所要時間（秒）を返す"""
+    start = time.perf_counter()
+    if fmt == 'pptx':
+        render_pptx_module.render_pptx(resolved, template_path, output_path)
+    else:
+        write_text(output_path, TEXT_RENDERERS[fmt](resolved))
+        print(f"Wrote {output_path}")
+    return time.perf_counter() - start
+
+
+def render_all(slides_plan_path, template_path, out_dir, formats=FORMATS):
+    """
+    プランを1回だけ解析し、指定フォーマットをすべて並行して出力
+
+    Returns:
+        dict: フォーマットごとの出力パスと所要時間
+    """
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        print(f"Error: Unknown format: {', '.join(unknown)} (available: {', '.join(FORMATS)})")
+        sys.exit(1)
+
+    plan_data = render_pptx_module.load_plan(slides_plan_path)
+    resolved = render_pptx_module.resolve_templates(render_pptx_module.get_slides_data(plan_data))
+
+    outputs = {fmt: os.path.join(out_dir, OUTPUT_PATHS[fmt]) for fmt in formats}
+    with ThreadPoolExecutor(max_workers=len(formats) or 1) as pool:
+        futures = {fmt: pool.submit(emit, fmt, resolved, template_path, path)
+                   for fmt, path in outputs.items()}
+        timings = {fmt: future.result() for fmt, future in futures.items()}
+
+    return {fmt: {'path': outputs[fmt], 'seconds': timings[fmt]} for fmt in formats}
+
+
+def main():
+    if len(sys.argv) < 4:
+        print("Usage: python src/render_multi.py <slides_plan.json> <template.pptx> <out_dir> [formats]")
+        print(f"  formats: comma separated ({','.join(FORMATS)}), default: all")
+        sys.exit(1)
+
+    slides_plan_path = sys.argv[1]
+    template_path = sys.argv[2]
+    out_dir = sys.argv[3]
+    formats = sys.argv[4].split(',') if len(sys.argv) >= 5 else list(FORMATS)
+
+    start = time.perf_counter()
+    results = render_all(slides_plan_path, template_path, out_dir, formats)
+    total = time.perf_counter() - start
+
+    print(f"\n=== Render Summary ===")
+    for fmt, result in results.items():
+        print(f"{fmt}: {result['path']} ({result['seconds'] * 1000:.0f} ms)")
+    print(f"Total: {total * 1000:.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+1つのプランを複数のテンプレート（ダーク版・ライト版など）で一度に生成
+プランの読み込み・テンプレートスライドの決定・内容の組み立て（行の切り詰め・手順の番号付け）は
+プランごとに1回だけ行い、テンプレートごとのワーカープロセスで並行して生成する
+
+- 中間表現: [(テンプレート名, テンプレートスライド番号, SlideModel)]（06_render_pptx.build_slide_model）
+- 各ワーカーはテンプレートの雛形（watch_render.SlidePrototype）を保持し、バッチ内の全プランで使い回す
+- スライドの追加は shard_render.SlideAssembler で行う（add_slide の毎回の検索を避ける）
+- テンプレートは同じ構成（スライドの並び・図形の順番）であることが前提。出力は
+  06_render_pptx.py でテンプレートごとに生成した場合と同じ
+
+出力先: <out_dir>/<テンプレート名>/<プラン名>.pptx
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+import importlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from pptx import Presentation
+
+from watch_render import SlidePrototype
+from shard_render import SlideAssembler
+
+render_pptx_module = importlib.import_module('06_render_pptx')
+
+
+def prepare_plan(plan_data):
+    """
+    プランをテンプレートに依存しない中間表現にする
+
+    Returns:
+        list: [(テンプレート名, テンプレートスライド番号, SlideModel), ...]
+    """
+    resolved = render_pptx_module.resolve_templates(render_pptx_module.get_slides_data(plan_data))
+    return [(template_name, template_idx, render_pptx_module.build_slide_model(fields, template_idx))
+            for template_name, fields, item_count, template_idx in resolved]
+
+
+class TemplatePrototypes:
+    """テンプレート1つ分の雛形（ファイルの内容とスライドごとの SlidePrototype）"""
+
+    def __init__(self, template_path):
+        self.template_path = template_path
+        with open(template_path, 'rb') as f:
+            self.blob = f.read()
+        prs = Presentation(io.BytesIO(self.blob))
+        self.prototypes = [SlidePrototype(slide) for slide in prs.slides]
+
+    def __len__(self):
+        return len(self.prototypes)
+
+    def render(self, slides, output_path, streaming=False, deterministic=False):
+        """
+        中間表現のスライド一覧からpptxを生成
+
+        Returns:
+            str: 出力の内容ハッシュ（deterministic=True の場合。それ以外はNone）
+        """
+        prs = Presentation(io.BytesIO(self.blob))
+        layouts = {str(layout.part.partname): layout
+                   for master in prs.slide_masters for layout in master.slide_layouts}
+        assembler = SlideAssembler(prs)
+        for template_name, template_idx, model in slides:
+            if template_idx >= len(self.prototypes):
+                print(f"Warning: Template index {template_idx} out of range")
+                continue
+            prototype = self.prototypes[template_idx]
+            new_slide = prototype.instantiate(prs, layouts[prototype.layout_partname], slides=assembler)
+            render_pptx_module.apply_slide_model(new_slide, model)
+        render_pptx_module.remove_template_slides(prs, len(self.prototypes))
+        return render_pptx_module.save_presentation(prs, output_path, source_path=self.template_path,
+                                                    streaming=streaming, deterministic=deterministic)
+
+
+# --- ワーカー -------------------------------------------------------------------
+
+_prototype_cache = {}
+
+
+def get_prototypes(template_path):
+    """テンプレートの雛形（パス・mtime・サイズが同じ間はプロセス内でキャッシュ）"""
+    st = os.stat(template_path)
+    key = (os.path.abspath(template_path), st.st_mtime_ns, st.st_size)
+    prototypes = _prototype_cache.get(key)
+    if prototypes is None:
+        prototypes = _prototype_cache[key] = TemplatePrototypes(template_path)
+    return prototypes
+
+
+def _render_template(job):
+    """
+    1テンプレートで全プランを生成（ワーカープロセスで実行）
+
+    Returns:
+        list: [(出力パス, 所要時間（秒）, 内容ハッシュ or None), ...]
+    """
+    template_path, decks, streaming, deterministic = job
+    prototypes = get_prototypes(template_path)
+    results = []
+    for slides, output_path in decks:
+        start = time.perf_counter()
+        content_hash = prototypes.render(slides, output_path, streaming=streaming, deterministic=deterministic)
+        results.append((output_path, time.perf_counter() - start, content_hash))
+    return results
+
+
+# --- まとめて生成 ---------------------------------------------------------------
+
+def render_templates(plan_paths, template_paths, out_dir, workers=None, streaming=False, deterministic=False,
+                     schema_path=render_pptx_module.DEFAULT_SCHEMA_PATH):
+    """
+    各プランを各テンプレートで生成
+
+    Returns:
+        dict: {テンプレートのパス: [(出力パス, 所要時間（秒）, 内容ハッシュ or None), ...]}
+    """
+    template_names = [Path(p).stem for p in template_paths]
+    if len(set(template_names)) != len(template_names):
+        print("Error: Template file names must be unique (used as output directory names)")
+        sys.exit(1)
+    plan_names = [Path(p).stem for p in plan_paths]
+    if len(set(plan_names)) != len(plan_names):
+        print("Error: Plan file names must be unique (used as output file names)")
+        sys.exit(1)
+    for template_path in template_paths:
+        if not os.path.exists(template_path):
+            print(f"Error: Template file not found: {template_path}")
+            sys.exit(1)
+
+    # プラン側の処理は1回だけ
+    decks = []
+    for plan_path, plan_name in zip(plan_paths, plan_names):
+        plan_data = render_pptx_module.load_plan(str(plan_path))
+        render_pptx_module.check_plan(plan_data, schema_path)
+        decks.append((plan_name, prepare_plan(plan_data)))
+
+    jobs = []
+    for template_path, template_name in zip(template_paths, template_names):
+        template_decks = [(slides, os.path.join(out_dir, template_name, plan_name + '.pptx'))
+                          for plan_name, slides in decks]
+        jobs.append((str(template_path), template_decks, streaming, deterministic))
+
+    if len(jobs) > 1 and (workers is None or workers > 1):
+        with ProcessPoolExecutor(max_workers=min(len(jobs), workers or os.cpu_count() or 1)) as pool:
+            results = list(pool.map(_render_template, jobs))
+    else:
+        results = [_render_template(job) for job in jobs]
+    return dict(zip(template_paths, results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='1つのプランを複数のテンプレートで並行して生成')
+    parser.add_argument('plans', nargs='+', help='03_slides_tuned.json / .yplan（複数可）')
+    parser.add_argument('-t', '--template', action='append', required=True, help='テンプレートのpptx（複数指定）')
+    parser.add_argument('-o', '--out', default='output', help='出力先ディレクトリ')
+    parser.add_argument('--workers', type=int, default=None, help='ワーカープロセス数（既定: テンプレート数）')
+    parser.add_argument('--stream', action='store_true', help='パーツ単位のストリーム書き込みで保存')
+    parser.add_argument('--deterministic', action='store_true', help='同じ入力から同じバイト列を出力')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = render_templates(args.plans, args.template, args.out, workers=args.workers,
+                               streaming=args.stream, deterministic=args.deterministic)
+    total = time.perf_counter() - start
+
+    for template_path, outputs in results.items():
+        print(f"{template_path}:")
+        for output_path, seconds, content_hash in outputs:
+            print(f"  {output_path} ({seconds * 1000:.0f} ms)" + (f" {content_hash}" if content_hash else ''))
+    print(f"\nGenerated {sum(len(o) for o in results.values())} decks from {len(args.plans)} plans "
+          f"x {len(args.template)} templates in {total:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+1つのデッキを複数プロセスで分担して生成する（06_render_pptx.py の --shards）
+プランを連続した区間（シャード）に分け、各ワーカーがテンプレートを読み込んで
+担当区間のスライドを生成し、スライドのXMLと rels の参照先（slide_store と同じ形式）を返す
+最後にメインプロセスで表示順に組み立てるため、出力は1プロセスで生成した場合と同じになる
+
+- スライドのパーツ名・プレゼンテーションの rId・スライドIDは、python-pptx の add_slide と同じ規則で振る
+- 組み立てでは add_slide を使わない（スライド数に比例する検索を毎回行うため、数百枚で遅くなる）
+- slide_store を渡すと、ストアにあるスライドはワーカーに回さずにそのまま使う
+"""
+
+import io
+import math
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+from pptx import Presentation
+from pptx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.oxml import parse_xml
+from pptx.parts.slide import SlidePart
+
+from slide_store import relate_entry, remap_rids, slide_store_key, snapshot_slide, template_fingerprint
+
+render_pptx_module = importlib.import_module('06_render_pptx')
+
+# 1シャードあたりの最小スライド数（これ未満ならプロセスを増やしても速くならない）
+MIN_SLIDES_PER_SHARD = 16
+
+MAX_SLIDE_ID = 2147483647
+
+
+# --- ワーカー -------------------------------------------------------------------
+
+_template_blobs = {}
+
+
+def _render_shard(job):
+    """
+    担当区間のスライドを生成（ワーカープロセスで実行）
+
+    Returns:
+        list: スライドごとの snapshot_slide の結果
+    """
+    template_path, items = job
+    blob = _template_blobs.get(template_path)
+    if blob is None:
+        with open(template_path, 'rb') as f:
+            blob = _template_blobs[template_path] = f.read()
+    prs = Presentation(io.BytesIO(blob))
+    entries = []
+    for template_idx, fields in items:
+        new_slide = render_pptx_module.duplicate_slide(prs, template_idx)
+        render_pptx_module.fill_slide_content(new_slide, fields, template_idx)
+        entries.append(snapshot_slide(new_slide))
+    return entries
+
+
+def split_shards(items, shards):
+    """items を連続した区間に分ける（区間の大きさの差は1以内）"""
+    shards = max(1, min(shards, len(items)))
+    size, extra = divmod(len(items), shards)
+    result, start = [], 0
+    for i in range(shards):
+        end = start + size + (1 if i < extra else 0)
+        result.append(items[start:end])
+        start = end
+    return result
+
+
+def render_entries(template_path, items, shards, workers=None):
+    """
+    (template_idx, fields) の一覧を分担して生成
+
+    Returns:
+        list: items と同じ順のスライド（snapshot_slide の形式）
+    """
+    shards = min(shards, math.ceil(len(items) / MIN_SLIDES_PER_SHARD))
+    if shards <= 1:
+        return _render_shard((template_path, items))
+    chunks = split_shards(items, shards)
+    with ProcessPoolExecutor(max_workers=min(workers or shards, shards)) as pool:
+        results = pool.map(_render_shard, [(template_path, chunk) for chunk in chunks])
+        return [entry for entries in results for entry in entries]
+
+
+# --- 組み立て -------------------------------------------------------------------
+
+class SlideAssembler:
+    """
+    生成済みのスライド（snapshot_slide の形式）や空のスライドをプレゼンテーションの末尾に追加していく
+    （add_slide は prs.slides.add_slide の代わりに使える）
+    """
+
+    def __init__(self, prs):
+        self.prs = prs
+        self.package = prs.part.package
+        self.sldIdLst = prs.slides._sldIdLst
+        self.parts_by_name = {str(p.partname): p for p in self.package.iter_parts()}
+        self.next_id = self.sldIdLst._next_id
+
+    def _next_partname(self):
+        return PackURI('/ppt/slides/slide%d.xml' % (len(self.sldIdLst) + 1))
+
+    def _add_sldId(self, slide_part):
+        # 新しいパーツは既存の関係と一致しないので、一致する関係を探さずに追加する
+        rId = self.prs.part.rels._add_relationship(RT.SLIDE, slide_part)
+        if self.next_id > MAX_SLIDE_ID:
+            self.next_id = self.sldIdLst._next_id
+        self.sldIdLst._add_sldId(id=self.next_id, rId=rId)
+        self.next_id += 1
+
+    def append(self, entry):
+        """スライドを1枚追加（add_slide と同じパーツ名・rId・スライドIDになる）"""
+        element = parse_xml(entry['xml'])
+        slide_part = SlidePart(self._next_partname(), CT.PML_SLIDE, self.package, element)
+        remap_rids(element, relate_entry(self.prs, slide_part, entry, self.parts_by_name))
+        self._add_sldId(slide_part)
+        return slide_part.slide
+
+    def add_slide(self, slide_layout):
+        """レイアウトから空のスライドを追加（prs.slides.add_slide と同じ結果）"""
+        slide_part = SlidePart.new(self._next_partname(), self.package, slide_layout.part)
+        slide = slide_part.slide
+        slide.shapes.clone_layout_placeholders(slide_layout)
+        self._add_sldId(slide_part)
+        return slide
+
+
+def render_sharded(prs, resolved, template_path, shards, workers=None, slide_store=None):
+    """
+    resolved のスライドを分担して生成し、prs の末尾に表示順で追加
+
+    Returns:
+        int: 追加したスライド数
+    """
+    num_template_slides = len(prs.slides)
+    fingerprint = template_fingerprint(template_path) if slide_store is not None else None
+
+    # ストアにあるスライドはそのまま使い、残りをワーカーに回す
+    entries, keys, pending = [], [], []
+    for idx, (template_name, fields, item_count, template_idx) in enumerate(resolved):
+        print(f"Slide {idx + 1}: Using template {template_idx + 1} for '{template_name}' with {item_count} items")
+        if template_idx >= num_template_slides:
+            print(f"Warning: Template index {template_idx} out of range")
+            continue
+        key = slide_store_key(fingerprint, template_idx, fields) if slide_store is not None else None
+        cached = slide_store.get(key) if slide_store is not None else None
+        if cached is None:
+            pending.append((len(entries), (template_idx, fields)))
+        entries.append(cached)
+        keys.append(key)
+
+    if pending:
+        print(f"Rendering {len(pending)} slides in up to {shards} shards...")
+        rendered = render_entries(template_path, [item for _, item in pending], shards, workers)
+        for (position, _), entry in zip(pending, rendered):
+            entries[position] = entry
+            if slide_store is not None:
+                slide_store.put(keys[position], entry)
+
+    assembler = SlideAssembler(prs)
+    for entry in entries:
+        assembler.append(entry)
+    return len(entries)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+生成済みスライドのコンテンツアドレス型ストア
+(テンプレートの指紋, テンプレートスライド番号, fields) のハッシュをキーに、
+生成したスライドのXMLと関係（rels）の参照先を保存し、次回以降は複製・差し込みをせずに組み立てる
+
+- テンプレートの指紋はファイル内容のSHA-256（テンプレートが変わればキーも変わる）
+- rels の参照先は、テンプレート内のパーツならパーツ名、外部リンクならURL、
+  それ以外（スライドで追加されたメディアなど）は内容ごと保存する
+- 合計サイズが上限を超えたら、最近使われていないエントリから削除する
+- ヒット率などの統計は stats で参照できる
+- SlideMemo は同じ形式のエントリをプロセス内のメモリに保持するLRU（バッチ生成でデッキをまたいで使う）
+- エントリに render_seconds（生成にかかった時間）があれば、ヒット時に組み立て時間との差を節約時間として数える
+"""
+
+import os
+import re
+import sys
+import json
+import base64
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from lxml import etree
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import Part
+
+DEFAULT_STORE_DIR = Path(__file__).resolve().parent.parent / 'output' / '.slide_store'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_MEMO_BYTES = 64 * 1024 * 1024
+ENTRY_SUFFIX = '.slide.json'
+
+R_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+
+_fingerprints = {}
+
+
+def template_fingerprint(template_path):
+    """テンプレートの内容ハッシュ（パス・mtime・サイズが同じ間はキャッシュ）"""
+    st = os.stat(template_path)
+    cache_key = (os.path.abspath(template_path), st.st_mtime_ns, st.st_size)
+    fingerprint = _fingerprints.get(cache_key)
+    if fingerprint is None:
+        digest = hashlib.sha256()
+        with open(template_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        fingerprint = _fingerprints[cache_key] = digest.hexdigest()
+    return fingerprint
+
+
+def slide_store_key(fingerprint, template_idx, fields):
+    """ストアのキー（fieldsはキー順を正規化してからハッシュ）"""
+    payload = json.dumps([fingerprint, template_idx, fields], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+# --- スライドの保存・復元 -------------------------------------------------------
+
+def snapshot_slide(slide):
+    """スライドをストアに保存できる形（XMLと rels の参照先）に変換"""
+    part = slide.part
+    rels = []
+    for rId, rel in part.rels.items():
+        entry = {'rId': rId, 'reltype': rel.reltype}
+        if rel.is_external:
+            entry['external'] = rel.target_ref
+        else:
+            target = rel.target_part
+            entry['partname'] = str(target.partname)
+            if rel.reltype != RT.SLIDE_LAYOUT:
+                # テンプレートに無いパーツだった場合に備えて内容も保存
+                entry['content_type'] = target.content_type
+                entry['blob'] = base64.b64encode(target.blob).decode('ascii')
+        rels.append(entry)
+    return {'xml': etree.tostring(slide.element, encoding='unicode'), 'rels': rels}
+
+
+def _partname_template(partname):
+    # '/ppt/media/image3.png' → '/ppt/media/image%d.png'
+    return re.sub(r'\d+(\.\w+)$', r'%d\1', partname)
+
+
+def relate_entry(prs, part, entry, parts_by_name):
+    """
+    保存した rels をパーツに張り直す（保存した順に関係を追加する）
+
+    Returns:
+        dict: {保存時のrId: 新しいrId}
+    """
+    rid_map = {}
+    for rel in entry['rels']:
+        if 'external' in rel:
+            rid_map[rel['rId']] = part.relate_to(rel['external'], rel['reltype'], is_external=True)
+            continue
+        target = parts_by_name.get(rel['partname'])
+        if rel['reltype'] != RT.SLIDE_LAYOUT and (target is None or target.blob != base64.b64decode(rel['blob'])):
+            blob = base64.b64decode(rel['blob'])
+            partname = prs.part.package.next_partname(_partname_template(rel['partname']))
+            target = Part.load(partname, rel['content_type'], prs.part.package, blob)
+            parts_by_name[str(partname)] = target
+        rid_map[rel['rId']] = part.relate_to(target, rel['reltype'])
+    return rid_map
+
+
+def remap_rids(element, rid_map):
+    """要素内の r:id / r:embed などの参照を rid_map で置き換える"""
+    for el in element.iter():
+        for name, value in el.attrib.items():
+            if name.startswith('{%s}' % R_NS) and value in rid_map:
+                el.set(name, rid_map[value])
+
+
+def restore_slide(prs, entry, parts_by_name=None):
+    """
+    保存したスライドをprsの末尾に追加
+
+    Args:
+        parts_by_name: {パーツ名: パーツ}（複数枚を復元する場合は使い回すと速い）
+    """
+    if parts_by_name is None:
+        parts_by_name = {str(p.partname): p for p in prs.part.package.iter_parts()}
+
+    layout_rel = next(r for r in entry['rels'] if r['reltype'] == RT.SLIDE_LAYOUT)
+    layout_part = parts_by_name[layout_rel['partname']]
+    new_slide = prs.slides.add_slide(layout_part.slide_layout)
+    rid_map = relate_entry(prs, new_slide.part, entry, parts_by_name)
+
+    # 要素自体は python-pptx の Slide が参照しているので、中身だけ入れ替える
+    cached = etree.fromstring(entry['xml'])
+    remap_rids(cached, rid_map)
+    element = new_slide.element
+    for child in list(element):
+        element.remove(child)
+    element.attrib.clear()
+    element.attrib.update(cached.attrib)
+    element.extend(list(cached))
+    return new_slide
+
+
+# --- ストア ---------------------------------------------------------------------
+
+class _SlideCache:
+    """SlideStore・SlideMemo に共通の統計"""
+
+    def note_restore(self, entry, seconds):
+        """ヒットしたエントリを組み立てた時間を記録（生成時間との差を節約時間に加える）"""
+        render_seconds = entry.get('render_seconds')
+        if render_seconds is not None:
+            self.stats['saved_seconds'] += render_seconds - seconds
+
+    def hit_rate(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+
+class SlideStore(_SlideCache):
+    """ディレクトリに保存するスライドストア（サイズ上限つきLRU）"""
+
+    def __init__(self, store_dir=DEFAULT_STORE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.store_dir = Path(store_dir)
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'puts': 0, 'evictions': 0, 'saved_seconds': 0.0}
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        # 起動時に一度だけ一覧を作り、以降はメモリ上で合計サイズを管理する
+        self._entries = {}
+        for path in self.store_dir.glob('*/*' + ENTRY_SUFFIX):
+            st = path.stat()
+            self._entries[path.name[:-len(ENTRY_SUFFIX)]] = [st.st_size, st.st_mtime_ns]
+        self.total_bytes = sum(size for size, _ in self._entries.values())
+        self._evict()
+
+    def _path(self, key):
+        return self.store_dir / key[:2] / (key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """エントリを取得（無ければNone）"""
+        if key not in self._entries:
+            self.stats['misses'] += 1
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._forget(key)
+            self.stats['misses'] += 1
+            return None
+        self._entries[key][1] = os.stat(path).st_mtime_ns
+        self.stats['hits'] += 1
+        return entry
+
+    def put(self, key, entry):
+        """エントリを保存（一時ファイルに書いてから置き換え）"""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        self._forget(key)
+        self._entries[key] = [len(data), os.stat(path).st_mtime_ns]
+        self.total_bytes += len(data)
+        self.stats['puts'] += 1
+        self._evict()
+
+    def _forget(self, key):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old[0]
+
+    def _evict(self):
+        if self.total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._entries.items(), key=lambda item: item[1][1]):
+            if self.total_bytes <= self.max_bytes:
+                break
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            self._forget(key)
+            self.stats['evictions'] += 1
+
+    def summary(self):
+        """統計の1行表示"""
+        s = self.stats
+        return (f"slide store: {s['hits']} hits, {s['misses']} misses ({self.hit_rate():.0%} hit rate), "
+                f"{s['puts']} stored, {s['evictions']} evicted, "
+                f"{len(self._entries)} entries / {self.total_bytes / 1024:.0f} KB, "
+                f"{s['saved_seconds'] * 1000:.0f} ms saved")
+
+    def clear(self):
+        for key in list(self._entries):
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
+            self._forget(key)
+
+
+def _entry_size(entry):
+    # XMLと、エントリに含めたメディアの大きさ（おおよそのメモリ使用量）
+    return len(entry['xml']) + sum(len(rel.get('blob', '')) for rel in entry['rels'])
+
+
+class SlideMemo(_SlideCache):
+    """
+    プロセス内のメモリに保持するスライドのLRU（SlideStore と同じ get / put で使える）
+    スレッド間で共有してよい（エントリは組み立て時に読むだけ）
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MEMO_BYTES):
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'puts': 0, 'evictions': 0, 'saved_seconds': 0.0}
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return item[0]
+
+    def put(self, key, entry):
+        size = _entry_size(entry)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (entry, size)
+            self.total_bytes += size
+            self.stats['puts'] += 1
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.stats['evictions'] += 1
+
+    def note_restore(self, entry, seconds):
+        with self._lock:
+            super().note_restore(entry, seconds)
+
+    def summary(self):
+        """統計の1行表示"""
+        s = self.stats
+        return (f"slide memo: {s['hits']} hits, {s['misses']} misses ({self.hit_rate():.0%} hit rate), "
+                f"{len(self._entries)} entries / {self.total_bytes / 1024:.0f} KB, "
+                f"{s['saved_seconds'] * 1000:.0f} ms saved")
+
+
+def open_slide_store():
+    """
+    環境変数からストアを開く（06_render_pptx.py の --slide-store 用）
+        SLIDE_STORE_DIR    : 保存先（既定 output/.slide_store）
+        SLIDE_STORE_MAX_MB : 合計サイズの上限（既定 256）
+    """
+    store_dir = os.environ.get('SLIDE_STORE_DIR', str(DEFAULT_STORE_DIR))
+    max_mb = float(os.environ.get('SLIDE_STORE_MAX_MB', DEFAULT_MAX_BYTES / 1024 / 1024))
+    return SlideStore(store_dir, int(max_mb * 1024 * 1024))
+
+
+def main():
+    usage = ("Usage:\n"
+             "  python src/slide_store.py stats [store_dir]\n"
+             "  python src/slide_store.py clear [store_dir]")
+    if len(sys.argv) < 2 or sys.argv[1] not in ('stats', 'clear'):
+        print(usage)
+        sys.exit(1)
+
+    store = SlideStore(sys.argv[2]) if len(sys.argv) > 2 else open_slide_store()
+    if sys.argv[1] == 'clear':
+        count = len(store._entries)
+        store.clear()
+        print(f"Removed {count} entries from {store.store_dir}")
+    else:
+        print(f"{store.store_dir}: {len(store._entries)} entries, {store.total_bytes / 1024:.0f} KB "
+              f"(limit {store.max_bytes / 1024 / 1024:.0f} MB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+省メモリなPowerPoint保存
+prs.save() の代わりに、各パーツをZIPのエントリへ1つずつ直接書き出す
+
+- XMLパーツは bytes を作らずにZIPのストリームへ直接シリアライズ
+- 元パッケージから変更されていないメディアは、元のZIPからチャンク単位でコピー
+- 上書き保存でも安全なように一時ファイルへ書いてから置き換える
+- deterministic=True の場合は同じ内容から常に同じバイト列を出力する
+  （ZIPの日時・属性を固定、パーツ名順に出力、XMLはC14Nで正規化）
+
+parallel_save はエントリの圧縮をスレッドプールで並列に行い（zlibはGILを解放する）、
+書き込みはエントリ順に行う。圧縮レベルを指定でき、0 は無圧縮（07_verify_colors.py で
+すぐに読み込み直す中間ファイル向け）
+"""
+
+import os
+import time
+import zlib
+import hashlib
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from lxml import etree
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.serialized import _ContentTypesItem
+
+from zip_patch import copy_raw, write_raw
+
+CHUNK_SIZE = 1024 * 1024
+
+# 決定的出力で使うZIPエントリの日時（ZIPで表現できる最小値）
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+XML_DECLARATION = b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\r\n'
+
+
+def fixed_date_time():
+    """決定的出力の日時（SOURCE_DATE_EPOCH が設定されていればその日時）"""
+    epoch = os.environ.get('SOURCE_DATE_EPOCH')
+    if epoch:
+        return max(time.gmtime(int(epoch))[:6], FIXED_DATE_TIME)
+    return FIXED_DATE_TIME
+
+
+def _zip_info(name, compress_type=zipfile.ZIP_DEFLATED, deterministic=False):
+    if not deterministic:
+        info = zipfile.ZipInfo(name, date_time=time.localtime(time.time())[:6])
+    else:
+        # 実行環境によって変わる作成OS・パーミッションも固定する
+        info = zipfile.ZipInfo(name, date_time=fixed_date_time())
+        info.create_system = 3
+        info.external_attr = 0o644 << 16
+    info.compress_type = compress_type
+    return info
+
+
+def canonical_xml(element):
+    """XML宣言 + C14N で正規化したバイト列"""
+    return XML_DECLARATION + etree.tostring(element, method='c14n')
+
+
+def _write_element(zout, name, element, deterministic=False):
+    """XML要素をZIPエントリへ直接シリアライズ（prs.saveと同じバイト列になる）"""
+    with zout.open(_zip_info(name, deterministic=deterministic), 'w', force_zip64=True) as f:
+        if deterministic:
+            f.write(canonical_xml(element))
+        else:
+            etree.ElementTree(element).write(f, encoding='UTF-8', standalone=True)
+
+
+def _write_rels(zout, name, rels_xml, deterministic=False):
+    if deterministic:
+        _write_element(zout, name, etree.fromstring(rels_xml), deterministic=True)
+    else:
+        _write_blob(zout, name, rels_xml)
+
+
+def _write_blob(zout, name, blob, deterministic=False):
+    with zout.open(_zip_info(name, deterministic=deterministic), 'w', force_zip64=True) as f:
+        view = memoryview(blob)
+        for offset in range(0, len(view), CHUNK_SIZE):
+            f.write(view[offset:offset + CHUNK_SIZE])
+
+
+def _is_unchanged(zin, name, blob):
+    """元パッケージのエントリと同じ内容か（サイズとCRCで判定）"""
+    try:
+        info = zin.getinfo(name)
+    except KeyError:
+        return False
+    return info.file_size == len(blob) and info.CRC == (zlib.crc32(blob) & 0xFFFFFFFF)
+
+
+def _copy_entry(zin, zout, name, deterministic=False):
+    with zin.open(name) as fin, zout.open(_zip_info(name, deterministic=deterministic), 'w', force_zip64=True) as fout:
+        shutil.copyfileobj(fin, fout, CHUNK_SIZE)
+
+
+def file_hash(path):
+    """ファイル内容のSHA-256（'sha256:...'）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return 'sha256:' + digest.hexdigest()
+
+
+def stream_save(prs, output_path, source_path=None, deterministic=False):
+    """
+    Presentationをパーツ単位のストリーム書き込みで保存
+
+    Args:
+        prs: python-pptxのPresentation
+        output_path: 出力先
+        source_path: prsの読み込み元pptx（指定時は未変更メディアをここからコピー）
+        deterministic: Trueの場合は同じ内容から同じバイト列を出力し、統計に content_hash を含める
+
+    Returns:
+        dict: 書き込み統計（XMLパーツ数・メディア数・元パッケージからのコピー数）
+    """
+    package = prs.part.package
+    parts = tuple(package.iter_parts())
+    if deterministic:
+        parts = tuple(sorted(parts, key=lambda part: part.partname))
+    stats = {'xml_parts': 0, 'binary_parts': 0, 'copied_from_source': 0}
+
+    tmp_path = output_path + '.partial'
+    zin = zipfile.ZipFile(source_path) if source_path and os.path.exists(source_path) else None
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zout:
+            _write_element(zout, CONTENT_TYPES_URI.membername, _ContentTypesItem.xml_for(parts), deterministic)
+            _write_rels(zout, PACKAGE_URI.rels_uri.membername, package._rels.xml, deterministic)
+
+            for part in parts:
+                name = part.partname.membername
+                element = getattr(part, '_element', None)
+                if element is not None:
+                    _write_element(zout, name, element, deterministic)
+                    stats['xml_parts'] += 1
+                elif zin is not None and _is_unchanged(zin, name, part.blob):
+                    _copy_entry(zin, zout, name, deterministic)
+                    stats['binary_parts'] += 1
+                    stats['copied_from_source'] += 1
+                else:
+                    _write_blob(zout, name, part.blob, deterministic)
+                    stats['binary_parts'] += 1
+
+                if part._rels:
+                    _write_rels(zout, part.partname.rels_uri.membername, part._rels.xml, deterministic)
+        if deterministic:
+            stats['content_hash'] = file_hash(tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if zin is not None:
+            zin.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return stats
+
+
+# --- 並列圧縮 -------------------------------------------------------------------
+
+def _serialize(element, deterministic=False):
+    """XML要素のバイト列（_write_element と同じ内容）"""
+    if deterministic:
+        return canonical_xml(element)
+    return etree.tostring(element, encoding='UTF-8', standalone=True)
+
+
+def _compress_entry(job):
+    """
+    1エントリ分のシリアライズと圧縮（スレッドプールで実行）
+
+    Returns:
+        (ZipInfo, 圧縮済みデータ)
+    """
+    name, kind, payload, compresslevel, deterministic = job
+    if kind == 'xml':
+        data = _serialize(payload, deterministic)
+    elif kind == 'rels' and deterministic:
+        data = canonical_xml(etree.fromstring(payload))
+    else:
+        data = payload
+
+    if compresslevel == 0:
+        info = _zip_info(name, zipfile.ZIP_STORED, deterministic)
+        compressed = data
+    else:
+        info = _zip_info(name, zipfile.ZIP_DEFLATED, deterministic)
+        # zipfile と同じ raw deflate（レベル未指定なら zlib の既定値）
+        compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION if compresslevel is None else compresslevel,
+                                      zlib.DEFLATED, -15)
+        compressed = compressor.compress(data) + compressor.flush()
+    info.CRC = zlib.crc32(data) & 0xFFFFFFFF
+    info.file_size = len(data)
+    info.compress_size = len(compressed)
+    return info, compressed
+
+
+def parallel_save(prs, output_path, source_path=None, deterministic=False, compresslevel=None, workers=None):
+    """
+    Presentationを保存（エントリの圧縮を並列に行い、エントリ順に書き込む）
+
+    Args:
+        prs: python-pptxのPresentation
+        output_path: 出力先
+        source_path: prsの読み込み元pptx（指定時は未変更メディアを圧縮データのままコピー。
+            deterministic=True の場合は他のエントリと同じく圧縮し直す）
+        deterministic: stream_save と同じ。compresslevel が既定値なら stream_save と同じバイト列になる
+        compresslevel: 圧縮レベル（None: zlibの既定値、0: 無圧縮、1〜9）
+        workers: 圧縮スレッド数（None: CPU数）
+
+    Returns:
+        dict: 書き込み統計（stream_save の項目と、圧縮前・圧縮後の合計バイト数）
+    """
+    if compresslevel is not None and not 0 <= compresslevel <= 9:
+        raise ValueError(f"Invalid compression level: {compresslevel} (0-9)")
+    package = prs.part.package
+    parts = tuple(package.iter_parts())
+    if deterministic:
+        parts = tuple(sorted(parts, key=lambda part: part.partname))
+    stats = {'xml_parts': 0, 'binary_parts': 0, 'copied_from_source': 0, 'file_bytes': 0, 'compressed_bytes': 0}
+
+    tmp_path = output_path + '.partial'
+    zin = zipfile.ZipFile(source_path) if source_path and os.path.exists(source_path) else None
+    try:
+        # エントリ順の一覧（圧縮するものは job、元のZIPからそのままコピーするものは元の ZipInfo）
+        entries = [
+            (CONTENT_TYPES_URI.membername, 'xml', _ContentTypesItem.xml_for(parts)),
+            (PACKAGE_URI.rels_uri.membername, 'rels', package._rels.xml),
+        ]
+        for part in parts:
+            name = part.partname.membername
+            element = getattr(part, '_element', None)
+            if element is not None:
+                entries.append((name, 'xml', element))
+                stats['xml_parts'] += 1
+            elif zin is not None and not deterministic and _is_unchanged(zin, name, part.blob):
+                entries.append((name, 'copy', zin.getinfo(name)))
+                stats['binary_parts'] += 1
+                stats['copied_from_source'] += 1
+            else:
+                entries.append((name, 'blob', part.blob))
+                stats['binary_parts'] += 1
+            if part._rels:
+                entries.append((part.partname.rels_uri.membername, 'rels', part._rels.xml))
+
+        jobs = [(name, kind, payload, compresslevel, deterministic)
+                for name, kind, payload in entries if kind != 'copy']
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool, \
+                zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zout:
+            # map はエントリ順に結果を返すので、先頭から順に書き込める
+            results = pool.map(_compress_entry, jobs)
+            for name, kind, payload in entries:
+                if kind == 'copy':
+                    copy_raw(zin, zout, payload, _zip_info(name))
+                    stats['file_bytes'] += payload.file_size
+                    stats['compressed_bytes'] += payload.compress_size
+                    continue
+                info, compressed = next(results)
+                # zipfile の書き込み（force_zip64=True）と同じヘッダーにする
+                write_raw(zout, info, (compressed,), zip64=True)
+                stats['file_bytes'] += info.file_size
+                stats['compressed_bytes'] += info.compress_size
+        if deterministic:
+            stats['content_hash'] = file_hash(tmp_path)
+        os.replace(tmp_path, output_path)
+    finally:
+        if zin is not None:
+            zin.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return stats
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+スライドのサムネイル（低解像度PNG）をOfficeを使わずに描画する（QAでの目視確認用）
+スライドのXMLから次の要素だけを描く:
+    - 背景（p:bg の単色・画像。スライド → レイアウト → マスターの順に探す）
+    - 図形の単色塗りつぶしとテキスト（フォント・サイズ・色は style_resolver で継承を解決）
+    - 画像（p:pic）
+グループ・表・グラフ・回転・グラデーションなどは描かない（簡易表示）
+
+- 描画内容（表示リスト）はメインプロセスで作り、PNGへの描画はワーカープロセスで並列に行う
+- サムネイルはスライドのパーツと、参照するレイアウト・マスター・テーマ・画像の内容ハッシュをキーに
+  キャッシュする（内容の変わっていないスライドは描き直さない）
+- フォントはフォントディレクトリから書体名で探し、見つからなければ --font（THUMBNAIL_FONT）を使う
+
+出力先: <out>/<デッキ名>/slide01.png …（表示順）
+"""
+
+import io
+import os
+import re
+import time
+import hashlib
+import argparse
+import tempfile
+import zipfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw, ImageFont
+from pptx import Presentation
+from pptx.exc import PackageNotFoundError
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+
+from style_resolver import StyleResolver
+from deck_files import collect_decks, unique_names
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / 'output' / '.thumb_cache'
+DEFAULT_WIDTH = 320
+
+# 描画処理を変えたら上げる（キャッシュのキーに含める）
+RENDER_VERSION = 1
+
+# これ未満の枚数ならプロセスを起動せずに描画する
+PARALLEL_THRESHOLD = 8
+
+A = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+R_EMBED = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}embed'
+
+EMU_PER_PT = 12700
+DEFAULT_FONT_SIZE = 18
+DEFAULT_TEXT_COLOR = '000000'
+DEFAULT_BACKGROUND = 'FFFFFF'
+LINE_SPACING = 1.2
+
+FONT_DIRS = [
+    '/usr/share/fonts', '/usr/local/share/fonts', os.path.expanduser('~/.fonts'),
+    os.path.expanduser('~/.local/share/fonts'), '/Library/Fonts', '/System/Library/Fonts',
+    os.path.join(os.environ.get('WINDIR', 'C:\\Windows'), 'Fonts'),
+]
+
+# 日本語の書体名 → フォントファイル名（拡張子なし、小文字）
+FONT_ALIASES = {
+    'メイリオ': 'meiryo', 'meiryo': 'meiryo', 'meiryo ui': 'meiryo',
+    '游ゴシック': 'yugothm', 'yu gothic': 'yugothm', 'yu gothic ui': 'yugothm',
+    'ｍｓ ゴシック': 'msgothic', 'ms gothic': 'msgothic', 'ｍｓ ｐゴシック': 'msgothic', 'ms pgothic': 'msgothic',
+    'ヒラギノ角ゴシック': 'hiraginosans', 'hiragino sans': 'hiraginosans',
+}
+
+# 書体が見つからない場合に探すフォント（日本語を含むものを優先）
+FALLBACK_FONTS = ['notosanscjk-regular', 'notosanscjkjp-regular', 'notosansjp-regular', 'meiryo', 'yugothm',
+                  'msgothic', 'hiraginosans', 'dejavusans']
+
+# 折り返しの単位: 全角文字は1文字ずつ、それ以外は単語（後ろの空白を含む）
+_TOKEN = re.compile(r'[\u3000-\u9fff\uf900-\ufaff\uff00-\uffef]|[^\s\u3000-\u9fff\uf900-\ufaff\uff00-\uffef]+\s*|\s+')
+
+
+# --- 表示リスト（メインプロセス） ---------------------------------------------------
+
+def _image_blob(part, blip_fill):
+    blip = blip_fill.find(A + 'blip') if blip_fill is not None else None
+    rId = blip.get(R_EMBED) if blip is not None else None
+    if not rId or rId not in part.rels:
+        return None
+    rel = part.rels[rId]
+    return None if rel.is_external else rel.target_part.blob
+
+
+def slide_background(slide, resolver):
+    """('image', blob) または ('fill', 'RRGGBB')"""
+    layout_part = slide.part.part_related_by(RT.SLIDE_LAYOUT)
+    master_part = layout_part.part_related_by(RT.SLIDE_MASTER)
+    for part in (slide.part, layout_part, master_part):
+        bg = part._element.find(P + 'cSld/' + P + 'bg')
+        if bg is None:
+            continue
+        blob = _image_blob(part, bg.find(P + 'bgPr/' + A + 'blipFill'))
+        if blob is not None:
+            return ('image', blob)
+        break
+    return ('fill', resolver.background(slide) or DEFAULT_BACKGROUND)
+
+
+def _paragraph_align(paragraph, sp):
+    ppr = paragraph._p.find(A + 'pPr')
+    if ppr is not None and ppr.get('algn'):
+        return ppr.get('algn')
+    lvl = sp.find(P + 'txBody/' + A + 'lstStyle/' + A + f'lvl{paragraph.level + 1}pPr')
+    return lvl.get('algn', 'l') if lvl is not None else 'l'
+
+
+def _text_item(slide, shape, resolver, box):
+    body_pr = shape._element.find(P + 'txBody/' + A + 'bodyPr')
+    get = (lambda name, default: int(body_pr.get(name, default))) if body_pr is not None else (lambda n, d: d)
+    font_scale = 1.0
+    autofit = body_pr.find(A + 'normAutofit') if body_pr is not None else None
+    if autofit is not None and autofit.get('fontScale'):
+        font_scale = int(autofit.get('fontScale')) / 100000
+
+    paragraphs = []
+    shape_cache = {}
+    for paragraph in shape.text_frame.paragraphs:
+        runs = []
+        for run in paragraph.runs:
+            if not run.text:
+                continue
+            style = resolver.resolve(slide, shape, paragraph, run, shape_cache)
+            face = style.ea if style.ea and re.search(r'[^\x00-\x7f]', run.text) else (style.latin or style.ea)
+            runs.append((run.text, (style.size or DEFAULT_FONT_SIZE) * font_scale, style.bold, face,
+                         style.color or DEFAULT_TEXT_COLOR))
+        paragraphs.append((_paragraph_align(paragraph, shape._element), runs))
+    if not any(runs for _, runs in paragraphs):
+        return None
+
+    return ('text', box, {
+        'insets': (get('lIns', 91440), get('tIns', 45720), get('rIns', 91440), get('bIns', 45720)),
+        'anchor': body_pr.get('anchor', 't') if body_pr is not None else 't',
+        'wrap': body_pr is None or body_pr.get('wrap') != 'none',
+        'paragraphs': paragraphs,
+    })
+
+
+def display_list(slide, resolver):
+    """スライドを描画内容のリスト（ワーカーに渡せる形）に変換"""
+    items = [('background', slide_background(slide, resolver))]
+    for shape in slide.shapes:
+        if shape.width is None or shape.height is None:
+            continue
+        box = (shape.left or 0, shape.top or 0, shape.width, shape.height)
+        tag = shape._element.tag
+        if tag == P + 'pic':
+            blob = _image_blob(slide.part, shape._element.find(P + 'blipFill'))
+            if blob is not None:
+                items.append(('image', box, blob))
+        elif tag == P + 'sp':
+            fill = resolver.fill_color(slide, shape._element.find(P + 'spPr'))
+            if fill:
+                items.append(('fill', box, fill))
+            if shape.has_text_frame:
+                text = _text_item(slide, shape, resolver, box)
+                if text is not None:
+                    items.append(text)
+    return items
+
+
+class _PartHashes:
+    """パーツの内容ハッシュ（デッキ内で同じパーツは1回だけ計算）"""
+
+    def __init__(self):
+        self._memo = {}
+
+    def __call__(self, part):
+        digest = self._memo.get(id(part))
+        if digest is None:
+            digest = self._memo[id(part)] = hashlib.sha256(part.blob).hexdigest()
+        return digest
+
+
+def slide_cache_key(slide, part_hash, settings):
+    """スライドと描画に使うパーツ（レイアウト・マスター・テーマ・画像）の内容から作るキー"""
+    digest = hashlib.sha256(repr((RENDER_VERSION, settings)).encode('utf-8'))
+    layout_part = slide.part.part_related_by(RT.SLIDE_LAYOUT)
+    master_part = layout_part.part_related_by(RT.SLIDE_MASTER)
+    parts = [slide.part, layout_part, master_part, master_part.part_related_by(RT.THEME)]
+    for part in (slide.part, layout_part, master_part):
+        parts.extend(rel.target_part for rel in part.rels.values()
+                     if not rel.is_external and rel.reltype == RT.IMAGE)
+    for part in parts:
+        digest.update(part_hash(part).encode('ascii'))
+    return digest.hexdigest()
+
+
+# --- 描画（ワーカー） -----------------------------------------------------------
+
+_font_files = None
+_fonts = {}
+
+
+def _index_fonts():
+    global _font_files
+    if _font_files is None:
+        _font_files = {}
+        for font_dir in FONT_DIRS:
+            for root, _, files in os.walk(font_dir):
+                for name in files:
+                    stem, ext = os.path.splitext(name)
+                    if ext.lower() in ('.ttf', '.ttc', '.otf'):
+                        _font_files.setdefault(stem.lower().replace(' ', ''), os.path.join(root, name))
+    return _font_files
+
+
+def find_font_file(face, bold=False, fallback=None):
+    """書体名からフォントファイルを探す（見つからなければ fallback → 既定の候補）"""
+    files = _index_fonts()
+    candidates = []
+    if face:
+        name = FONT_ALIASES.get(face.lower(), face.lower().replace(' ', ''))
+        candidates = [name + 'bold', name + '-bold', name + 'b', name] if bold else [name, name + '-regular']
+    for candidate in candidates:
+        if candidate in files:
+            return files[candidate]
+    if fallback:
+        return fallback
+    return next((files[name] for name in FALLBACK_FONTS if name in files), None)
+
+
+def _font(face, bold, size_px, fallback):
+    key = (face, bold, size_px, fallback)
+    font = _fonts.get(key)
+    if font is None:
+        path = find_font_file(face, bold, fallback)
+        try:
+            font = ImageFont.truetype(path, size_px) if path else ImageFont.load_default(size_px)
+        except OSError:
+            font = ImageFont.load_default(size_px)
+        _fonts[key] = font
+    return font
+
+
+def _rgb(hex_color):
+    return tuple(int(hex_color[i:i + 2], 16) for i in (0, 2, 4))
+
+
+def _layout_lines(paragraphs, max_width, scale, wrap, fallback):
+    """段落を行に分ける。行は (揃え, 行の高さ, [(テキスト, フォント, 色, 幅)])"""
+    lines = []
+    for align, runs in paragraphs:
+        line, width, height = [], 0.0, 0
+        if not runs:
+            lines.append((align, DEFAULT_FONT_SIZE * EMU_PER_PT * scale * LINE_SPACING, []))
+            continue
+        for text, size, bold, face, color in runs:
+            size_px = max(1, round(size * EMU_PER_PT * scale))
+            font = _font(face, bold, size_px, fallback)
+            for token in _TOKEN.findall(text):
+                token_width = font.getlength(token)
+                if wrap and line and width + token_width > max_width and token.strip():
+                    lines.append((align, height, line))
+                    line, width, height = [], 0.0, 0
+                line.append((token, font, _rgb(color), token_width))
+                width += token_width
+                height = max(height, size_px * LINE_SPACING)
+        lines.append((align, height, line))
+    return lines
+
+
+def _draw_text(draw, box, text, scale, fallback):
+    left, top, width, height = (v * scale for v in box)
+    l_ins, t_ins, r_ins, b_ins = (v * scale for v in text['insets'])
+    inner_width = max(1.0, width - l_ins - r_ins)
+    lines = _layout_lines(text['paragraphs'], inner_width, scale, text['wrap'], fallback)
+    total = sum(h for _, h, _ in lines)
+    y = top + t_ins
+    if text['anchor'] == 'ctr':
+        y = top + t_ins + (height - t_ins - b_ins - total) / 2
+    elif text['anchor'] == 'b':
+        y = top + height - b_ins - total
+    for align, line_height, tokens in lines:
+        line_width = sum(w for *_, w in tokens)
+        x = left + l_ins
+        if align == 'ctr':
+            x += (inner_width - line_width) / 2
+        elif align == 'r':
+            x += inner_width - line_width
+        for token, font, color, token_width in tokens:
+            draw.text((x, y + line_height - font.size * LINE_SPACING), token, font=font, fill=color)
+            x += token_width
+        y += line_height
+
+
+def _paste_image(canvas, blob, box):
+    try:
+        image = Image.open(io.BytesIO(blob)).convert('RGBA')
+    except (OSError, ValueError):
+        return
+    size = (max(1, round(box[2])), max(1, round(box[3])))
+    image = image.resize(size, Image.BILINEAR)
+    canvas.paste(image, (round(box[0]), round(box[1])), image)
+
+
+def rasterize(items, slide_size, width, fallback=None):
+    """表示リストをPNGのバイト列に描画"""
+    scale = width / slide_size[0]
+    size = (width, max(1, round(slide_size[1] * scale)))
+    canvas = Image.new('RGB', size, _rgb(DEFAULT_BACKGROUND))
+    draw = ImageDraw.Draw(canvas)
+    for item in items:
+        kind = item[0]
+        if kind == 'background':
+            bg_kind, value = item[1]
+            if bg_kind == 'image':
+                _paste_image(canvas, value, (0, 0, size[0], size[1]))
+            else:
+                draw.rectangle([0, 0, size[0], size[1]], fill=_rgb(value))
+        elif kind == 'fill':
+            left, top, w, h = (v * scale for v in item[1])
+            draw.rectangle([left, top, left + w, top + h], fill=_rgb(item[2]))
+        elif kind == 'image':
+            _paste_image(canvas, item[2], tuple(v * scale for v in item[1]))
+        elif kind == 'text':
+            _draw_text(draw, item[1], item[2], scale, fallback)
+    out = io.BytesIO()
+    canvas.save(out, 'PNG', optimize=True)
+    return out.getvalue()
+
+
+def _rasterize_job(job):
+    key, items, slide_size, width, fallback = job
+    return key, rasterize(items, slide_size, width, fallback)
+
+
+# --- まとめて描画 ---------------------------------------------------------------
+
+def _cache_path(cache_dir, key):
+    return Path(cache_dir) / key[:2] / (key + '.png')
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def render_thumbnails(deck_paths, out_dir, width=DEFAULT_WIDTH, cache_dir=DEFAULT_CACHE_DIR, workers=None,
+                      font=None):
+    """
+    デッキの全スライドのサムネイルを書き出す
+    開けないデッキ（壊れたZIPなど）は警告を出して飛ばす
+
+    Returns:
+        dict: 統計（slides / cached / rendered / decks / failed）
+    """
+    stats = {'decks': 0, 'slides': 0, 'cached': 0, 'rendered': 0, 'failed': 0}
+    outputs = {}   # キャッシュのキー → 書き出し先の一覧
+    jobs = []
+
+    for deck_path, name in zip(deck_paths, unique_names(deck_paths)):
+        try:
+            prs = Presentation(deck_path)
+        except (OSError, KeyError, zipfile.BadZipFile, PackageNotFoundError) as e:
+            print(f"Warning: could not open {deck_path}: {e}")
+            stats['failed'] += 1
+            continue
+
+        deck_dir = Path(out_dir) / name
+        deck_dir.mkdir(parents=True, exist_ok=True)
+
+        resolver = StyleResolver()
+        part_hash = _PartHashes()
+        slide_size = (prs.slide_width, prs.slide_height)
+        # 同じスライドのXMLでも、デッキの大きさ（縦横比）が違えば別の画像になる
+        settings = (width, font, slide_size)
+        stats['decks'] += 1
+        for number, slide in enumerate(prs.slides, 1):
+            stats['slides'] += 1
+            key = slide_cache_key(slide, part_hash, settings)
+            target = deck_dir / f"slide{number:02d}.png"
+            if key in outputs:
+                outputs[key].append(target)
+                stats['cached'] += 1
+                continue
+            outputs[key] = [target]
+            if _cache_path(cache_dir, key).exists():
+                stats['cached'] += 1
+                continue
+            jobs.append((key, display_list(slide, resolver), slide_size, width, font))
+
+    if len(jobs) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_rasterize_job, jobs, chunksize=max(1, len(jobs) // ((workers or os.cpu_count() or 1) * 4))))
+    else:
+        results = [_rasterize_job(job) for job in jobs]
+    for key, png in results:
+        _write_atomic(_cache_path(cache_dir, key), png)
+        stats['rendered'] += 1
+
+    for key, targets in outputs.items():
+        png = _cache_path(cache_dir, key).read_bytes()
+        for target in targets:
+            _write_atomic(target, png)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='スライドのサムネイル（PNG）をOfficeを使わずに描画')
+    parser.add_argument('decks', nargs='+', help='pptxファイル または pptxを含むディレクトリ')
+    parser.add_argument('-o', '--out', default=os.path.join('output', 'thumbnails'), help='出力先ディレクトリ')
+    parser.add_argument('--width', type=int, default=DEFAULT_WIDTH, help='サムネイルの幅（px）')
+    parser.add_argument('--cache', default=str(DEFAULT_CACHE_DIR), help='キャッシュのディレクトリ')
+    parser.add_argument('--font', default=os.environ.get('THUMBNAIL_FONT'),
+                        help='書体が見つからない場合のフォントファイル（日本語フォント推奨）')
+    parser.add_argument('--workers', type=int, default=None, help='ワーカープロセス数')
+    args = parser.parse_args()
+
+    deck_paths = collect_decks(args.decks)
+
+    start = time.perf_counter()
+    stats = render_thumbnails(deck_paths, args.out, width=args.width, cache_dir=args.cache,
+                              workers=args.workers, font=args.font)
+    elapsed = time.perf_counter() - start
+    print(f"{stats['slides']} slides from {stats['decks']} decks: {stats['rendered']} rendered, "
+          f"{stats['cached']} from cache in {elapsed:.2f}s -> {args.out}"
+          + (f" ({stats['failed']} decks could not be opened)" if stats['failed'] else ''))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+5. スライドプランの簡易チェック（05_tune.js のPython版）
+出力形式（summary / tuneResults / slidesWithTuning）は 05_tune.js と同じ
+パイプライン（pipeline.py）からはファイルを介さずにプランのオブジェクトを直接受け渡す
+
+テンプレートのpptxを指定すると、プランナーの見積もり（constraintsResult）ではなく
+テンプレートの実際の図形（大きさ・余白・フォントサイズ・折り返し）から求めた制約でも検証する
+    - items_truncated: 項目数がテンプレートの行数を超え、超えた分が表示されない
+    - line_overflow:   折り返さない図形で、1行の幅が図形の幅を超える
+    - text_overflow:   行数（折り返し後）が図形の高さに収まらない
+    - shape_missing:   テンプレートスライドの図形が足りず、内容が入らない
+summary には規則ごとの件数（rules）が加わる。文字幅は全角=1、半角（ASCII）=0.5 で見積もる
+
+アーカイブ（プランのディレクトリ）の検証では、全プランの全スライドのテキストを1つの列（配列）に
+並べてまとめて評価する（同じテキストの幅は1回だけ計算）
+"""
+
+import os
+import sys
+import json
+import math
+import importlib
+from array import array
+from pathlib import Path
+from collections import Counter, namedtuple
+
+EMU_PER_PT = 12700
+DEFAULT_FONT_SIZE = 18
+LINE_SPACING = 1.2
+# bodyPr の余白の既定値（EMU）
+DEFAULT_INSETS = (91440, 45720, 91440, 45720)
+
+# 規則の一覧（summary の rules の並び順）
+RULES = ('bullets_min', 'estimated_lines', 'shape_missing', 'items_truncated', 'line_overflow', 'text_overflow')
+
+# テキストの入る図形1つ分の制約（max_width は全角文字数）
+SlotConstraint = namedtuple('SlotConstraint', 'role max_width max_lines wrap')
+# テンプレートスライド1枚分の制約（shapes は図形数、slots は {図形番号: SlotConstraint}）
+TemplateConstraint = namedtuple('TemplateConstraint', 'shapes slots')
+
+
+def _base_issues(slide_plan):
+    """05_tune.js と同じ2つの規則（[(規則, 指摘), ...]）"""
+    issues = []
+    if slide_plan.get('template') == 'bullets':
+        n = len(slide_plan.get('fields', {}).get('items') or [])
+        if n < 3:
+            issues.append(('bullets_min', f"bullets 項目{n} (<3)"))
+
+    constraints = slide_plan.get('constraintsResult')
+    if constraints:
+        estimated, max_lines = constraints.get('estimatedLines'), constraints.get('maxLines')
+        if isinstance(estimated, (int, float)) and isinstance(max_lines, (int, float)) and estimated > max_lines:
+            issues.append(('estimated_lines', f"行数超過 est={estimated} > max={max_lines}"))
+    return issues
+
+
+def _tune_result(slide_plan, issues):
+    result = {
+        'sectionId': slide_plan.get('sectionId'),
+        'template': slide_plan.get('template'),
+        'status': 'WARN' if issues else 'OK',
+        'issues': [message for _, message in issues],
+    }
+    # JSON.stringify と同じく、未定義（キーなし）のときは出力しない
+    if 'constraintsResult' in slide_plan:
+        result['constraints'] = slide_plan.get('constraintsResult')
+    return result
+
+
+def tune_slide(slide_plan, extra_issues=()):
+    """
+    1枚分のチェック
+
+    Args:
+        extra_issues: テンプレートの制約による指摘 [(規則, 指摘), ...]（check_constraints の結果）
+
+    Returns:
+        dict: tuneResults の1要素
+    """
+    return _tune_result(slide_plan, _base_issues(slide_plan) + list(extra_issues))
+
+
+def _tune_slides(slide_plans, findings):
+    """tuneResults と規則ごとの件数（指摘のあったスライド数）"""
+    results, rule_counts = [], Counter()
+    for slide_plan, extra in zip(slide_plans, findings):
+        issues = _base_issues(slide_plan) + list(extra)
+        results.append(_tune_result(slide_plan, issues))
+        rule_counts.update({rule for rule, _ in issues})
+    return results, rule_counts
+
+
+# --- テンプレートの図形からの制約 -------------------------------------------------
+
+def _render_module():
+    return importlib.import_module('06_render_pptx')
+
+
+def load_template_constraints(template_path):
+    """
+    テンプレートの各スライドの図形から制約を求める
+
+    Returns:
+        dict: {テンプレートスライド番号: TemplateConstraint}
+    """
+    from pptx import Presentation
+    from style_resolver import StyleResolver
+    from color_policy import shape_role
+
+    a = '{http://schemas.openxmlformats.org/drawingml/2006/main}'
+    prs = Presentation(template_path)
+    resolver = StyleResolver()
+    constraints = {}
+    for template_idx, slide in enumerate(prs.slides):
+        shapes = list(slide.shapes)
+        slots = {}
+        for shape_idx, shape in enumerate(shapes):
+            if not shape.has_text_frame or not shape.width or not shape.height:
+                continue
+            body_pr = shape.text_frame._txBody.find(a + 'bodyPr')
+            attrs = body_pr.attrib if body_pr is not None else {}
+            l_ins, t_ins, r_ins, b_ins = (int(attrs.get(name, default)) for name, default in
+                                          zip(('lIns', 'tIns', 'rIns', 'bIns'), DEFAULT_INSETS))
+            font_scale = 1.0
+            autofit = body_pr.find(a + 'normAutofit') if body_pr is not None else None
+            if autofit is not None and autofit.get('fontScale'):
+                font_scale = int(autofit.get('fontScale')) / 100000
+
+            # 最初のrunの実効フォントサイズ（差し込み時はこのrunの書式が引き継がれる）
+            size = None
+            for paragraph in shape.text_frame.paragraphs:
+                if paragraph.runs:
+                    size = resolver.resolve(slide, shape, paragraph, paragraph.runs[0]).size
+                    break
+            size_emu = (size or DEFAULT_FONT_SIZE) * font_scale * EMU_PER_PT
+
+            slots[shape_idx] = SlotConstraint(
+                role=shape_role(shape, shape_idx),
+                max_width=max(1.0, (shape.width - l_ins - r_ins) / size_emu),
+                max_lines=max(1, int((shape.height - t_ins - b_ins) / (size_emu * LINE_SPACING))),
+                wrap=attrs.get('wrap') != 'none',
+            )
+        constraints[template_idx] = TemplateConstraint(len(shapes), slots)
+    return constraints
+
+
+def _text_width(text):
+    """全角=1、半角（ASCII）=0.5 とした幅"""
+    return len(text) - 0.5 * len(text.encode('ascii', 'ignore'))
+
+
+def check_constraints(slide_plans, constraints):
+    """
+    テンプレートの制約で複数のスライド（複数のプランにまたがってよい）をまとめて評価
+    内容は 06_render_pptx.build_slide_model で実際に図形へ入る形にしてから測る
+
+    Returns:
+        list: スライドごとの [(規則, 指摘), ...]
+    """
+    render = _render_module()
+    findings = [[] for _ in slide_plans]
+
+    # 図形（スロット）の列
+    slot_slide, slot_max_lines = array('l'), array('l')
+    slot_info = []
+    # 行の列（1行 = 図形に入るテキスト1行）
+    row_slot, row_width = array('l'), array('d')
+    widths = {}
+
+    for i, slide_plan in enumerate(slide_plans):
+        fields = slide_plan.get('fields', {})
+        item_count = render.count_items(fields)
+        template_idx = render.get_template_slide_index(slide_plan.get('template', 'bullets'), item_count)
+        template = constraints.get(template_idx)
+        model = render.build_slide_model(fields, template_idx)
+        if template is None or template.shapes < model.min_shapes:
+            findings[i].append(('shape_missing', f"図形不足 テンプレート{template_idx + 1}"))
+            continue
+
+        for shape_idx, kind, value in model.texts:
+            if kind == 'lines':
+                lines = [str(line) for line in value]
+                if item_count > len(lines):
+                    findings[i].append(('items_truncated', f"項目{item_count} > 枠{len(lines)}"))
+            else:
+                lines = str(value).split('\n')
+            slot = template.slots.get(shape_idx)
+            if slot is None:
+                continue
+            slot_index = len(slot_info)
+            slot_slide.append(i)
+            slot_max_lines.append(slot.max_lines)
+            slot_info.append(slot)
+            for line in lines:
+                width = widths.get(line)
+                if width is None:
+                    width = widths[line] = _text_width(line)
+                row_slot.append(slot_index)
+                row_width.append(width)
+
+    # 列ごとにまとめて計算: 図形ごとの行数（折り返し後）と最大幅
+    slot_lines = array('l', [0]) * len(slot_info)
+    slot_widest = array('d', [0.0]) * len(slot_info)
+    for slot_index, width in zip(row_slot, row_width):
+        slot = slot_info[slot_index]
+        slot_lines[slot_index] += max(1, math.ceil(width / slot.max_width)) if slot.wrap else 1
+        if width > slot_widest[slot_index]:
+            slot_widest[slot_index] = width
+
+    for slot_index, slot in enumerate(slot_info):
+        i = slot_slide[slot_index]
+        if not slot.wrap and slot_widest[slot_index] > slot.max_width:
+            findings[i].append(('line_overflow',
+                                f"{slot.role} 幅超過 {slot_widest[slot_index]:g}字 > {slot.max_width:.1f}字"))
+        if slot_lines[slot_index] > slot_max_lines[slot_index]:
+            findings[i].append(('text_overflow',
+                                f"{slot.role} 行数{slot_lines[slot_index]} > {slot_max_lines[slot_index]}"))
+    return findings
+
+
+# --- プラン・アーカイブ -----------------------------------------------------------
+
+def _summarize(plans, results, rule_counts, verbose):
+    ok = warn = 0
+    for result in results:
+        if result['issues']:
+            warn += 1
+            if verbose:
+                print(f"[WARN] {result['sectionId']} {result['template']}: {' / '.join(result['issues'])}")
+        else:
+            ok += 1
+    if verbose:
+        print(f"OK {ok}, WARN {warn}")
+    summary = {'total': len(plans), 'ok': ok, 'warn': warn}
+    if rule_counts is not None:
+        summary['rules'] = {rule: rule_counts[rule] for rule in RULES}
+    return summary
+
+
+def tune_plan(plan_data, verbose=True, constraints=None):
+    """
+    プラン（04_plan.js の出力）をチェックし、チューニング済みプランを返す
+    slidesWithTuning は plan_data['slides'] そのもの（コピーしない）
+
+    Args:
+        constraints: load_template_constraints の結果（None なら 05_tune.js と同じ出力）
+
+    Returns:
+        dict: {'summary': ..., 'tuneResults': [...], 'slidesWithTuning': [...]}
+    """
+    plans = plan_data['slides']
+    findings = check_constraints(plans, constraints) if constraints is not None else [()] * len(plans)
+    tune_results, rule_counts = _tune_slides(plans, findings)
+
+    return {
+        'summary': _summarize(plans, tune_results, rule_counts if constraints is not None else None, verbose),
+        'tuneResults': tune_results,
+        'slidesWithTuning': plans,
+    }
+
+
+def collect_plan_paths(inputs):
+    """
+    引数のファイル/ディレクトリからプランJSONの一覧を作成
+    ディレクトリは '.' で始まるディレクトリ（.slide_store などのキャッシュ）を除いて探す
+    """
+    paths = []
+    for item in inputs:
+        p = Path(item)
+        if p.is_dir():
+            paths.extend(sorted(x for x in p.rglob('*.json')
+                                if not any(part.startswith('.') for part in x.relative_to(p).parts[:-1])))
+        else:
+            paths.append(p)
+    return paths
+
+
+def tune_archive(plan_paths, constraints):
+    """
+    複数のプランをまとめてチェック（全スライドを1回の check_constraints で評価）
+    チューニング済みのプラン（slidesWithTuning）はその内容を、それ以外は slides をチェックする
+    slides / slidesWithTuning の無いJSON（セクション一覧など）はプランではないので飛ばす（skipped）
+
+    Returns:
+        dict: {'plans': {パス: {'summary', 'tuneResults'}}, 'errors': {パス: エラー}, 'skipped': [パス],
+               'summary': 全体の集計}
+    """
+    loaded, errors, skipped = [], {}, []
+    for path in plan_paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                plan_data = json.load(f)
+        except (OSError, ValueError) as e:
+            errors[str(path)] = str(e)
+            continue
+        slides = plan_data.get('slidesWithTuning', plan_data.get('slides')) if isinstance(plan_data, dict) else None
+        if not isinstance(slides, list):
+            skipped.append(str(path))
+            continue
+        loaded.append((str(path), slides))
+
+    all_slides = [slide_plan for _, slides in loaded for slide_plan in slides]
+    findings = check_constraints(all_slides, constraints)
+
+    plans = {}
+    total_rules = Counter()
+    offset = 0
+    for path, slides in loaded:
+        results, rule_counts = _tune_slides(slides, findings[offset:offset + len(slides)])
+        offset += len(slides)
+        total_rules.update(rule_counts)
+        plans[path] = {'summary': _summarize(slides, results, rule_counts, False), 'tuneResults': results}
+
+    summary = {
+        'plans': len(plans),
+        'slides': len(all_slides),
+        'warn_plans': sum(1 for plan in plans.values() if plan['summary']['warn']),
+        'warn_slides': sum(plan['summary']['warn'] for plan in plans.values()),
+        'rules': {rule: total_rules[rule] for rule in RULES},
+    }
+    return {'plans': plans, 'errors': errors, 'skipped': skipped, 'summary': summary}
+
+
+def _pop_option(args, name):
+    if name not in args:
+        return None
+    i = args.index(name)
+    if i + 1 >= len(args):
+        print(f"Error: {name} requires a value")
+        sys.exit(1)
+    value = args[i + 1]
+    del args[i:i + 2]
+    return value
+
+
+def main():
+    args = sys.argv[1:]
+    template_path = _pop_option(args, '--template')
+    report_path = _pop_option(args, '--report')
+    archive = '--archive' in args
+    args = [a for a in args if a != '--archive']
+
+    if (archive and (not args or not template_path)) or (not archive and len(args) < 3):
+        print("Usage: python src/tune_plan.py <slides_plan.json> <schema.json> <output.json> [--template template.pptx]")
+        print("       python src/tune_plan.py --archive <dir|plan.json>... --template template.pptx [--report report.json]")
+        print("  --template: also check constraints taken from the template shapes")
+        print("  --archive: check every plan in the directories at once (exit code 1 if any slide has issues)")
+        sys.exit(1)
+
+    constraints = None
+    if template_path:
+        if not os.path.exists(template_path):
+            print(f"Error: Template file not found: {template_path}")
+            sys.exit(1)
+        constraints = load_template_constraints(template_path)
+
+    if archive:
+        result = tune_archive(collect_plan_paths(args), constraints)
+        for path, plan in result['plans'].items():
+            if plan['summary']['warn']:
+                print(f"[WARN] {path}: {plan['summary']['warn']}/{plan['summary']['total']} slides")
+        for path, error in result['errors'].items():
+            print(f"[ERROR] {path}: {error}")
+        summary = result['summary']
+        print(f"\n{summary['plans']} plans, {summary['slides']} slides: "
+              f"{summary['warn_plans']} plans / {summary['warn_slides']} slides with issues"
+              + (f" ({len(result['skipped'])} non-plan JSON files skipped)" if result['skipped'] else ''))
+        for rule in RULES:
+            print(f"  {rule:<16} {summary['rules'][rule]}")
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+            print(f"Wrote report -> {report_path}")
+        sys.exit(1 if summary['warn_slides'] or result['errors'] else 0)
+
+    plan_path, _schema_path, output_path = args[:3]
+    with open(plan_path, 'r', encoding='utf-8') as f:
+        plan_data = json.load(f)
+
+    tuned = tune_plan(plan_data, constraints=constraints)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(tuned, f, ensure_ascii=False, indent=2)
+    print(f"Wrote tuning results -> {output_path}")
+
+
+if __name__ == '__main__':
+    main()
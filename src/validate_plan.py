@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+スライドプランのスキーマ検証
+config/slide.schema.json を一度だけ検証関数にコンパイルし、
+プラン全体（またはディレクトリ内の全プラン）を検証してエラーをまとめて報告する
+
+対応するJSON Schemaのキーワード:
+    type, enum, properties, required, items, additionalProperties,
+    minItems, maxItems, minLength, maxLength, title, description
+"""
+
+import sys
+import json
+from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+from plan_binary import is_binary_plan, read_plan_binary
+
+DEFAULT_SCHEMA_PATH = Path(__file__).resolve().parent.parent / 'config' / 'slide.schema.json'
+
+_TYPE_CHECKS = {
+    'string': lambda v: isinstance(v, str),
+    'integer': lambda v: isinstance(v, int) and not isinstance(v, bool),
+    'number': lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    'boolean': lambda v: isinstance(v, bool),
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'null': lambda v: v is None,
+}
+
+_ANNOTATIONS = {'title', 'description', '$schema', '$id', 'default', 'examples'}
+
+
+def compile_schema(schema):
+    """
+    スキーマを検証関数に変換
+
+    Returns:
+        function: check(value, path, errors) -> None（エラーは errors に追加）
+    """
+    unknown = set(schema) - _ANNOTATIONS - {
+        'type', 'enum', 'properties', 'required', 'items', 'additionalProperties',
+        'minItems', 'maxItems', 'minLength', 'maxLength'}
+    if unknown:
+        raise ValueError(f"Unsupported schema keywords: {', '.join(sorted(unknown))}")
+
+    checks = []
+
+    if 'type' in schema:
+        types = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        type_fns = [_TYPE_CHECKS[t] for t in types]
+        expected = ' or '.join(types)
+
+        def check_type(value, path, errors):
+            if not any(fn(value) for fn in type_fns):
+                errors.append(f"{path}: expected {expected}, got {type(value).__name__}")
+                return False
+            return True
+        checks.append(check_type)
+
+    if 'enum' in schema:
+        allowed = schema['enum']
+        allowed_set = {json.dumps(v, sort_keys=True) for v in allowed}
+
+        def check_enum(value, path, errors):
+            if json.dumps(value, sort_keys=True) not in allowed_set:
+                errors.append(f"{path}: {value!r} is not one of {allowed}")
+                return False
+            return True
+        checks.append(check_enum)
+
+    if 'minLength' in schema or 'maxLength' in schema:
+        lo, hi = schema.get('minLength', 0), schema.get('maxLength')
+
+        def check_length(value, path, errors):
+            if isinstance(value, str):
+                if len(value) < lo:
+                    errors.append(f"{path}: shorter than {lo} characters")
+                elif hi is not None and len(value) > hi:
+                    errors.append(f"{path}: longer than {hi} characters")
+            return True
+        checks.append(check_length)
+
+    if any(k in schema for k in ('properties', 'required', 'additionalProperties')):
+        props = {k: compile_schema(v) for k, v in schema.get('properties', {}).items()}
+        required = schema.get('required', [])
+        extra = schema.get('additionalProperties', True)
+        extra_check = compile_schema(extra) if isinstance(extra, dict) else None
+
+        def check_object(value, path, errors):
+            if not isinstance(value, dict):
+                return True
+            for key in required:
+                if key not in value:
+                    errors.append(f"{path}: missing required property '{key}'")
+            for key, item in value.items():
+                sub = props.get(key)
+                if sub is not None:
+                    sub(item, f"{path}.{key}", errors)
+                elif extra is False:
+                    errors.append(f"{path}: unexpected property '{key}'")
+                elif extra_check is not None:
+                    extra_check(item, f"{path}.{key}", errors)
+            return True
+        checks.append(check_object)
+
+    if any(k in schema for k in ('items', 'minItems', 'maxItems')):
+        item_check = compile_schema(schema['items']) if 'items' in schema else None
+        lo, hi = schema.get('minItems', 0), schema.get('maxItems')
+
+        def check_array(value, path, errors):
+            if not isinstance(value, list):
+                return True
+            if len(value) < lo:
+                errors.append(f"{path}: fewer than {lo} items")
+            if hi is not None and len(value) > hi:
+                errors.append(f"{path}: more than {hi} items")
+            if item_check is not None:
+                for i, item in enumerate(value):
+                    item_check(item, f"{path}[{i}]", errors)
+            return True
+        checks.append(check_array)
+
+    def check(value, path, errors):
+        for fn in checks:
+            # 型が違う場合、以降のチェックは意味がないので打ち切る
+            if fn(value, path, errors) is False:
+                return
+    return check
+
+
+@lru_cache(maxsize=None)
+def load_schema(schema_path=DEFAULT_SCHEMA_PATH):
+    """スキーマファイルを読み込んでコンパイル（同じパスは1回だけ）"""
+    with open(schema_path, 'r', encoding='utf-8') as f:
+        return compile_schema(json.load(f))
+
+
+def validate_plan(plan_data, check):
+    """
+    プランの全スライドを検証
+
+    Returns:
+        list: エラーメッセージ一覧（空なら問題なし）
+    """
+    key = 'slidesWithTuning' if 'slidesWithTuning' in plan_data else 'slides'
+    slides = plan_data.get(key)
+    if not isinstance(slides, list):
+        return [f"{key}: expected array"]
+    errors = []
+    for idx, slide in enumerate(slides):
+        check(slide, f"{key}[{idx}]", errors)
+    return errors
+
+
+# --- 並列バッチ検証 ------------------------------------------------------------
+
+_worker_check = None
+
+
+def _init_worker(schema_path):
+    # ワーカーごとにスキーマを一度だけコンパイル
+    global _worker_check
+    _worker_check = load_schema(schema_path)
+
+
+def _validate_file(plan_path):
+    try:
+        if is_binary_plan(plan_path):
+            plan_data = read_plan_binary(plan_path)
+        else:
+            with open(plan_path, 'r', encoding='utf-8') as f:
+                plan_data = json.load(f)
+    except (OSError, ValueError) as e:
+        return plan_path, [f"could not load: {e}"]
+    return plan_path, validate_plan(plan_data, _worker_check)
+
+
+def validate_paths(plan_paths, schema_path=DEFAULT_SCHEMA_PATH, workers=None):
+    """
+    複数のプランファイルを並列に検証
+
+    Returns:
+        dict: {プランのパス: エラー一覧}（エラーのあるものだけ）
+    """
+    plan_paths = [str(p) for p in plan_paths]
+    if len(plan_paths) <= 1:
+        _init_worker(schema_path)
+        results = map(_validate_file, plan_paths)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(schema_path),))
+        with pool:
+            results = list(pool.map(_validate_file, plan_paths, chunksize=16))
+    return {path: errors for path, errors in results if errors}
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python src/validate_plan.py <plan.json|dir> [...] [--schema config/slide.schema.json]")
+        sys.exit(1)
+
+    args = sys.argv[1:]
+    schema_path = DEFAULT_SCHEMA_PATH
+    if '--schema' in args:
+        i = args.index('--schema')
+        if i + 1 >= len(args):
+            print("Error: --schema requires a value")
+            sys.exit(1)
+        schema_path = args[i + 1]
+        del args[i:i + 2]
+
+    plan_paths = []
+    for item in args:
+        p = Path(item)
+        plan_paths.extend(sorted(list(p.glob('*.json')) + list(p.glob('*.yplan'))) if p.is_dir() else [p])
+
+    failures = validate_paths(plan_paths, schema_path)
+
+    for path, errors in failures.items():
+        print(f"{path}: {len(errors)} errors")
+        for error in errors:
+            print(f"  {error}")
+
+    print(f"\nValidated {len(plan_paths)} plans: {len(plan_paths) - len(failures)} OK, {len(failures)} with errors")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+PowerPoint生成のウォッチモード（ライブプレビュー用）
+テンプレートとスライドの雛形（背景・図形のXML）をメモリに常駐させ、
+プラン・テンプレートの変更を監視して、変わったスライドだけを作り直して保存する
+
+- プランの変更: (テンプレートスライド, fields) が変わったスライドだけを再生成
+- テンプレートの変更: 雛形を読み直して全スライドを再生成（プロセスは起動したまま）
+- 保存中のファイルを読まないよう、mtime が debounce 秒間変わらなくなってから処理する
+- プランの読み込み・スキーマ検証、テンプレートの読み直しに失敗した場合は
+  前回の雛形と出力を残して次の変更を待つ
+
+script_final.md から再生成したい場合は、別のターミナルで
+npm run sections && npm run plan && npm run tune を実行するとプランの更新を検知する
+"""
+
+import io
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+import zipfile
+import importlib
+from pptx import Presentation
+from pptx.exc import PackageNotFoundError
+
+from stream_save import stream_save
+from validate_plan import DEFAULT_SCHEMA_PATH, load_schema, validate_plan
+
+render_pptx_module = importlib.import_module('06_render_pptx')
+
+P = '{http://schemas.openxmlformats.org/presentationml/2006/main}'
+
+
+class SlidePrototype:
+    """テンプレートスライド1枚分の雛形（レイアウト・背景・図形）"""
+
+    def __init__(self, slide):
+        self.layout = slide.slide_layout
+        self.layout_partname = str(self.layout.part.partname)
+        bg = slide.element.find(P + 'cSld/' + P + 'bg')
+        self.bg = copy.deepcopy(bg) if bg is not None else None
+        self.shapes = [copy.deepcopy(shape.element) for shape in slide.shapes]
+
+    def instantiate(self, prs, layout=None, slides=None):
+        """
+        雛形からスライドを追加（06_render_pptx.duplicate_slide と同じ結果）
+
+        Args:
+            layout: 雛形を作ったものとは別に読み込んだ同じテンプレートに追加する場合、
+                    そのPresentationでの layout_partname のレイアウト
+            slides: add_slide を持つオブジェクト（shard_render.SlideAssembler など。既定は prs.slides）
+        """
+        slides = slides if slides is not None else prs.slides
+        new_slide = slides.add_slide(layout if layout is not None else self.layout)
+        cSld = new_slide.element.find(P + 'cSld')
+        if self.bg is not None:
+            existing_bg = cSld.find(P + 'bg')
+            if existing_bg is not None:
+                cSld.remove(existing_bg)
+            cSld.insert(list(cSld).index(cSld.find(P + 'spTree')), copy.deepcopy(self.bg))
+        for element in self.shapes:
+            new_slide.shapes._spTree.insert_element_before(copy.deepcopy(element), 'p:extLst')
+        return new_slide
+
+
+def slide_key(template_idx, fields):
+    """スライドの内容を表すキー（同じキーなら同じスライドが生成される）"""
+    return (template_idx, json.dumps(fields, ensure_ascii=False, sort_keys=True))
+
+
+class WatchRenderer:
+    """常駐するPresentationに対して、変わったスライドだけを差し替える"""
+
+    def __init__(self, template_path, output_path, schema_path=DEFAULT_SCHEMA_PATH):
+        self.template_path = template_path
+        self.output_path = output_path
+        self.schema_path = schema_path
+        self.prs = None
+        self.keys = []
+        self.load_template()
+
+    def load_template(self):
+        """テンプレートを読み込み、雛形を作ってテンプレートスライドを取り除く（失敗時は前の状態のまま）"""
+        with open(self.template_path, 'rb') as f:
+            prs = Presentation(io.BytesIO(f.read()))
+        prototypes = [SlidePrototype(slide) for slide in prs.slides]
+        sldIdLst = prs.slides._sldIdLst
+        for sldId in list(sldIdLst):
+            prs.part.drop_rel(sldId.rId)
+            sldIdLst.remove(sldId)
+        self.prototypes = prototypes
+        self.prs = prs
+        self.keys = []
+
+    def load_plan(self, plan_path):
+        """
+        プランを読み込んで検証
+
+        Returns:
+            list: resolve_templates の結果（問題があればNone）
+        """
+        try:
+            plan_data = render_pptx_module.load_plan(plan_path)
+        except (OSError, ValueError) as e:
+            print(f"Error: could not load plan: {e}")
+            return None
+        if self.schema_path is not None and os.path.exists(self.schema_path):
+            errors = validate_plan(plan_data, load_schema(str(self.schema_path)))
+            if errors:
+                print(f"Error: Slide plan does not match schema ({len(errors)} errors)")
+                for error in errors:
+                    print(f"  {error}")
+                return None
+        return render_pptx_module.resolve_templates(render_pptx_module.get_slides_data(plan_data))
+
+    def _build_slide(self, template_idx, fields):
+        new_slide = self.prototypes[template_idx].instantiate(self.prs)
+        render_pptx_module.fill_slide_content(new_slide, fields, template_idx)
+        return new_slide
+
+    def update(self, resolved):
+        """
+        スライド一覧を resolved に合わせる（変わった位置のスライドだけ作り直す）
+
+        Returns:
+            int: 作り直したスライド数
+        """
+        prs = self.prs
+        sldIdLst = prs.slides._sldIdLst
+        new_keys = []
+        changed = 0
+
+        for position, (template_name, fields, item_count, template_idx) in enumerate(resolved):
+            if template_idx >= len(self.prototypes):
+                print(f"Warning: Template index {template_idx} out of range")
+                continue
+            key = slide_key(template_idx, fields)
+            index = len(new_keys)
+            new_keys.append(key)
+            if index < len(self.keys) and self.keys[index] == key:
+                continue
+
+            # 新しいスライドは末尾に追加されるので、番号の重複を避けるため先に振り直す
+            prs.part.rename_slide_parts([sldId.rId for sldId in sldIdLst])
+            self._build_slide(template_idx, fields)
+            new_sldId = sldIdLst[-1]
+            if index < len(self.keys):
+                old_sldId = sldIdLst[index]
+                prs.part.drop_rel(old_sldId.rId)
+                sldIdLst.remove(old_sldId)
+                sldIdLst.remove(new_sldId)
+                sldIdLst.insert(index, new_sldId)
+            changed += 1
+
+        # 減ったスライドを末尾から削除
+        for sldId in list(sldIdLst)[len(new_keys):]:
+            prs.part.drop_rel(sldId.rId)
+            sldIdLst.remove(sldId)
+            changed += 1
+
+        prs.part.rename_slide_parts([sldId.rId for sldId in sldIdLst])
+        self.keys = new_keys
+        return changed
+
+    def save(self):
+        output_dir = os.path.dirname(self.output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        stream_save(self.prs, self.output_path)
+
+
+def _mtimes(paths):
+    result = []
+    for path in paths:
+        try:
+            result.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            result.append(None)
+    return result
+
+
+def watch(plan_path, template_path, output_path, interval=0.1, debounce=0.3, schema_path=DEFAULT_SCHEMA_PATH):
+    """プランとテンプレートを監視し、変更のたびに出力を更新する（Ctrl+Cで終了）"""
+    renderer = WatchRenderer(template_path, output_path, schema_path)
+    watched = [plan_path, template_path]
+    seen = None
+    failed = None   # テンプレートの読み直しに失敗したときの mtime（同じ状態で再試行しない）
+    pending = _mtimes(watched)
+    pending_since = 0.0
+
+    print(f"Watching {plan_path} and {template_path} (Ctrl+C to stop)")
+    try:
+        while True:
+            current = _mtimes(watched)
+            now = time.monotonic()
+            if current != pending:
+                pending, pending_since = current, now
+            elif current != seen and current != failed and now - pending_since >= debounce:
+                start = time.perf_counter()
+                if seen is not None and current[1] != seen[1]:
+                    print("Template changed, reloading prototypes")
+                    try:
+                        renderer.load_template()
+                    except (OSError, KeyError, zipfile.BadZipFile, PackageNotFoundError) as e:
+                        # 削除・保存途中などで読めない場合は前回の雛形と出力を残し、次の変更を待つ
+                        print(f"Error: could not reload template: {e}")
+                        failed = current
+                        time.sleep(interval)
+                        continue
+                seen, failed = current, None
+
+                resolved = renderer.load_plan(plan_path) if current[0] is not None else None
+                if resolved is not None:
+                    changed = renderer.update(resolved)
+                    render_ms = (time.perf_counter() - start) * 1000
+                    if changed:
+                        renderer.save()
+                    total_ms = (time.perf_counter() - start) * 1000
+                    print(f"[{time.strftime('%H:%M:%S')}] {changed}/{len(renderer.keys)} slides re-rendered "
+                          f"in {render_ms:.0f} ms, saved in {total_ms - render_ms:.0f} ms -> {output_path}")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='プラン・テンプレートの変更を監視してPowerPointを再生成')
+    parser.add_argument('plan', help='slides_plan.json / 03_slides_tuned.json / .yplan')
+    parser.add_argument('template', help='テンプレートのpptx')
+    parser.add_argument('output', help='出力するpptx')
+    parser.add_argument('--interval', type=float, default=0.1, help='監視間隔（秒）')
+    parser.add_argument('--debounce', type=float, default=0.3, help='変更が落ち着くまでの待ち時間（秒）')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.template):
+        print(f"Error: Template file not found: {args.template}")
+        sys.exit(1)
+
+    watch(args.plan, args.template, args.output, interval=args.interval, debounce=args.debounce)
+
+
+if __name__ == '__main__':
+    main()
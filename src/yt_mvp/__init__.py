@@ -0,0 +1,94 @@
+"""
+yt_mvp: 生成・検証・解析のPython APIをまとめたパッケージ
+src/ 直下のスクリプト（06_render_pptx.py など番号付きのものを含む）の関数を、
+import できる名前で公開する。各モジュールは属性に初めてアクセスしたときに読み込む
+
+    import sys; sys.path.insert(0, 'src')
+    import yt_mvp
+
+    tuned = yt_mvp.tune_plan(plan_data)
+    prs = yt_mvp.build_presentation(yt_mvp.resolve_templates(yt_mvp.get_slides_data(tuned)), template_path)
+    stats = yt_mvp.check_presentation(prs, yt_mvp.load_policy())
+"""
+
+import os
+import sys
+import importlib
+
+# src/ 直下のモジュールは互いに素の名前で import し合うため、src/ を検索パスに入れる
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
+
+# 公開名 → 定義しているモジュール
+_EXPORTS = {
+    # パイプライン
+    'run_pipeline': 'pipeline',
+    # チューニング・プラン
+    'tune_plan': 'tune_plan',
+    'tune_archive': 'tune_plan',
+    'load_template_constraints': 'tune_plan',
+    'load_plan': '06_render_pptx',
+    'get_slides_data': '06_render_pptx',
+    'resolve_templates': '06_render_pptx',
+    'load_schema': 'validate_plan',
+    'validate_plan': 'validate_plan',
+    'read_plan_binary': 'plan_binary',
+    'write_plan_binary': 'plan_binary',
+    # 生成
+    'build_presentation': '06_render_pptx',
+    'save_presentation': '06_render_pptx',
+    'render_pptx': '06_render_pptx',
+    'generate_pptx': '06_render_pptx',
+    'render_sharded': 'shard_render',
+    'build_slide_model': '06_render_pptx',
+    'apply_slide_model': '06_render_pptx',
+    'prepare_plan': 'render_templates',
+    'render_templates': 'render_templates',
+    'SlideStore': 'slide_store',
+    'open_slide_store': 'slide_store',
+    'SlideMemo': 'slide_store',
+    'stream_save': 'stream_save',
+    'parallel_save': 'stream_save',
+    'merge_decks': 'merge_decks',
+    # 検証
+    'verify_and_fix_text_colors': '07_verify_colors',
+    'ColorPolicy': 'color_policy',
+    'load_policy': 'color_policy',
+    'check_presentation': 'color_policy',
+    'check_paths': 'color_policy',
+    'save_patched': 'zip_patch',
+    'MemoryProfiler': 'mem_profile',
+    'MemoryBudgetExceeded': 'mem_profile',
+    # 解析
+    'StyleResolver': 'style_resolver',
+    'EffectiveStyle': 'style_resolver',
+    'analyze_background': 'analyze_background',
+    'analyze_fonts': 'analyze_font_colors',
+    'analyze_template': 'analyze_pptx_template',
+    'analyze_shape_xml': 'analyze_xml_full',
+    'analyze_run_xml': 'analyze_xml_rpr',
+    'compare_slides': 'compare_pptx',
+    'compare_slide_layouts': 'compare_layouts',
+    'export_decks': 'export_xml',
+    'open_index': 'deck_index',
+    'update_index': 'deck_index',
+    'search': 'deck_index',
+    'render_thumbnails': 'thumbnails',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    # 2回目以降は通常の属性として参照させる
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
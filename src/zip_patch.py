@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+pptx（ZIP）の部分書き換え
+指定したエントリだけを新しい内容に置き換え、それ以外のエントリは
+圧縮データのまま（展開・再圧縮せずに）コピーする
+
+- エントリの順序と圧縮方式は元のファイルのまま
+- 上書き保存でも安全なように一時ファイルへ書いてから置き換える
+"""
+
+import os
+import shutil
+import struct
+import zipfile
+import posixpath
+from lxml import etree
+
+CHUNK_SIZE = 1024 * 1024
+
+REL = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+
+# ローカルファイルヘッダー（固定長部分）
+_LOCAL_HEADER = struct.Struct('<4s5H3L2H')
+_LOCAL_HEADER_MAGIC = b'PK\x03\x04'
+
+
+def _raw_data_offset(fp, info):
+    """エントリの圧縮データの開始位置（ローカルヘッダーの可変長部分を読み飛ばす）"""
+    fp.seek(info.header_offset)
+    header = _LOCAL_HEADER.unpack(fp.read(_LOCAL_HEADER.size))
+    if header[0] != _LOCAL_HEADER_MAGIC:
+        raise zipfile.BadZipFile(f"Bad local file header: {info.filename}")
+    name_len, extra_len = header[-2], header[-1]
+    return info.header_offset + _LOCAL_HEADER.size + name_len + extra_len
+
+
+def write_raw(zout, info, chunks, zip64=None):
+    """
+    圧縮済みのデータをそのまま書き込み、セントラルディレクトリに登録
+
+    Args:
+        info: CRC・compress_size・file_size・compress_type を設定した ZipInfo
+        chunks: 圧縮済みデータ（bytes の反復可能オブジェクト）
+        zip64: ローカルヘッダーにZIP64の拡張を付けるか（Noneならサイズから判定）
+    """
+    # サイズが分かっているのでデータディスクリプタは使わない
+    info.flag_bits &= ~0x08
+    if zip64 is None:
+        zip64 = info.file_size > zipfile.ZIP64_LIMIT or info.compress_size > zipfile.ZIP64_LIMIT
+    info.header_offset = zout.fp.tell()
+    zout.fp.write(info.FileHeader(zip64))
+    for chunk in chunks:
+        zout.fp.write(chunk)
+
+    # 次のエントリの書き込み位置とセントラルディレクトリの開始位置を進める
+    zout.start_dir = zout.fp.tell()
+    zout.filelist.append(info)
+    zout.NameToInfo[info.filename] = info
+    zout._didModify = True
+
+
+def iter_raw(zin, info):
+    """エントリの圧縮データをチャンク単位で読み出す"""
+    src = zin.fp
+    src.seek(_raw_data_offset(src, info))
+    remaining = info.compress_size
+    while remaining:
+        chunk = src.read(min(CHUNK_SIZE, remaining))
+        if not chunk:
+            raise zipfile.BadZipFile(f"Truncated entry: {info.filename}")
+        yield chunk
+        remaining -= len(chunk)
+
+
+def copy_raw(zin, zout, info, new_info=None):
+    """
+    圧縮データを展開せずにコピー
+    new_info を渡すとその日時・属性で登録する（CRC・サイズ・圧縮方式は元のエントリから設定）
+    """
+    if new_info is None:
+        new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+        new_info.create_system = info.create_system
+        new_info.external_attr = info.external_attr
+    new_info.compress_type = info.compress_type
+    new_info.CRC = info.CRC
+    new_info.compress_size = info.compress_size
+    new_info.file_size = info.file_size
+    new_info.flag_bits = info.flag_bits
+    write_raw(zout, new_info, iter_raw(zin, info))
+
+
+def patch_package(source_path, output_path, replacements):
+    """
+    ZIPの一部のエントリだけを置き換えて保存
+
+    Args:
+        source_path: 元のpptx
+        output_path: 出力先（source_path と同じでもよい）
+        replacements: {エントリ名: 新しい内容（bytes）}
+
+    Returns:
+        dict: 統計（置き換えたエントリ数・そのままコピーしたエントリ数とバイト数）
+    """
+    stats = {'replaced': 0, 'copied_raw': 0, 'copied_bytes': 0}
+    tmp_path = output_path + '.partial'
+    try:
+        with zipfile.ZipFile(source_path) as zin, \
+                zipfile.ZipFile(tmp_path, 'w', compression=zipfile.ZIP_DEFLATED) as zout:
+            for info in zin.infolist():
+                data = replacements.get(info.filename)
+                if data is None:
+                    copy_raw(zin, zout, info)
+                    stats['copied_raw'] += 1
+                    stats['copied_bytes'] += info.compress_size
+                else:
+                    new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+                    new_info.compress_type = zipfile.ZIP_DEFLATED
+                    new_info.external_attr = info.external_attr
+                    zout.writestr(new_info, data)
+                    stats['replaced'] += 1
+            missing = set(replacements) - set(zin.namelist())
+            if missing:
+                raise KeyError(f"Entries not found in {source_path}: {', '.join(sorted(missing))}")
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return stats
+
+
+def _source_member_names(prs, source_path):
+    """
+    {パーツ: 元のZIP内のエントリ名}（プレゼンテーションから参照されるパーツのみ）
+    python-pptx は読み込み時にスライドのパーツ名を振り直すため、rId から元の名前を引く
+    """
+    rels_name = prs.part.partname.rels_uri.membername
+    base_dir = posixpath.dirname(prs.part.partname.membername)
+    with zipfile.ZipFile(source_path) as zf:
+        rels = etree.fromstring(zf.read(rels_name))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(REL) if rel.get('TargetMode') != 'External'}
+    names = {}
+    for rId, rel in prs.part.rels.items():
+        target = targets.get(rId)
+        if target is None or rel.is_external:
+            continue
+        if target.startswith('/'):
+            names[rel.target_part] = target.lstrip('/')
+        else:
+            names[rel.target_part] = posixpath.normpath(posixpath.join(base_dir, target))
+    return names
+
+
+def save_patched(prs, source_path, output_path, parts):
+    """
+    Presentationのうち変更したパーツだけを元のpptxに書き戻す
+    （パーツの追加・削除や関係の変更には対応しない。XMLの内容を変えただけの場合に使う）
+
+    Args:
+        prs: source_path から読み込んだPresentation
+        parts: 変更したXMLパーツ（スライドのpartなど）
+    """
+    names = _source_member_names(prs, source_path) if parts else {}
+    replacements = {names.get(part, part.partname.membername): part.blob for part in parts}
+    if not replacements:
+        if os.path.abspath(source_path) != os.path.abspath(output_path):
+            shutil.copyfile(source_path, output_path)
+        return {'replaced': 0, 'copied_raw': 0, 'copied_bytes': 0}
+    return patch_package(source_path, output_path, replacements)